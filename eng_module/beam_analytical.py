@@ -0,0 +1,578 @@
+import numpy as np
+
+FACTORIALS = np.array([1., 1., 2., 6., 24., 120.])
+
+SUPPORT_FIXITY = {'P': False, 'F': False, 'R': True}
+
+SUPPORT_DX = {'P': True, 'F': False, 'R': True}
+
+LOAD_DIRECTIONS = ('FY', )
+
+class SingleSpanBeams:
+    """
+    A batch of beams with up to 'n_supports' supports solved in closed form with
+    singularity (Macaulay) functions. All the arrays are padded to the same shape.
+
+    'L' - Length of each beam, shape (B,)
+    'E' - Elastic modulus of each beam, shape (B,)
+    'Iz' - Moment of inertia of each beam, shape (B,)
+    'support_x' - Location of the supports, shape (B, n_supports)
+    'support_fixed' - True if the support restrains the rotation, shape (B, n_supports)
+    'support_active' - False for the padding supports, shape (B, n_supports)
+    'point_P', 'point_x' - Point load magnitude and location per load case, shape (B, K, n_point)
+    'dist_w1', 'dist_w2', 'dist_x1', 'dist_x2' - Start and end magnitude and location of the
+        distributed loads per load case, shape (B, K, n_dist)
+
+    Loads and reactions are positive in the +Y direction and moments are positive counterclockwise.
+    """
+    def __init__(
+        self,
+        L: np.ndarray,
+        E: np.ndarray,
+        Iz: np.ndarray,
+        support_x: np.ndarray,
+        support_fixed: np.ndarray,
+        support_active: np.ndarray,
+        point_P: np.ndarray,
+        point_x: np.ndarray,
+        dist_w1: np.ndarray,
+        dist_w2: np.ndarray,
+        dist_x1: np.ndarray,
+        dist_x2: np.ndarray,
+    ):
+        self.L = np.asarray(L, dtype=float)
+        self.E = np.asarray(E, dtype=float)
+        self.Iz = np.asarray(Iz, dtype=float)
+        self.support_x = np.asarray(support_x, dtype=float)
+        self.support_fixed = np.asarray(support_fixed, dtype=bool)
+        self.support_active = np.asarray(support_active, dtype=bool)
+        self.point_P = np.asarray(point_P, dtype=float)
+        self.point_x = np.asarray(point_x, dtype=float)
+        self.dist_w1 = np.asarray(dist_w1, dtype=float)
+        self.dist_w2 = np.asarray(dist_w2, dtype=float)
+        self.dist_x1 = np.asarray(dist_x1, dtype=float)
+        self.dist_x2 = np.asarray(dist_x2, dtype=float)
+        self.reactions = None
+        self.couples = None
+        self.constants = None
+
+    @classmethod
+    def from_beam_data(cls, list_of_beam_data: list[dict], cases: list[str])-> 'SingleSpanBeams':
+        """
+        Returns the batch for a list of structured beam data dictionaries
+
+        'list_of_beam_data' - Dictionaries in the format of beams.get_structured_beam_data
+        'cases' - Load cases of the batch. Loads of other cases are ignored
+        """
+        n_beams = len(list_of_beam_data)
+        n_cases = len(cases)
+        case_index = {case: idx for idx, case in enumerate(cases)}
+        n_supports = max(len(beam_data['Supports']) for beam_data in list_of_beam_data)
+        n_point = max([sum(load['Type'].upper() == 'POINT' for load in beam_data['Loads']) for beam_data in list_of_beam_data] + [1])
+        n_dist = max([sum(load['Type'].upper() == 'DIST' for load in beam_data['Loads']) for beam_data in list_of_beam_data] + [1])
+
+        support_x = np.zeros((n_beams, n_supports))
+        support_fixed = np.zeros((n_beams, n_supports), dtype=bool)
+        support_active = np.zeros((n_beams, n_supports), dtype=bool)
+        point = np.zeros((2, n_beams, n_cases, n_point))
+        dist = np.zeros((4, n_beams, n_cases, n_dist))
+
+        for idx, beam_data in enumerate(list_of_beam_data):
+            for jdx, (location, support) in enumerate(sorted(beam_data['Supports'].items())):
+                support_x[idx, jdx] = location
+                support_fixed[idx, jdx] = SUPPORT_FIXITY[support]
+                support_active[idx, jdx] = True
+            n_beam_point = 0
+            n_beam_dist = 0
+            for load in beam_data['Loads']:
+                if load['Case'] not in case_index:
+                    continue
+                kdx = case_index[load['Case']]
+                if load['Type'].upper() == 'POINT':
+                    point[:, idx, kdx, n_beam_point] = load['Magnitude'], load['Location']
+                    n_beam_point += 1
+                elif load['Type'].upper() == 'DIST':
+                    dist[:, idx, kdx, n_beam_dist] = (
+                        load['Start Magnitude'], load['End Magnitude'],
+                        load['Start Location'], load['End Location']
+                    )
+                    n_beam_dist += 1
+
+        return cls(
+            [beam_data['L'] for beam_data in list_of_beam_data],
+            [beam_data['E'] for beam_data in list_of_beam_data],
+            [beam_data['Iz'] for beam_data in list_of_beam_data],
+            support_x, support_fixed, support_active,
+            *point, *dist
+        )
+
+    def solve(self)-> 'SingleSpanBeams':
+        """
+        Solves the reactions of every beam and load case.
+        The equilibrium and support conditions of a beam do not depend on the loads, so each
+        beam is factorized once and all its load cases are solved as right-hand sides.
+        """
+        if not np.all(is_stable(self.support_x, self.support_fixed, self.support_active)):
+            raise ValueError('Every beam needs two supports at different locations or one fixed support')
+
+        # Work with coordinates normalized by the length to keep the system well conditioned
+        L = self.L[:, None]
+        s = self.support_x / L
+        n_beams, n_supports = s.shape
+        n_unknowns = 2 * n_supports + 2
+        V, C, c1, c2 = (
+            np.arange(n_supports),
+            np.arange(n_supports, 2 * n_supports),
+            2 * n_supports,
+            2 * n_supports + 1
+        )
+        loads = self._normalized_loads()
+        ones = np.ones((n_beams, 1))
+
+        A = np.zeros((n_beams, n_unknowns, n_unknowns))
+        b = np.zeros((n_beams, n_unknowns, self.point_P.shape[1]))
+
+        # Equilibrium of forces and moments: V(L) = 0 and M(L) = 0
+        A[:, 0, V] = _bracket(1. - s, 0)
+        A[:, 1, V] = _bracket(1. - s, 1)
+        A[:, 1, C] = -_bracket(1. - s, 0)
+        b[:, 0, :] = -_load_effects(ones, 0, *loads)[:, :, 0]
+        b[:, 1, :] = -_load_effects(ones, 1, *loads)[:, :, 0]
+
+        # Zero deflection and, at fixed supports, zero rotation at the supports
+        d = s[:, :, None] - s[:, None, :]
+        rows_y = 2 + np.arange(n_supports)
+        rows_r = 2 + n_supports + np.arange(n_supports)
+        A[:, rows_y[:, None], V] = _bracket(d, 3)
+        A[:, rows_y[:, None], C] = -_bracket(d, 2)
+        A[:, rows_y, c1] = s
+        A[:, rows_y, c2] = 1.
+        A[:, rows_r[:, None], V] = _bracket(d, 2)
+        A[:, rows_r[:, None], C] = -_bracket(d, 1)
+        A[:, rows_r, c1] = 1.
+        b[:, rows_y, :] = -np.swapaxes(_load_effects(s, 3, *loads), 1, 2)
+        b[:, rows_r, :] = -np.swapaxes(_load_effects(s, 2, *loads), 1, 2)
+
+        # Padding supports carry no reaction and pinned supports no moment
+        free_y = ~self.support_active
+        free_r = ~(self.support_active & self.support_fixed)
+        for rows, free, unknowns in ((rows_y, free_y, V), (rows_r, free_r, C)):
+            beam_idx, support_idx = np.nonzero(free)
+            A[beam_idx, rows[support_idx], :] = 0.
+            A[beam_idx, rows[support_idx], unknowns[support_idx]] = 1.
+            b[beam_idx, rows[support_idx], :] = 0.
+
+        solution = np.swapaxes(np.linalg.solve(A, b), 1, 2)
+        L = L[:, :, None]
+        self.reactions = solution[:, :, V]
+        self.couples = solution[:, :, C] * L
+        self.constants = solution[:, :, c1:] * np.concatenate([L ** 2, L ** 3], axis=2)
+
+        return self
+
+    def _normalized_loads(self)-> tuple[np.ndarray, ...]:
+        L = self.L[:, None, None]
+        return (
+            self.point_P, self.point_x / L,
+            self.dist_w1 * L, self.dist_w2 * L, self.dist_x1 / L, self.dist_x2 / L
+        )
+
+    def _loads(self)-> tuple[np.ndarray, ...]:
+        return (
+            self.point_P, self.point_x,
+            self.dist_w1, self.dist_w2, self.dist_x1, self.dist_x2
+        )
+
+    def diagram(self, x: np.ndarray, level: int, inclusive: bool = True)-> np.ndarray:
+        """
+        Returns a diagram of every beam and load case at the locations 'x', shape (B, K, S)
+
+        'x' - Locations along each beam, shape (B, S)
+        'level' - 0 for the shear, 1 for the bending moment (sagging positive),
+            2 for the rotation and 3 for the deflection
+        'inclusive' - If True, loads and supports located at 'x' are included (right side
+            of a discontinuity), otherwise they are excluded (left side)
+        """
+        if self.reactions is None:
+            self.solve()
+        x = np.asarray(x, dtype=float)
+        values = _load_effects(x, level, *self._loads(), inclusive=inclusive)
+        values += _support_effects(x, level, self.support_x, self.reactions, self.couples, inclusive=inclusive)
+        if level == 2:
+            values += self.constants[:, :, 0:1]
+        elif level == 3:
+            values += self.constants[:, :, 0:1] * x[:, None, :] + self.constants[:, :, 1:2]
+        if level >= 2:
+            values /= (self.E * self.Iz)[:, None, None]
+
+        return values
+
+    def stations(self, n_stations: int)-> np.ndarray:
+        """
+        Returns 'n_stations' equally spaced locations along each beam, shape (B, n_stations)
+        """
+        return self.L[:, None] * np.linspace(0., 1., n_stations)
+
+    def diagrams(self, n_stations: int = 101)-> dict[str, np.ndarray]:
+        """
+        Returns the shear, moment, rotation and deflection diagrams of every beam and load case
+        sampled at 'n_stations' equally spaced locations
+        """
+        x = self.stations(n_stations)
+
+        return {
+            'x': x,
+            'Shear': self.diagram(x, 0),
+            'Moment': self.diagram(x, 1),
+            'Rotation': self.diagram(x, 2),
+            'Deflection': self.diagram(x, 3),
+        }
+
+def is_stable(support_x: np.ndarray, support_fixed: np.ndarray, support_active: np.ndarray)-> np.ndarray:
+    """
+    Returns True for the beams with a fixed support or two supports at different locations
+    """
+    x = np.where(support_active, support_x, np.nan)
+    has_fixed = np.any(support_active & support_fixed, axis=-1)
+    with np.errstate(invalid='ignore'):
+        has_two = (np.nanmax(x, axis=-1) > np.nanmin(x, axis=-1))
+
+    return has_fixed | has_two
+
+def load_cases(beam_data: dict)-> list[str]:
+    """
+    Returns the load cases of the loads in 'beam_data' in order of appearance,
+    or ['Case 1'] (the PyNite default case) for a beam without loads
+    """
+    return list(dict.fromkeys(load['Case'] for load in beam_data['Loads'])) or ['Case 1']
+
+def is_plane_beam(beam_data: dict)-> bool:
+    """
+    Returns True if the beam in 'beam_data' only bends in its XY plane: stable supports
+    ('P', 'F' or 'R') within the beam, at least one of them restrained along the beam axis,
+    and loads in the Y direction only within the beam
+    """
+    supports = beam_data['Supports']
+    if not supports or not any(SUPPORT_DX.get(support, False) for support in supports.values()):
+        return False
+    if any(support not in SUPPORT_FIXITY for support in supports.values()):
+        return False
+    if any(not 0. <= location <= beam_data['L'] for location in supports):
+        return False
+    if not (len(supports) >= 2 or 'R' in supports.values()):
+        return False
+    for load in beam_data['Loads']:
+        if load['Direction'].upper() not in LOAD_DIRECTIONS:
+            return False
+        if load['Type'].upper() == 'POINT':
+            locations = [load['Location']]
+        elif load['Type'].upper() == 'DIST':
+            locations = [load['Start Location'], load['End Location']]
+            if load['Start Location'] > load['End Location']:
+                return False
+        else:
+            return False
+        if any(not 0. <= location <= beam_data['L'] for location in locations):
+            return False
+
+    return True
+
+def is_single_span(beam_data: dict)-> bool:
+    """
+    Returns True if the beam in 'beam_data' can be solved by the closed-form engine:
+    one or two supports forming a stable single span (simple, cantilever, overhanging,
+    propped or fixed-end) restrained along the beam axis, with loads in the Y direction only
+    """
+    return len(beam_data['Supports']) <= 2 and is_plane_beam(beam_data)
+
+def _bracket(d: np.ndarray, n: int, inclusive: bool = True)-> np.ndarray:
+    """
+    Returns the Macaulay bracket <d>^n / n!
+    """
+    active = d >= 0. if inclusive else d > 0.
+
+    return np.where(active, np.maximum(d, 0.) ** n, 0.) / FACTORIALS[n]
+
+def _load_effects(
+    x: np.ndarray,
+    level: int,
+    point_P: np.ndarray,
+    point_x: np.ndarray,
+    dist_w1: np.ndarray,
+    dist_w2: np.ndarray,
+    dist_x1: np.ndarray,
+    dist_x2: np.ndarray,
+    inclusive: bool = True,
+)-> np.ndarray:
+    """
+    Returns the contribution of the loads to a diagram at 'x' (B, S), shape (B, K, S)
+    """
+    x = x[:, None, :, None]
+    effects = (point_P[:, :, None, :] * _bracket(x - point_x[:, :, None, :], level, inclusive)).sum(axis=-1)
+
+    w1, w2, x1, x2 = (values[:, :, None, :] for values in (dist_w1, dist_w2, dist_x1, dist_x2))
+    span = x2 - x1
+    slope = np.divide(w2 - w1, span, out=np.zeros(np.broadcast_shapes(w1.shape, span.shape)), where=span > 0.)
+    effects += (
+        w1 * _bracket(x - x1, level + 1) + slope * _bracket(x - x1, level + 2)
+        - w2 * _bracket(x - x2, level + 1) - slope * _bracket(x - x2, level + 2)
+    ).sum(axis=-1)
+
+    return effects
+
+def _support_effects(
+    x: np.ndarray,
+    level: int,
+    support_x: np.ndarray,
+    reactions: np.ndarray,
+    couples: np.ndarray,
+    inclusive: bool = True,
+)-> np.ndarray:
+    """
+    Returns the contribution of the support reactions to a diagram at 'x' (B, S), shape (B, K, S)
+    """
+    d = x[:, None, :, None] - support_x[:, None, None, :]
+    effects = (reactions[:, :, None, :] * _bracket(d, level, inclusive)).sum(axis=-1)
+    if level >= 1:
+        effects -= (couples[:, :, None, :] * _bracket(d, level - 1, inclusive)).sum(axis=-1)
+
+    return effects
+
+class AnalyticalBeamNode:
+    """
+    Results of a node of an AnalyticalBeamModel, named like the PyNite Node3D attributes
+    """
+    def __init__(self, name: str, X: float, support: str|None):
+        self.name = name
+        self.X = X
+        self.Y = 0.
+        self.Z = 0.
+        self.support_DY = support is not None
+        self.support_RZ = support is not None and SUPPORT_FIXITY[support]
+        self.RxnFY = {}
+        self.RxnMZ = {}
+        self.DY = {}
+        self.RZ = {}
+
+class AnalyticalBeamMember:
+    """
+    Results of the beam member of an AnalyticalBeamModel, with the PyNite Member3D result methods.
+    Only bending about the local z-axis ('Fy', 'Mz', 'dy') is non-zero.
+    """
+    def __init__(self, name: str, model: 'AnalyticalBeamModel'):
+        self.name = name
+        self.model = model
+
+    def L(self)-> float:
+        return self.model.beam_data['L']
+
+    def shear(self, Direction: str, x: float, combo_name: str = 'Combo 1')-> float:
+        return self._value(Direction, 'Fy', 0, x, combo_name)
+
+    def moment(self, Direction: str, x: float, combo_name: str = 'Combo 1')-> float:
+        return self._value(Direction, 'Mz', 1, x, combo_name)
+
+    def deflection(self, Direction: str, x: float, combo_name: str = 'Combo 1')-> float:
+        return self._value(Direction, 'dy', 3, x, combo_name)
+
+    def max_shear(self, Direction: str, combo_name: str = 'Combo 1')-> float:
+        return self._extreme(Direction, 'Fy', 0, combo_name, np.max)
+
+    def min_shear(self, Direction: str, combo_name: str = 'Combo 1')-> float:
+        return self._extreme(Direction, 'Fy', 0, combo_name, np.min)
+
+    def max_moment(self, Direction: str, combo_name: str = 'Combo 1')-> float:
+        return self._extreme(Direction, 'Mz', 1, combo_name, np.max)
+
+    def min_moment(self, Direction: str, combo_name: str = 'Combo 1')-> float:
+        return self._extreme(Direction, 'Mz', 1, combo_name, np.min)
+
+    def max_deflection(self, Direction: str, combo_name: str = 'Combo 1')-> float:
+        return self._extreme(Direction, 'dy', 3, combo_name, np.max)
+
+    def min_deflection(self, Direction: str, combo_name: str = 'Combo 1')-> float:
+        return self._extreme(Direction, 'dy', 3, combo_name, np.min)
+
+    def shear_array(self, Direction: str, n_points: int, combo_name: str = 'Combo 1')-> np.ndarray:
+        return self._array(Direction, 'Fy', 0, n_points, combo_name)
+
+    def moment_array(self, Direction: str, n_points: int, combo_name: str = 'Combo 1')-> np.ndarray:
+        return self._array(Direction, 'Mz', 1, n_points, combo_name)
+
+    def deflection_array(self, Direction: str, n_points: int, combo_name: str = 'Combo 1')-> np.ndarray:
+        return self._array(Direction, 'dy', 3, n_points, combo_name)
+
+    def sample(self, n_points: int, combo_names: list[str]|None = None)-> dict[str, np.ndarray]:
+        """
+        Returns the stations 'x' (n_points,) and the 'Shear' (Fy), 'Moment' (Mz) and 'Deflection' (dy)
+        of the load combinations or load cases in 'combo_names' (all the combinations if None) at
+        'n_points' equally spaced stations, shape (n_combos, n_points), with the same signs as
+        the result methods. The load cases are evaluated once and combined for all the names.
+        """
+        combo_names = list(self.model.LoadCombos) if combo_names is None else combo_names
+        factors = np.array([self.model.factors(name) for name in combo_names]).reshape(len(combo_names), -1)
+        x = np.linspace(0., self.L(), n_points)
+        results = {'x': x}
+        for result, level in (('Shear', 0), ('Moment', 1), ('Deflection', 3)):
+            values = self.model.beams.diagram(x[None, :], level)[0]
+            values[:, -1:] = self.model.beams.diagram(x[None, -1:], level, inclusive=False)[0]
+            results[result] = factors @ (-values if level == 1 else values)
+
+        return results
+
+    def _values(self, Direction: str, in_plane: str, level: int, x: np.ndarray, combo_name: str, inclusive: bool = True)-> np.ndarray:
+        x = np.asarray(x, dtype=float)
+        if Direction != in_plane:
+            return np.zeros(x.shape)
+        values = self.model.diagram(x, level, combo_name, inclusive)
+        if inclusive and np.any(x >= self.L()):
+            # As in PyNite, the value at the end of the member is the one on its left side
+            end = x >= self.L()
+            values[end] = self.model.diagram(x[end], level, combo_name, inclusive=False)
+        # PyNite reports the moment about the local z-axis with hogging positive
+        return -values if level == 1 else values
+
+    def _value(self, Direction: str, in_plane: str, level: int, x: float, combo_name: str)-> float:
+        return float(self._values(Direction, in_plane, level, np.array([x]), combo_name)[0])
+
+    def _array(self, Direction: str, in_plane: str, level: int, n_points: int, combo_name: str)-> np.ndarray:
+        x = np.linspace(0., self.L(), n_points)
+
+        return np.array([x, self._values(Direction, in_plane, level, x, combo_name)])
+
+    def _extreme(self, Direction: str, in_plane: str, level: int, combo_name: str, extreme)-> float:
+        x = self.model.critical_locations(combo_name)
+        values = np.concatenate([
+            self._values(Direction, in_plane, level, x, combo_name),
+            self._values(Direction, in_plane, level, x, combo_name, inclusive=False),
+        ])
+
+        return float(extreme(values))
+
+class AnalyticalBeamModel:
+    """
+    A single span beam solved by the closed-form engine. It exposes the parts of the
+    PyNite FEModel3D interface used with the beams of this package: 'Nodes', 'Members',
+    'LoadCombos' and 'analyze_linear()'
+
+    'beam_data' - Dictionary in the format of beams.get_structured_beam_data
+    'node_locations' - Names and locations of the nodes, as in beams.get_node_locations
+    'load_combos' - Load combinations as {combo: {case: factor}}. By default every load
+        case is added to 'Combo 1' with a factor of 1.0
+    'n_points' - Number of equally spaced locations checked for the maximum deflection
+
+    After the analysis, 'case_results' and 'combo_results' hold the 'RxnFY', 'RxnMZ', 'DY'
+    and 'RZ' of the nodes for each load case and combination, shape (K, n_nodes) and
+    (n_combos, n_nodes). The diagrams are available for the load cases as well as the combinations.
+    """
+    def __init__(self, beam_data: dict, node_locations: dict[str, float], load_combos: dict[str, dict[str, float]]|None = None, n_points: int = 101):
+        self.beam_data = beam_data
+        self.cases = load_cases(beam_data)
+        if load_combos is None:
+            load_combos = {'Combo 1': {case: 1.0 for case in self.cases}}
+        self.LoadCombos = load_combos
+        self.n_points = n_points
+        self.Nodes = {
+            name: AnalyticalBeamNode(name, location, beam_data['Supports'].get(location))
+            for name, location in node_locations.items()
+        }
+        self.Members = {beam_data['Name']: AnalyticalBeamMember(beam_data['Name'], self)}
+        self.beams = None
+        self.combo_factors = None
+        self.case_results = None
+        self.combo_results = None
+
+    def analyze_linear(self, *args, **kwargs):
+        """
+        Solves all the load cases at once and combines them into the load combinations.
+        The arguments of the PyNite method are accepted and ignored.
+        """
+        self.beams = self.solve_cases()
+        self.combo_factors = np.array([
+            [factors.get(case, 0.) for case in self.cases] for factors in self.LoadCombos.values()
+        ]).reshape(len(self.LoadCombos), len(self.cases))
+
+        nodes = list(self.Nodes.values())
+        support_index = {x: idx for idx, x in reversed(list(enumerate(self.beams.support_x[0].tolist())))}
+        supported = [jdx for jdx, node in enumerate(nodes) if node.support_DY]
+        support_idx = [support_index[nodes[jdx].X] for jdx in supported]
+        node_x = np.array([[node.X for node in nodes]])
+        self.case_results = {
+            'RxnFY': np.zeros((len(self.cases), len(nodes))),
+            'RxnMZ': np.zeros((len(self.cases), len(nodes))),
+            'DY': self.beams.diagram(node_x, 3)[0],
+            'RZ': self.beams.diagram(node_x, 2)[0],
+        }
+        self.case_results['RxnFY'][:, supported] = self.beams.reactions[0][:, support_idx]
+        self.case_results['RxnMZ'][:, supported] = self.beams.couples[0][:, support_idx]
+        self.combo_results = {key: self.combo_factors @ values for key, values in self.case_results.items()}
+
+        for idx, combo in enumerate(self.LoadCombos):
+            for jdx, node in enumerate(nodes):
+                for key, values in self.combo_results.items():
+                    getattr(node, key)[combo] = float(values[idx, jdx])
+
+    def solve_cases(self)-> SingleSpanBeams:
+        """
+        Returns the solved SingleSpanBeams batch of the beam with one entry per load case
+        """
+        return SingleSpanBeams.from_beam_data([self.beam_data], self.cases).solve()
+
+    def factors(self, name: str)-> np.ndarray:
+        """
+        Returns the factor of each load case in the load combination or load case 'name', shape (K,)
+        """
+        if self.beams is None:
+            raise RuntimeError('The model has not been analyzed. Call analyze_linear() first')
+        if name in self.LoadCombos:
+            return self.combo_factors[list(self.LoadCombos).index(name)]
+        if name in self.cases:
+            return np.eye(len(self.cases))[self.cases.index(name)]
+        raise KeyError(f'{name} is not a load combination or load case of the model')
+
+    def diagram(self, x: np.ndarray, level: int, combo_name: str = 'Combo 1', inclusive: bool = True)-> np.ndarray:
+        """
+        Returns a diagram of a load combination or load case at the locations 'x' (see SingleSpanBeams.diagram)
+        """
+        factors = self.factors(combo_name)
+        values = self.beams.diagram(np.asarray(x, dtype=float)[None, :], level, inclusive)[0]
+
+        return factors @ values
+
+    def critical_locations(self, combo_name: str = 'Combo 1')-> np.ndarray:
+        """
+        Returns the locations where the extreme values of the diagrams can occur: the ends,
+        supports, load discontinuities, points of zero shear or zero load and 'n_points' equally
+        spaced locations
+        """
+        beams = self.beams
+        L = self.beam_data['L']
+        key_points = np.unique(np.concatenate([
+            [0., L], beams.support_x[0].ravel(), beams.point_x[0].ravel(),
+            beams.dist_x1[0].ravel(), beams.dist_x2[0].ravel()
+        ]))
+        key_points = key_points[(key_points >= 0.) & (key_points <= L)]
+
+        # The shear is at most quadratic between key points, so it is fitted exactly from
+        # three interior values. Its roots are the moment extremes and its stationary
+        # point (zero load) is a shear extreme
+        x1, x2 = key_points[:-1], key_points[1:]
+        t = np.array([0.25, 0.5, 0.75])
+        x = (x1[:, None] + (x2 - x1)[:, None] * t).ravel()
+        shear = self.diagram(x, 0, combo_name).reshape(-1, 3)
+        c2 = 8. * (shear[:, 0] - 2. * shear[:, 1] + shear[:, 2])
+        c1 = 2. * (shear[:, 2] - shear[:, 0]) - c2
+        c0 = shear[:, 1] - c1 / 2. - c2 / 4.
+        roots = []
+        with np.errstate(divide='ignore', invalid='ignore'):
+            linear = np.abs(c2) <= 1e-12 * np.max(np.abs(shear), axis=1)
+            roots.append(np.where(linear, -c0 / c1, np.nan))
+            discriminant = np.sqrt(c1 ** 2 - 4. * c2 * c0)
+            roots.append(np.where(linear, np.nan, (-c1 + discriminant) / (2. * c2)))
+            roots.append(np.where(linear, np.nan, (-c1 - discriminant) / (2. * c2)))
+            roots.append(np.where(linear, np.nan, -c1 / (2. * c2)))
+        roots = np.stack(roots, axis=1)
+        inside = np.isfinite(roots) & (roots > 0.) & (roots < 1.)
+        stationary = (x1[:, None] + (x2 - x1)[:, None] * roots)[inside]
+
+        return np.concatenate([key_points, stationary, np.linspace(0., L, self.n_points)])
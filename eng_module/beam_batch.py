@@ -0,0 +1,236 @@
+import argparse, json, os, sys
+from contextlib import nullcontext
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from eng_module.beams import build_beam
+from eng_module.beam_parser import BeamFileCache, load_beam_data
+from eng_module.beam_results import BeamResults, extract_results
+from eng_module.result_cache import ResultCache, canonical_key, open_cache, source_version
+from eng_module import instrumentation
+
+BEAM_FILE_PATTERN = ('beam_', '_strc.txt')
+
+# The modules and distributions whose changes invalidate the cached beam results
+RESULT_MODULES = ('beams', 'beam_analytical', 'beam_stiffness', 'beam_results', 'beam_batch')
+RESULT_DISTRIBUTIONS = ('PyNiteFEA', 'numpy')
+
+def find_beam_files(paths: list[str])-> list[str]:
+    """
+    Returns the beam files in 'paths'
+
+    'paths' - Beam files or directories. Directories are searched (not recursively)
+        for files named like 'beam_*_strc.txt'
+    """
+    beam_files = []
+    for path in paths:
+        if os.path.isdir(path):
+            prefix, suffix = BEAM_FILE_PATTERN
+            beam_files.extend(
+                os.path.join(path, file_name) for file_name in sorted(os.listdir(path))
+                if file_name.startswith(prefix) and file_name.endswith(suffix)
+            )
+        else:
+            beam_files.append(path)
+
+    return beam_files
+
+def extract_beam_results(beam_model, member_name: str)-> dict[str, dict]:
+    """
+    Returns a compact summary of the analysis results for each load combination
+
+    'beam_model' - An analyzed beam model
+    'member_name' - Name of the beam member in the model
+    """
+    member = beam_model.Members[member_name]
+    supported_nodes = [
+        node for node in beam_model.Nodes.values()
+        if node.support_DY or node.support_RZ
+    ]
+    results = {}
+    for combo in beam_model.LoadCombos:
+        results[combo] = {
+            'Reactions': [
+                {'Node': node.name, 'X': node.X, 'Fy': node.RxnFY[combo], 'Mz': node.RxnMZ[combo]}
+                for node in supported_nodes
+            ],
+            'Max Moment': member.max_moment('Mz', combo),
+            'Min Moment': member.min_moment('Mz', combo),
+            'Max Shear': member.max_shear('Fy', combo),
+            'Min Shear': member.min_shear('Fy', combo),
+            'Max Deflection': member.max_deflection('dy', combo),
+            'Min Deflection': member.min_deflection('dy', combo),
+        }
+
+    return results
+
+def analyze_beam_file(file_name: str, n_stations: int = 0)-> dict:
+    """
+    Returns the result record of the beam in 'file_name'.
+    Any error is stored in the record instead of being raised so one bad file
+    does not stop a batch.
+
+    'n_stations' - See analyze_beam_data
+    """
+    try:
+        beam_data = load_beam_data(file_name)
+    except Exception as err:
+        return {'File': file_name, 'Name': None, 'Results': None, 'Error': f'{type(err).__name__}: {err}'}
+
+    return analyze_beam_data(file_name, beam_data, n_stations)
+
+def analyze_beam_data(file_name: str, beam_data: dict, n_stations: int = 0)-> dict:
+    """
+    Returns the result record of the structured beam data read from 'file_name'.
+    Any error is stored in the record instead of being raised.
+
+    'n_stations' - If larger than 0, the diagrams sampled at 'n_stations' stations are
+        added to the record as a beam_results.BeamResults under 'Diagrams'
+    """
+    record = {'File': file_name, 'Name': beam_data['Name'], 'Results': None, 'Error': None}
+    try:
+        beam_model = build_beam(beam_data)
+        with instrumentation.stage('beam.solve'):
+            beam_model.analyze_linear()
+        with instrumentation.stage('beam.extract'):
+            record['Results'] = extract_beam_results(beam_model, beam_data['Name'])
+            if n_stations > 0:
+                record['Diagrams'] = extract_results(beam_model, beam_data['Name'], n_stations)
+    except Exception as err:
+        record['Error'] = f'{type(err).__name__}: {err}'
+
+    return record
+
+def _analyze_beam_item(item: tuple[str, dict|str], n_stations: int = 0)-> dict:
+    file_name, beam_data = item
+    if isinstance(beam_data, str):
+        return {'File': file_name, 'Name': None, 'Results': None, 'Error': beam_data}
+    return analyze_beam_data(file_name, beam_data, n_stations)
+
+def beam_result_key(beam_data: dict, n_stations: int = 0)-> str:
+    """
+    Returns the result cache key of the structured beam data analyzed with 'n_stations' stations
+    """
+    version = source_version(RESULT_MODULES, RESULT_DISTRIBUTIONS)
+    return canonical_key('beam', {'beam_data': beam_data, 'n_stations': n_stations}, version)
+
+def _read_beam_item(file_name: str, cache: BeamFileCache|None)-> tuple[str, dict|str]:
+    try:
+        if cache is None:
+            return file_name, load_beam_data(file_name)
+        return file_name, cache.load(file_name).to_beam_data()
+    except Exception as err:
+        return file_name, f'{type(err).__name__}: {err}'
+
+def run_beam_batch(
+    paths: list[str],
+    max_workers: int|None = None,
+    chunksize: int = 1,
+    cache_dir: str|None = None,
+    n_stations: int = 0,
+    result_cache: ResultCache|str|None = None,
+)-> list[dict]:
+    """
+    Returns the result records of all the beam files in 'paths', in the same order
+
+    'paths' - Beam files or directories with 'beam_*_strc.txt' files
+    'max_workers' - Number of worker processes. None uses one per CPU and 1 runs
+        the batch in this process
+    'chunksize' - Number of files sent to a worker at a time
+    'cache_dir' - Directory of a beam_parser.BeamFileCache. The files are then read
+        through the cache in this process and only the parsed data is sent to the workers
+    'n_stations' - If larger than 0, the sampled diagrams are added to the records (see analyze_beam_data)
+    'result_cache' - A result_cache.ResultCache or its file name. The files are then read in
+        this process and only the beams whose data is not in the cache (see beam_result_key)
+        are analyzed. The records without errors are added to the cache.
+    """
+    beam_files = find_beam_files(paths)
+    if cache_dir is None and result_cache is None:
+        function, items = analyze_beam_file, beam_files
+    else:
+        with BeamFileCache(cache_dir) if cache_dir is not None else nullcontext() as cache:
+            items = [_read_beam_item(file_name, cache) for file_name in beam_files]
+        function = _analyze_beam_item
+    if n_stations > 0:
+        function = partial(function, n_stations=n_stations)
+
+    result_cache, close_cache = open_cache(result_cache)
+    try:
+        keys, cached_records = [None] * len(items), {}
+        if result_cache is not None:
+            keys = [beam_result_key(beam_data, n_stations) if isinstance(beam_data, dict) else None for _, beam_data in items]
+            cached_records = result_cache.get_many([key for key in keys if key is not None])
+            instrumentation.count('result_cache.hits', len(cached_records))
+        missing = [idx for idx, key in enumerate(keys) if key not in cached_records]
+
+        if max_workers == 1 or not missing:
+            new_records = [function(items[idx]) for idx in missing]
+        else:
+            with ProcessPoolExecutor(max_workers=max_workers) as executor:
+                new_records = list(executor.map(function, [items[idx] for idx in missing], chunksize=chunksize))
+
+        records = [None] * len(items)
+        for idx, record in zip(missing, new_records):
+            records[idx] = record
+        for idx, key in enumerate(keys):
+            if key in cached_records:
+                records[idx] = cached_records[key] | {'File': items[idx][0]}
+        if result_cache is not None:
+            instrumentation.count('result_cache.misses', len(missing))
+            result_cache.put_many({
+                keys[idx]: record for idx, record in zip(missing, new_records)
+                if keys[idx] is not None and record['Error'] is None
+            })
+    finally:
+        if close_cache:
+            result_cache.close()
+
+    return records
+
+def main(argv: list[str]|None = None)-> int:
+    parser = argparse.ArgumentParser(description='Analyze a batch of beam files in parallel.')
+    parser.add_argument('paths', nargs='+', help="beam files or directories with 'beam_*_strc.txt' files")
+    parser.add_argument('--workers', type=int, default=None, help='number of worker processes (default: one per CPU)')
+    parser.add_argument('--chunksize', type=int, default=1, help='number of files sent to a worker at a time')
+    parser.add_argument('--output', default=None, help='JSON file for the results (default: stdout)')
+    parser.add_argument('--cache-dir', default=None, help='directory of the parsed beam file cache (default: no cache)')
+    parser.add_argument('--results-dir', default=None, help='directory to save the sampled diagrams of the beams to (see beam_results.BeamResults)')
+    parser.add_argument('--result-cache', default=None, help='SQLite file of the analysis result cache (default: no cache)')
+    parser.add_argument('--result-cache-size', type=float, default=1024., help='size limit of the result cache in MiB')
+    parser.add_argument('--stations', type=int, default=101, help='number of stations of the saved diagrams')
+    parser.add_argument('--instrumentation', default=None, help='JSON file for the stage timings, with the flame graph stacks next to it in a .folded file. The stages of the worker processes are only recorded with --workers 1')
+    parser.add_argument('--profile', default=None, help='file for the cProfile statistics of this process')
+    args = parser.parse_args(argv)
+
+    if args.instrumentation is not None or args.profile is not None:
+        instrumentation.enable(profile=args.profile is not None)
+    n_stations = args.stations if args.results_dir is not None else 0
+    result_cache = None
+    if args.result_cache is not None:
+        result_cache = ResultCache(args.result_cache, int(args.result_cache_size * 2 ** 20))
+    try:
+        records = run_beam_batch(args.paths, args.workers, args.chunksize, args.cache_dir, n_stations, result_cache)
+    finally:
+        if result_cache is not None:
+            result_cache.close()
+    diagrams = [record.pop('Diagrams') for record in records if 'Diagrams' in record]
+    if diagrams:
+        BeamResults.concatenate(diagrams).save(args.results_dir)
+    if args.instrumentation is not None:
+        instrumentation.save_json(args.instrumentation)
+        instrumentation.save_folded(os.path.splitext(args.instrumentation)[0] + '.folded')
+    if args.profile is not None:
+        instrumentation.dump_profile(args.profile)
+    if args.output is None:
+        json.dump(records, sys.stdout, indent=2)
+    else:
+        with open(args.output, 'w') as output_file:
+            json.dump(records, output_file, indent=2)
+
+    failed = [record for record in records if record['Error'] is not None]
+    for record in failed:
+        print(f"{record['File']}: {record['Error']}", file=sys.stderr)
+
+    return 1 if failed else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
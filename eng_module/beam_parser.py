@@ -0,0 +1,378 @@
+import hashlib, os, pickle, tempfile
+from dataclasses import dataclass
+from functools import lru_cache
+import numpy as np
+from eng_module.utils import CsvError, Field, Schema, TypedRecords, parse_typed_records
+from eng_module import instrumentation
+
+PARSER_VERSION = 2
+
+BEAM_ATTRIBUTES = ('L', 'E', 'Iz', 'Iy', 'A', 'J', 'nu', 'rho')
+
+SUPPORT_DTYPE = np.dtype([('location', 'f8'), ('support', 'U1')])
+
+LOAD_TYPES = {'POINT': 'Point', 'DIST': 'Dist'}
+
+# The values of each kind of line of a beam file. The attributes missing from the end
+# of the attributes line are 1.
+ATTRIBUTE_SCHEMA = Schema([Field('L', unit='mm')] + [Field(name, required=False, default=1.) for name in BEAM_ATTRIBUTES[1:]])
+
+SUPPORT_SCHEMA = Schema((Field('location', unit='mm'), Field('support', 'U1', choices=('P', 'F', 'R'))))
+
+LOAD_SCHEMAS = {
+    'Point': Schema((
+        Field('direction', 'U'),
+        Field('magnitude'),
+        Field('location', unit='mm'),
+        Field('case', 'U'),
+    )),
+    'Dist': Schema((
+        Field('direction', 'U'),
+        Field('start_magnitude'),
+        Field('end_magnitude'),
+        Field('start_location', unit='mm'),
+        Field('end_location', unit='mm'),
+        Field('case', 'U'),
+    )),
+}
+
+@dataclass
+class ParsedBeam:
+    """
+    The contents of a structured beam file ('beam_*_strc.txt')
+
+    'name' - Name of the beam
+    'attributes' - L, E, Iz, Iy, A, J, nu and rho of the beam, shape (8,)
+    'supports' - Structured array with the 'location' and 'support' type of each support
+    'loads' - Structured array of the loads in file order with the fields 'type' ('Point' or 'Dist'),
+        'direction', 'start_magnitude', 'end_magnitude', 'start_location', 'end_location' and 'case'.
+        The end magnitude and location of the point loads are equal to the start ones.
+    """
+    name: str
+    attributes: np.ndarray
+    supports: np.ndarray
+    loads: np.ndarray
+
+    def to_beam_data(self)-> dict:
+        """
+        Returns the structured beam data dictionary (see beams.get_structured_beam_data)
+        """
+        beam_data = {'Name': self.name}
+        beam_data.update(zip(BEAM_ATTRIBUTES, self.attributes.tolist()))
+        beam_data['Supports'] = dict(zip(self.supports['location'].tolist(), self.supports['support'].tolist()))
+        beam_data['Loads'] = load_dicts(self.loads)
+
+        return beam_data
+
+@instrumentation.timed('beam.parse')
+def parse_beam_text(text: str, file_name: str = '<string>')-> ParsedBeam:
+    """
+    Returns the ParsedBeam of the contents of a structured beam file, read in a single pass.
+    Blank lines are ignored and a ValueError naming the file and the lines is raised for
+    bad values and unknown load types (see parse_beam_records).
+
+    'text' - Contents of the beam file
+    'file_name' - Name of the file used in the error messages
+    """
+    lines = [(line_number, line.split(',')) for line_number, line in enumerate(text.splitlines(), 1) if line and not line.isspace()]
+
+    return parse_beam_records(lines, file_name)
+
+def parse_beam_records(records: list[tuple[int, list[str]]], file_name: str = '<records>')-> ParsedBeam:
+    """
+    Returns the ParsedBeam of the values of the lines of a structured beam file.
+    Each kind of line is parsed with its schema (ATTRIBUTE_SCHEMA, SUPPORT_SCHEMA and
+    LOAD_SCHEMAS) and a ValueError naming the file and the lines is raised for the bad values.
+
+    'records' - Line number and values of each line that is not blank
+    'file_name' - Name of the file used in the error messages
+    """
+    if len(records) < 3:
+        raise ValueError(f'{file_name}: a beam file needs a name, an attributes and a supports line')
+
+    name = records[0][1][0]
+    attributes = parse_attributes_line(records[1][1], records[1][0])
+    supports = parse_supports_line(records[2][1], records[2][0])
+    loads, load_errors = parse_load_lines(records[3:])
+    errors = attributes.errors + supports.errors + load_errors
+    if errors:
+        errors = sorted(errors, key=lambda error: error.line or 0)
+        raise ValueError(f"{file_name}, {'; '.join(str(error) for error in errors)}")
+
+    parsed_beam = ParsedBeam(
+        name = name,
+        attributes = np.array(attributes.data[0].tolist()),
+        supports = np.array(list(dict(supports.data.tolist()).items()), dtype=SUPPORT_DTYPE),
+        loads = loads,
+    )
+
+    return parsed_beam
+
+def parse_attributes_line(tokens: list[str], line_number: int|None = None)-> TypedRecords:
+    """
+    Returns the attributes line of a beam file parsed with ATTRIBUTE_SCHEMA.
+    The values after the last attribute are ignored.
+
+    'line_number' - Line number used in the errors, None if it is not known
+    """
+    return parse_typed_records([tokens], ATTRIBUTE_SCHEMA, lines=[line_number])
+
+def parse_supports_line(tokens: list[str], line_number: int|None = None)-> TypedRecords:
+    """
+    Returns the supports of the supports line of a beam file ('<location>:<type>' tokens)
+    parsed with SUPPORT_SCHEMA
+
+    'line_number' - Line number used in the errors, None if it is not known
+    """
+    support_tokens = [token.rpartition(':')[::2] for token in tokens]
+
+    return parse_typed_records(support_tokens, SUPPORT_SCHEMA, lines=[line_number] * len(support_tokens))
+
+def parse_load_lines(records: list[tuple[int|None, list[str]]])-> tuple[np.ndarray, list[CsvError]]:
+    """
+    Returns the loads of the load lines of a beam file as a structured array in line order
+    (see ParsedBeam.loads) and the errors of the bad lines, which are left out of it.
+    Each type of load is parsed with its schema of LOAD_SCHEMAS.
+
+    'records' - Line number (None if it is not known) and values of each load line
+    """
+    errors = []
+    load_rows = {load_type: ([], []) for load_type in LOAD_SCHEMAS}
+    for order, (line_number, tokens) in enumerate(records):
+        load_type, _, direction = tokens[0].strip().rpartition(':')
+        if load_type.upper() not in LOAD_TYPES:
+            errors.append(CsvError(line_number, 'type', load_type, f'unknown load type {load_type!r}'))
+            continue
+        load_type = LOAD_TYPES[load_type.upper()]
+        n_values = len(LOAD_SCHEMAS[load_type].fields) - 1
+        # The last value is the load case, as 'case:<name>'
+        case = [tokens[n_values].partition(':')[2]] if len(tokens) > n_values else []
+        load_rows[load_type][0].append([direction] + tokens[1:n_values] + case)
+        load_rows[load_type][1].append(order)
+
+    loads = []
+    for load_type, (rows, orders) in load_rows.items():
+        # The records are numbered by their position, so the loads can be put back in order
+        typed_loads = parse_typed_records(rows, LOAD_SCHEMAS[load_type], lines=orders)
+        for error in typed_loads.errors:
+            error.line = records[error.line][0]
+        errors += typed_loads.errors
+        for order, load in zip(typed_loads.lines.tolist(), typed_loads.data.tolist()):
+            if load_type == 'Point':
+                direction, magnitude, location, case = load
+                load = (direction, magnitude, magnitude, location, location, case)
+            loads.append((order, (load_type,) + tuple(load)))
+    loads = [load for _, load in sorted(loads, key=lambda item: item[0])]
+
+    return np.array(loads, dtype=_load_dtype(
+        max([len(load[1]) for load in loads], default=1),
+        max([len(load[-1]) for load in loads], default=1)
+    )), errors
+
+def load_dicts(loads: np.ndarray)-> list[dict]:
+    """
+    Returns the loads of a structured array of ParsedBeam.loads as the load dictionaries
+    of the structured beam data (see beams.get_structured_beam_data)
+    """
+    load_data = []
+    for load_type, direction, w1, w2, x1, x2, case in loads.tolist():
+        if load_type == 'Point':
+            load_data.append({'Type': 'Point', 'Direction': direction, 'Magnitude': w1, 'Location': x1, 'Case': case})
+        else:
+            load_data.append({
+                'Type': 'Dist',
+                'Direction': direction,
+                'Start Magnitude': w1,
+                'End Magnitude': w2,
+                'Start Location': x1,
+                'End Location': x2,
+                'Case': case
+            })
+
+    return load_data
+
+@lru_cache(maxsize=None)
+def _load_dtype(direction_width: int, case_width: int)-> np.dtype:
+    return np.dtype([
+        ('type', 'U5'),
+        ('direction', f'U{max(direction_width, 1)}'),
+        ('start_magnitude', 'f8'),
+        ('end_magnitude', 'f8'),
+        ('start_location', 'f8'),
+        ('end_location', 'f8'),
+        ('case', f'U{max(case_width, 1)}'),
+    ])
+
+def parse_beam_file(file_name: str)-> ParsedBeam:
+    """
+    Returns the ParsedBeam of a structured beam file
+    """
+    with instrumentation.stage('beam.read'):
+        with open(file_name, 'r') as beam_file:
+            text = beam_file.read()
+
+    return parse_beam_text(text, file_name)
+
+class BeamFileCache:
+    """
+    An on-disk cache of parsed beam files, stored as a single index file in 'directory'.
+
+    The index keeps the modification time, size and content hash of each beam file
+    with its parsed supports and loads packed into a few arrays, so it loads in one read.
+    A file whose modification time and size are unchanged is not read at all.
+    Otherwise its content hash is compared and the file is only parsed again if
+    its contents changed.
+
+    The new entries are written by save() (or on leaving a 'with' block), merged with
+    the entries saved by other processes in the meantime. The index is written to a
+    temporary file and moved into place, so a reader never sees a partially written index.
+    Entries saved concurrently by two processes may be lost, and are parsed again next time.
+
+    The index is a pickle, so the cache directory must not be writable by untrusted users.
+    """
+    INDEX_NAME = 'parsed_beams.pkl'
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        self.index_name = os.path.join(directory, self.INDEX_NAME)
+        self.hits = 0
+        self.misses = 0
+        self._new_entries = {}
+        os.makedirs(directory, exist_ok=True)
+        self._stored_entries = self._read_index()
+
+    def __enter__(self)-> 'BeamFileCache':
+        return self
+
+    def __exit__(self, *exc_info):
+        self.save()
+
+    def load(self, file_name: str)-> ParsedBeam:
+        """
+        Returns the ParsedBeam of 'file_name' from the cache, parsing the file if needed
+        """
+        path = os.path.abspath(file_name)
+        stat = os.stat(path)
+        entry = self._new_entries.get(path) or self._stored_entries.get(path)
+        if entry is not None and entry[:2] == (stat.st_mtime_ns, stat.st_size):
+            self.hits += 1
+            instrumentation.count('beam_cache.hits')
+            return entry[3]
+
+        with open(path, 'rb') as beam_file:
+            content = beam_file.read()
+        content_hash = hashlib.sha256(content).hexdigest()
+        if entry is not None and entry[2] == content_hash:
+            self.hits += 1
+            instrumentation.count('beam_cache.hits')
+            parsed_beam = entry[3]
+        else:
+            self.misses += 1
+            instrumentation.count('beam_cache.misses')
+            parsed_beam = parse_beam_text(content.decode(), file_name)
+        self._new_entries[path] = (stat.st_mtime_ns, stat.st_size, content_hash, parsed_beam)
+
+        return parsed_beam
+
+    def save(self):
+        """
+        Writes the entries added since the cache was opened to the index
+        """
+        if not self._new_entries:
+            return
+        entries = self._read_index() | self._new_entries
+        file_descriptor, temporary_name = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+        try:
+            with os.fdopen(file_descriptor, 'wb') as index_file:
+                pickle.dump(_pack_entries(entries), index_file, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(temporary_name, self.index_name)
+        except BaseException:
+            os.remove(temporary_name)
+            raise
+        self._stored_entries = entries
+        self._new_entries = {}
+
+    def clear(self):
+        """
+        Removes all the entries of the cache
+        """
+        if os.path.exists(self.index_name):
+            os.remove(self.index_name)
+        self._stored_entries = {}
+        self._new_entries = {}
+
+    def __len__(self)-> int:
+        return len(self._stored_entries.keys() | self._new_entries.keys())
+
+    def _read_index(self)-> dict[str, tuple]:
+        try:
+            with open(self.index_name, 'rb') as index_file:
+                packed = pickle.load(index_file)
+        except FileNotFoundError:
+            return {}
+        except Exception:
+            # A corrupt index is rebuilt from the beam files
+            return {}
+        if not isinstance(packed, dict) or packed.get('version') != PARSER_VERSION:
+            return {}
+        return _unpack_entries(packed)
+
+def _pack_entries(entries: dict[str, tuple])-> dict:
+    """
+    Returns the cache entries with the supports and loads of all the beams concatenated
+    """
+    beams = [entry[3] for entry in entries.values()]
+    load_dtype = _load_dtype(
+        max([beam.loads.dtype['direction'].itemsize // 4 for beam in beams], default=1),
+        max([beam.loads.dtype['case'].itemsize // 4 for beam in beams], default=1)
+    )
+    packed = {
+        'version': PARSER_VERSION,
+        'paths': list(entries),
+        'mtime_ns': np.array([entry[0] for entry in entries.values()], dtype=np.int64),
+        'size': np.array([entry[1] for entry in entries.values()], dtype=np.int64),
+        'content_hash': [entry[2] for entry in entries.values()],
+        'name': [beam.name for beam in beams],
+        'attributes': np.array([beam.attributes for beam in beams]).reshape(-1, len(BEAM_ATTRIBUTES)),
+        'support_count': np.array([len(beam.supports) for beam in beams], dtype=np.int64),
+        'supports': np.concatenate([beam.supports for beam in beams] or [np.empty(0, SUPPORT_DTYPE)]),
+        'load_count': np.array([len(beam.loads) for beam in beams], dtype=np.int64),
+        'loads': np.concatenate([beam.loads.astype(load_dtype) for beam in beams] or [np.empty(0, load_dtype)]),
+    }
+
+    return packed
+
+def _unpack_entries(packed: dict)-> dict[str, tuple]:
+    """
+    Returns the cache entries of a packed index. The ParsedBeam arrays are views of the packed arrays.
+    """
+    support_ends = np.cumsum(packed['support_count']).tolist()
+    load_ends = np.cumsum(packed['load_count']).tolist()
+    entries = {}
+    support_start = load_start = 0
+    for idx, path in enumerate(packed['paths']):
+        parsed_beam = ParsedBeam(
+            name = packed['name'][idx],
+            attributes = packed['attributes'][idx],
+            supports = packed['supports'][support_start:support_ends[idx]],
+            loads = packed['loads'][load_start:load_ends[idx]]
+        )
+        entries[path] = (int(packed['mtime_ns'][idx]), int(packed['size'][idx]), packed['content_hash'][idx], parsed_beam)
+        support_start, load_start = support_ends[idx], load_ends[idx]
+
+    return entries
+
+def load_beam_data(file_name: str, cache: BeamFileCache|str|None = None)-> dict:
+    """
+    Returns the structured beam data dictionary of a structured beam file
+
+    'file_name' - Name of the beam file
+    'cache' - A BeamFileCache or the directory of one. None parses the file every time
+    """
+    if cache is None:
+        return parse_beam_file(file_name).to_beam_data()
+    if isinstance(cache, str):
+        with BeamFileCache(cache) as directory_cache:
+            return directory_cache.load(file_name).to_beam_data()
+
+    return cache.load(file_name).to_beam_data()
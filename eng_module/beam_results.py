@@ -0,0 +1,189 @@
+import json, os
+from dataclasses import dataclass
+import numpy as np
+from eng_module.beams import build_beam
+from eng_module.beam_analytical import AnalyticalBeamMember
+from eng_module import instrumentation
+
+FORMAT_VERSION = 1
+
+METADATA_NAME = 'metadata.json'
+
+ARRAY_NAMES = ('x', 'shear', 'moment', 'deflection', 'reaction_beam', 'reaction_x', 'reaction_FY', 'reaction_MZ')
+
+DIAGRAMS = {'shear': ('Fy', 'shear_array'), 'moment': ('Mz', 'moment_array'), 'deflection': ('dy', 'deflection_array')}
+
+@dataclass
+class BeamResults:
+    """
+    The sampled results of B beams for C load combinations at S stations, in contiguous arrays.
+    The results of one beam are those of its beam member. The signs are those of the PyNite
+    member result methods, so the moment is positive when hogging.
+
+    'beams' - Names of the beams, length B
+    'combos' - Names of the load combinations, length C
+    'x' - Locations of the stations along each beam, shape (B, S)
+    'shear', 'moment', 'deflection' - Shear (Fy), moment (Mz) and deflection (dy), shape (B, C, S)
+    'reaction_beam' - Index of the beam of each supported node, shape (R,)
+    'reaction_x' - Location of each supported node, shape (R,)
+    'reaction_FY', 'reaction_MZ' - Force and moment reactions of the supported nodes, shape (C, R)
+    """
+    beams: list[str]
+    combos: list[str]
+    x: np.ndarray
+    shear: np.ndarray
+    moment: np.ndarray
+    deflection: np.ndarray
+    reaction_beam: np.ndarray
+    reaction_x: np.ndarray
+    reaction_FY: np.ndarray
+    reaction_MZ: np.ndarray
+
+    def __len__(self)-> int:
+        return len(self.beams)
+
+    @property
+    def nbytes(self)-> int:
+        """
+        Size of the result arrays in bytes
+        """
+        return sum(getattr(self, name).nbytes for name in ARRAY_NAMES)
+
+    def index(self, beam_name: str)-> int:
+        """
+        Returns the index of the beam named 'beam_name'
+        """
+        return self.beams.index(beam_name)
+
+    def extremes(self)-> dict[str, np.ndarray]:
+        """
+        Returns the largest and smallest sampled shear, moment and deflection of each beam and
+        load combination, shape (B, C), with the keys of beam_batch.extract_beam_results.
+        The extremes between the stations are missed, so use enough stations.
+        """
+        extremes = {}
+        for name in ('moment', 'shear', 'deflection'):
+            values = getattr(self, name)
+            extremes[f'Max {name.title()}'] = values.max(axis=-1)
+            extremes[f'Min {name.title()}'] = values.min(axis=-1)
+
+        return extremes
+
+    @classmethod
+    def concatenate(cls, list_of_results: list['BeamResults'])-> 'BeamResults':
+        """
+        Returns the results of all the beams of 'list_of_results', which must have the
+        same load combinations and number of stations
+        """
+        if not list_of_results:
+            raise ValueError('There are no results to concatenate')
+        combos = list_of_results[0].combos
+        if any(results.combos != combos for results in list_of_results):
+            raise ValueError('The results to concatenate must have the same load combinations')
+        offsets = np.cumsum([0] + [len(results) for results in list_of_results[:-1]])
+
+        return cls(
+            beams = [name for results in list_of_results for name in results.beams],
+            combos = list(combos),
+            x = np.concatenate([results.x for results in list_of_results]),
+            shear = np.concatenate([results.shear for results in list_of_results]),
+            moment = np.concatenate([results.moment for results in list_of_results]),
+            deflection = np.concatenate([results.deflection for results in list_of_results]),
+            reaction_beam = np.concatenate([results.reaction_beam + offset for results, offset in zip(list_of_results, offsets)]),
+            reaction_x = np.concatenate([results.reaction_x for results in list_of_results]),
+            reaction_FY = np.concatenate([results.reaction_FY for results in list_of_results], axis=1),
+            reaction_MZ = np.concatenate([results.reaction_MZ for results in list_of_results], axis=1),
+        )
+
+    def save(self, directory: str):
+        """
+        Saves the results to 'directory' as one .npy file per array and a JSON file with the
+        names of the beams and load combinations. The JSON file is written last, so a
+        directory without it does not hold complete results.
+        """
+        os.makedirs(directory, exist_ok=True)
+        metadata_name = os.path.join(directory, METADATA_NAME)
+        if os.path.exists(metadata_name):
+            os.remove(metadata_name)
+        for name in ARRAY_NAMES:
+            np.save(os.path.join(directory, f'{name}.npy'), np.ascontiguousarray(getattr(self, name)))
+        with open(metadata_name, 'w') as metadata_file:
+            json.dump({'version': FORMAT_VERSION, 'beams': self.beams, 'combos': self.combos}, metadata_file)
+
+    @classmethod
+    def load(cls, directory: str, mmap_mode: str|None = 'r')-> 'BeamResults':
+        """
+        Returns the results saved in 'directory'
+
+        'mmap_mode' - Memory-map mode of the arrays (see numpy.load). With the default 'r'
+            the arrays are read-only and only the parts that are used are read from disk.
+            None reads the arrays into memory.
+        """
+        with open(os.path.join(directory, METADATA_NAME), 'r') as metadata_file:
+            metadata = json.load(metadata_file)
+        if metadata.get('version') != FORMAT_VERSION:
+            raise ValueError(f"{directory} holds beam results of format version {metadata.get('version')}, not {FORMAT_VERSION}")
+        arrays = {name: np.load(os.path.join(directory, f'{name}.npy'), mmap_mode=mmap_mode) for name in ARRAY_NAMES}
+
+        return cls(beams=metadata['beams'], combos=metadata['combos'], **arrays)
+
+def extract_results(beam_model, member_name: str, n_stations: int = 101, combos: list[str]|None = None)-> BeamResults:
+    """
+    Returns the results of the beam member 'member_name' of an analyzed beam model,
+    sampled at 'n_stations' equally spaced stations. The model is not needed afterwards.
+
+    'combos' - Names of the load combinations, all the combinations of the model if None
+
+    The closed-form and stiffness models evaluate all the stations and combinations at once.
+    The results of a PyNite model are read with its member array methods.
+    """
+    combos = list(beam_model.LoadCombos) if combos is None else list(combos)
+    member = beam_model.Members[member_name]
+    if isinstance(member, AnalyticalBeamMember):
+        sampled = member.sample(n_stations, combos)
+        x = sampled['x']
+        diagrams = {name: sampled[name.title()] for name in DIAGRAMS}
+    else:
+        x = np.linspace(0., member.L(), n_stations)
+        diagrams = {
+            name: np.array([getattr(member, method)(direction, n_stations, combo)[1] for combo in combos]).reshape(len(combos), n_stations)
+            for name, (direction, method) in DIAGRAMS.items()
+        }
+
+    supported_nodes = [node for node in beam_model.Nodes.values() if node.support_DY or node.support_RZ]
+
+    return BeamResults(
+        beams = [member_name],
+        combos = combos,
+        x = x[None, :],
+        shear = diagrams['shear'][None],
+        moment = diagrams['moment'][None],
+        deflection = diagrams['deflection'][None],
+        reaction_beam = np.zeros(len(supported_nodes), dtype=np.int64),
+        reaction_x = np.array([node.X for node in supported_nodes], dtype=float),
+        reaction_FY = np.array([[node.RxnFY[combo] for node in supported_nodes] for combo in combos]).reshape(len(combos), -1),
+        reaction_MZ = np.array([[node.RxnMZ[combo] for node in supported_nodes] for combo in combos]).reshape(len(combos), -1),
+    )
+
+def analyze_beams(
+    list_of_beam_data: list[dict],
+    n_stations: int = 101,
+    solver: str = 'auto',
+    load_combos: dict[str, dict[str, float]]|None = None,
+)-> BeamResults:
+    """
+    Returns the results of the beams in 'list_of_beam_data'. Each model is dropped as soon as its
+    results are extracted, so only the result arrays are kept in memory.
+
+    'solver', 'load_combos' - See beams.build_beam. Without 'load_combos' every beam has
+        the default 'Combo 1'
+    """
+    list_of_results = []
+    for beam_data in list_of_beam_data:
+        beam_model = build_beam(beam_data, solver, load_combos)
+        with instrumentation.stage('beam.solve'):
+            beam_model.analyze_linear()
+        with instrumentation.stage('beam.extract'):
+            list_of_results.append(extract_results(beam_model, beam_data['Name'], n_stations))
+
+    return BeamResults.concatenate(list_of_results)
@@ -0,0 +1,264 @@
+import numpy as np
+from eng_module.beam_analytical import AnalyticalBeamModel, SingleSpanBeams, _bracket, is_stable
+
+GAUSS_POINTS, GAUSS_WEIGHTS = np.polynomial.legendre.leggauss(3)
+
+# Number of superdiagonals of the stiffness matrix: the degrees of freedom of an element
+# are the deflection and rotation of its two nodes
+BANDWIDTH = 3
+
+def hermite_shape_functions(xi: np.ndarray, Le: np.ndarray)-> np.ndarray:
+    """
+    Returns the cubic Hermite shape functions of a beam element for the deflection
+    and rotation of its start node and the deflection and rotation of its end node, shape (..., 4)
+
+    'xi' - Location along the element divided by its length
+    'Le' - Length of the element, broadcast against 'xi'
+    """
+    xi = np.asarray(xi, dtype=float)
+    Le = np.broadcast_to(Le, xi.shape)
+
+    return np.stack([
+        1. - 3. * xi ** 2 + 2. * xi ** 3,
+        Le * (xi - 2. * xi ** 2 + xi ** 3),
+        3. * xi ** 2 - 2. * xi ** 3,
+        Le * (xi ** 3 - xi ** 2),
+    ], axis=-1)
+
+def element_dofs(n_elements: int)-> np.ndarray:
+    """
+    Returns the global degrees of freedom (deflection and rotation of each node) of each element, shape (n_elements, 4)
+    """
+    return 2 * np.arange(n_elements)[:, None] + np.arange(4)
+
+def element_stiffness(node_x: np.ndarray, EI: float)-> np.ndarray:
+    """
+    Returns the bending stiffness matrix of each element of a beam with nodes at 'node_x', shape (n_elements, 4, 4)
+    """
+    Le = np.diff(node_x)[:, None, None]
+    k = np.array([
+        [12., 6., -12., 6.],
+        [6., 4., -6., 2.],
+        [-12., -6., 12., -6.],
+        [6., 2., -6., 4.],
+    ])
+    # The rows and columns of the rotations are multiplied by the element length
+    powers = np.array([0, 1, 0, 1])
+
+    return EI * k * Le ** (powers[:, None] + powers[None, :]) / Le ** 3
+
+def banded_stiffness(k_elements: np.ndarray)-> np.ndarray:
+    """
+    Returns the stiffness matrix assembled from the element matrices 'k_elements' in the upper
+    banded storage of scipy.linalg.solveh_banded, shape (BANDWIDTH + 1, 2 * n_nodes).
+    Entry (i, j) of the matrix is stored at [BANDWIDTH + i - j, j].
+    """
+    n_elements = len(k_elements)
+    dofs = element_dofs(n_elements)
+    i, j = np.triu_indices(4)
+    ab = np.zeros((BANDWIDTH + 1, 2 * n_elements + 2))
+    np.add.at(ab, (BANDWIDTH + i - j, dofs[:, j]), k_elements[:, i, j])
+
+    return ab
+
+def _group_pairs(groups: np.ndarray, n_groups: int, query_groups: np.ndarray)-> tuple[np.ndarray, np.ndarray]:
+    """
+    Returns the index pairs (query, item) of every item in 'groups' that is in the group of a query in 'query_groups'
+    """
+    order = np.argsort(groups, kind='stable')
+    counts = np.bincount(groups, minlength=n_groups)
+    starts = np.cumsum(counts) - counts
+    n_matches = counts[query_groups]
+    queries = np.repeat(np.arange(len(query_groups)), n_matches)
+    offsets = np.arange(len(queries)) - np.repeat(np.cumsum(n_matches) - n_matches, n_matches)
+
+    return queries, order[np.repeat(starts[query_groups], n_matches) + offsets]
+
+def element_point_loads(node_x: np.ndarray, beams: SingleSpanBeams)-> tuple[np.ndarray, ...]:
+    """
+    Returns the element, load case, magnitude and location of the point loads of the first
+    beam of 'beams', shape (n_loads,) each. A load at a node belongs to the element starting there.
+    """
+    n_cases, n_point = beams.point_P.shape[1:]
+    P, x = beams.point_P[0].ravel(), beams.point_x[0].ravel()
+    case = np.repeat(np.arange(n_cases), n_point)
+    keep = P != 0.
+    P, x, case = P[keep], x[keep], case[keep]
+    element = np.clip(np.searchsorted(node_x, x, side='right') - 1, 0, len(node_x) - 2)
+
+    return element, case, P, x
+
+def element_distributed_loads(node_x: np.ndarray, beams: SingleSpanBeams)-> tuple[np.ndarray, ...]:
+    """
+    Returns the parts of the distributed loads of the first beam of 'beams' on each element:
+    element, load case, start and end magnitude and start and end location, shape (n_parts,) each.
+    Each load is only split over the elements it covers.
+    """
+    n_cases, n_dist = beams.dist_w1.shape[1:]
+    w1, w2, x1, x2 = (values[0].ravel() for values in (beams.dist_w1, beams.dist_w2, beams.dist_x1, beams.dist_x2))
+    case = np.repeat(np.arange(n_cases), n_dist)
+    keep = (x2 > x1) & ((w1 != 0.) | (w2 != 0.))
+    w1, w2, x1, x2, case = w1[keep], w2[keep], x1[keep], x2[keep], case[keep]
+
+    n_elements = len(node_x) - 1
+    first = np.clip(np.searchsorted(node_x, x1, side='right') - 1, 0, n_elements - 1)
+    last = np.clip(np.searchsorted(node_x, x2, side='left') - 1, first, n_elements - 1)
+    n_parts = last - first + 1
+    load = np.repeat(np.arange(len(first)), n_parts)
+    element = first[load] + np.arange(len(load)) - np.repeat(np.cumsum(n_parts) - n_parts, n_parts)
+
+    start = np.maximum(x1[load], node_x[element])
+    end = np.minimum(x2[load], node_x[element + 1])
+    slope = (w2 - w1)[load] / (x2 - x1)[load]
+    keep = end > start
+    load, element, start, end, slope = load[keep], element[keep], start[keep], end[keep], slope[keep]
+
+    return element, case[load], w1[load] + slope * (start - x1[load]), w1[load] + slope * (end - x1[load]), start, end
+
+def element_load_vectors(node_x: np.ndarray, beams: SingleSpanBeams)-> np.ndarray:
+    """
+    Returns the consistent nodal loads of each element and load case of the first beam of 'beams', shape (n_elements, 4, K).
+    The loads are integrated exactly, so the nodal displacements of the solution are exact.
+    """
+    n_elements = len(node_x) - 1
+    xa, Le = node_x[:-1], np.diff(node_x)
+    loads = np.zeros((n_elements, beams.point_P.shape[1], 4))
+
+    element, case, P, x = element_point_loads(node_x, beams)
+    N = hermite_shape_functions((x - xa[element]) / Le[element], Le[element])
+    np.add.at(loads, (element, case), P[:, None] * N)
+
+    # The distributed loads are integrated with a 3 point Gauss rule on their part of each element
+    element, case, w1, w2, start, end = element_distributed_loads(node_x, beams)
+    half = ((end - start) / 2.)[:, None]
+    t = (1. + GAUSS_POINTS) / 2.
+    x_gauss = start[:, None] + 2. * half * t
+    w = (w1[:, None] + (w2 - w1)[:, None] * t) * half * GAUSS_WEIGHTS
+    N = hermite_shape_functions((x_gauss - xa[element, None]) / Le[element, None], Le[element, None])
+    np.add.at(loads, (element, case), (w[..., None] * N).sum(axis=1))
+
+    return np.swapaxes(loads, 1, 2)
+
+class ContinuousBeams(SingleSpanBeams):
+    """
+    A SingleSpanBeams batch of one beam solved by the stiffness method (see StiffnessBeamModel.solve_cases).
+
+    'node_x' - Location of the nodes, shape (n_nodes,)
+    'displacements' - Deflection and rotation of each node per load case, shape (2 * n_nodes, K)
+    'end_forces' - Force and counterclockwise moment applied to each element by the nodes at its
+        start and end, without the loads on the element, shape (n_elements, 4, K)
+
+    The diagrams are built from the state of the element at its start node and the loads on the
+    element only, so they cost O(S + n_loads) instead of O(S * (n_supports + n_loads)).
+    """
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.node_x = None
+        self.displacements = None
+        self.end_forces = None
+
+    def diagram(self, x: np.ndarray, level: int, inclusive: bool = True)-> np.ndarray:
+        """
+        Returns a diagram of the beam for every load case at the locations 'x' (see SingleSpanBeams.diagram)
+        """
+        if self.end_forces is None:
+            return super().diagram(x, level, inclusive)
+        x = np.asarray(x, dtype=float)[0]
+        n_elements, _, n_cases = self.end_forces.shape
+        EI = self.E[0] * self.Iz[0]
+        # Right at a node the element starting (inclusive) or ending (exclusive) there is used
+        element = np.clip(np.searchsorted(self.node_x, x, side='right' if inclusive else 'left') - 1, 0, n_elements - 1)
+        d = x - self.node_x[element]
+
+        # The forces at the end node only act right at the end of the beam
+        forces = self.end_forces[element]
+        values = np.zeros((n_cases, len(x)))
+        for start, offset in ((0, d), (2, d - np.diff(self.node_x)[element])):
+            values += forces[:, start].T * _bracket(offset, level, inclusive)
+            if level >= 1:
+                values -= forces[:, start + 1].T * _bracket(offset, level - 1, inclusive)
+        if level >= 2:
+            values += EI * self.displacements[2 * element + 1].T * d ** (level - 2)
+        if level == 3:
+            values += EI * self.displacements[2 * element].T
+
+        effects = []
+        load_element, case, P, load_x = element_point_loads(self.node_x, self)
+        station, load = _group_pairs(load_element, n_elements, element)
+        a = load_x[load] - self.node_x[element[station]]
+        effects.append((case[load], station, P[load] * _bracket(d[station] - a, level, inclusive)))
+
+        load_element, case, w1, w2, start, end = element_distributed_loads(self.node_x, self)
+        station, load = _group_pairs(load_element, n_elements, element)
+        x1, x2 = (values[load] - self.node_x[element[station]] for values in (start, end))
+        slope = (w2 - w1)[load] / (x2 - x1)
+        effects.append((case[load], station, (
+            w1[load] * _bracket(d[station] - x1, level + 1) + slope * _bracket(d[station] - x1, level + 2)
+            - w2[load] * _bracket(d[station] - x2, level + 1) - slope * _bracket(d[station] - x2, level + 2)
+        )))
+        for case, station, effect in effects:
+            values += np.bincount(case * len(x) + station, effect, minlength=n_cases * len(x)).reshape(n_cases, len(x))
+        if level >= 2:
+            values /= EI
+
+        return values[None]
+
+class StiffnessBeamModel(AnalyticalBeamModel):
+    """
+    A beam with any number of supports, solved by the direct stiffness method with
+    one cubic beam element between consecutive nodes. It has the interface of AnalyticalBeamModel.
+
+    The stiffness matrix does not depend on the loads, so it is assembled and
+    factorized once and all the load cases are solved together as right-hand sides.
+    The matrix is banded, so the assembly and the solve are linear in the number of nodes
+    and beams with thousands of supports are solved in a fraction of a second.
+    The load combinations are superpositions of the load cases, so they need no solve at all.
+    The diagrams between the nodes are exact: they are built from the element end forces
+    and the loads on each element with singularity functions (see ContinuousBeams).
+    """
+    def solve_cases(self)-> ContinuousBeams:
+        """
+        Returns a ContinuousBeams batch of the beam with one entry per load case,
+        with the reactions found by the stiffness method
+        """
+        from scipy.linalg import solveh_banded
+
+        beams = ContinuousBeams.from_beam_data([self.beam_data], self.cases)
+        if not np.all(is_stable(beams.support_x, beams.support_fixed, beams.support_active)):
+            raise ValueError('The beam needs two supports at different locations or one fixed support')
+        EI = self.beam_data['E'] * self.beam_data['Iz']
+        node_x = np.unique([node.X for node in self.Nodes.values()])
+
+        support_nodes = np.searchsorted(node_x, beams.support_x[0])
+        restrained = np.concatenate([2 * support_nodes, 2 * support_nodes[beams.support_fixed[0]] + 1])
+
+        k_elements = element_stiffness(node_x, EI)
+        element_loads = element_load_vectors(node_x, beams)
+        dofs = element_dofs(len(k_elements))
+        F = np.zeros((2 * len(node_x), element_loads.shape[2]))
+        np.add.at(F, dofs, element_loads)
+
+        # The restrained degrees of freedom keep their place in the band with a unit
+        # diagonal and no coupling, so their displacements solve to zero
+        ab = banded_stiffness(k_elements)
+        ab[:BANDWIDTH, restrained] = 0.
+        for offset in range(1, BANDWIDTH + 1):
+            columns = restrained + offset
+            ab[BANDWIDTH - offset, columns[columns < ab.shape[1]]] = 0.
+        ab[BANDWIDTH, restrained] = 1.
+        F[restrained] = 0.
+        u = solveh_banded(ab, F, check_finite=False)
+
+        end_forces = k_elements @ u[dofs] - element_loads
+        residual = np.zeros(u.shape)
+        np.add.at(residual, dofs, end_forces)
+        reactions = residual[restrained]
+
+        n_supports = len(support_nodes)
+        beams.reactions = reactions[:n_supports].T[None]
+        beams.couples = np.zeros(beams.reactions.shape)
+        beams.couples[0][:, beams.support_fixed[0]] = reactions[n_supports:].T
+        beams.constants = (EI * np.stack([u[1], u[0]], axis=-1))[None]
+        beams.node_x, beams.displacements, beams.end_forces = node_x, u, end_forces
+
+        return beams
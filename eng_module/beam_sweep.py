@@ -0,0 +1,248 @@
+import re
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+import numpy as np
+from eng_module.beam_analytical import SUPPORT_FIXITY, SingleSpanBeams, is_plane_beam, is_stable, load_cases
+from eng_module import instrumentation
+
+RESULT_FIELDS = ('Max Moment', 'Min Moment', 'Max Shear', 'Min Shear', 'Max Deflection', 'Min Deflection')
+
+PARAMETER_PATTERN = re.compile(r'^(L|E|Iz|Support (\d+)|Load (\d+))$')
+
+def cartesian_grid(axes: dict[str, np.ndarray])-> dict[str, np.ndarray]:
+    """
+    Returns every combination of the values of 'axes' as one flat array per parameter,
+    with the last parameter varying fastest
+    """
+    grids = np.meshgrid(*[np.asarray(values, dtype=float) for values in axes.values()], indexing='ij')
+
+    return {name: grid.ravel() for name, grid in zip(axes, grids)}
+
+def latin_hypercube(ranges: dict[str, tuple[float, float]], n_samples: int, seed: int = 0)-> dict[str, np.ndarray]:
+    """
+    Returns 'n_samples' Latin hypercube samples of the parameters uniformly distributed
+    between the (low, high) bounds of 'ranges': each parameter has one sample in each of
+    'n_samples' equal intervals, in an independent random order
+    """
+    rng = np.random.default_rng(seed)
+    samples = {}
+    for name, (low, high) in ranges.items():
+        fractions = (rng.permutation(n_samples) + rng.uniform(size=n_samples)) / n_samples
+        samples[name] = low + (high - low) * fractions
+
+    return samples
+
+def check_parameters(beam_data: dict, parameters: dict[str, np.ndarray])-> int:
+    """
+    Returns the number of points of the sweep, checking the parameter names against the beam.
+    The names are 'L', 'E', 'Iz', 'Support i' (location of the i-th support from the start
+    of the beam) and 'Load i' (factor on the magnitude of the i-th load of the beam file), from 1.
+    """
+    if not is_plane_beam(beam_data):
+        raise ValueError('The sweep needs a beam bending in its plane (see beam_analytical.is_plane_beam)')
+    sizes = {np.shape(values) for values in parameters.values()}
+    if len(sizes) != 1 or len(next(iter(sizes))) != 1:
+        raise ValueError('The parameters must be flat arrays of the same length')
+    for name in parameters:
+        match = PARAMETER_PATTERN.match(name)
+        if match is None:
+            raise ValueError(f"Unknown sweep parameter {name}. The parameters are 'L', 'E', 'Iz', 'Support i' and 'Load i'")
+        if match.group(2) is not None and not 1 <= int(match.group(2)) <= len(beam_data['Supports']):
+            raise ValueError(f"{name} is not a support of the beam, which has {len(beam_data['Supports'])}")
+        if match.group(3) is not None and not 1 <= int(match.group(3)) <= len(beam_data['Loads']):
+            raise ValueError(f"{name} is not a load of the beam, which has {len(beam_data['Loads'])}")
+
+    return next(iter(sizes))[0]
+
+def unit_load_beams(beam_data: dict, L: np.ndarray, support_x: np.ndarray)-> SingleSpanBeams:
+    """
+    Returns the G beams of length 'L' and supports at 'support_x' (G, n_supports) with the
+    supports and loads of 'beam_data' and EI = 1. Each load of the beam is its own load case,
+    with its locations scaled with the length of the beam.
+    """
+    n_beams = len(L)
+    supports = [support for _, support in sorted(beam_data['Supports'].items())]
+    scale = (L / beam_data['L'])[:, None]
+    loads = beam_data['Loads']
+    point_loads = [kdx for kdx, load in enumerate(loads) if load['Type'].upper() == 'POINT']
+    dist_loads = [kdx for kdx, load in enumerate(loads) if load['Type'].upper() == 'DIST']
+    point = np.zeros((2, n_beams, len(loads), max(len(point_loads), 1)))
+    dist = np.zeros((4, n_beams, len(loads), max(len(dist_loads), 1)))
+    for jdx, kdx in enumerate(point_loads):
+        point[0, :, kdx, jdx] = loads[kdx]['Magnitude']
+        point[1, :, kdx, jdx] = loads[kdx]['Location'] * scale[:, 0]
+    for jdx, kdx in enumerate(dist_loads):
+        dist[0, :, kdx, jdx] = loads[kdx]['Start Magnitude']
+        dist[1, :, kdx, jdx] = loads[kdx]['End Magnitude']
+        dist[2, :, kdx, jdx] = loads[kdx]['Start Location'] * scale[:, 0]
+        dist[3, :, kdx, jdx] = loads[kdx]['End Location'] * scale[:, 0]
+
+    return SingleSpanBeams(
+        L, np.ones(n_beams), np.ones(n_beams), support_x,
+        np.broadcast_to([SUPPORT_FIXITY[support] for support in supports], support_x.shape),
+        np.ones(support_x.shape, dtype=bool),
+        *point, *dist
+    )
+
+def evaluate_sweep(
+    beam_data: dict,
+    parameters: dict[str, np.ndarray],
+    load_combos: dict[str, dict[str, float]]|None = None,
+    n_stations: int = 101,
+    max_moment: float|None = None,
+    deflection_ratio: float|None = None,
+)-> dict[str, np.ndarray]:
+    """
+    Returns the results of the points of a sweep (see run_sweep) in this process: the
+    envelopes of RESULT_FIELDS over the load combinations and 'Passed', shape (N,)
+    """
+    n_points = check_parameters(beam_data, parameters)
+    sorted_supports = sorted(beam_data['Supports'])
+    L = np.broadcast_to(np.asarray(parameters.get('L', beam_data['L']), dtype=float), (n_points,))
+    EI = np.broadcast_to(parameters.get('E', beam_data['E']) * np.asarray(parameters.get('Iz', beam_data['Iz']), dtype=float), (n_points,))
+    # The supports that are not parameters keep their location relative to the length
+    relative_x = np.stack([
+        parameters[f'Support {idx + 1}'] / L if f'Support {idx + 1}' in parameters else np.full(n_points, location / beam_data['L'])
+        for idx, location in enumerate(sorted_supports)
+    ], axis=1)
+
+    cases = load_cases(beam_data)
+    load_combos = {'Combo 1': {case: 1.0 for case in cases}} if load_combos is None else load_combos
+    combo_factors = np.array([[factors.get(load['Case'], 0.) for load in beam_data['Loads']] for factors in load_combos.values()])
+    load_factors = np.stack([
+        np.broadcast_to(np.asarray(parameters.get(f'Load {kdx + 1}', 1.), dtype=float), (n_points,))
+        for kdx in range(len(beam_data['Loads']))
+    ], axis=1).reshape(n_points, -1)
+    # Factor of each load in each load combination of each point, shape (N, C, K)
+    factors = combo_factors[None, :, :] * load_factors[:, None, :]
+
+    results = {name: np.full(n_points, np.nan) for name in RESULT_FIELDS}
+    results['Passed'] = np.zeros(n_points, dtype=bool)
+    valid = (
+        np.all((relative_x >= 0.) & (relative_x <= 1.), axis=1)
+        & np.all(np.diff(np.sort(relative_x, axis=1), axis=1) > 0., axis=1)
+        & is_stable(relative_x, np.array([SUPPORT_FIXITY[beam_data['Supports'][x]] for x in sorted_supports]), np.ones(relative_x.shape, dtype=bool))
+    )
+    if not np.any(valid):
+        return results
+
+    # The diagrams only depend on the support locations relative to the length. The loads,
+    # the stiffness and the length only scale the diagrams of a beam of unit length and EI,
+    # by L for the shear, L^2 for the moment and L^4 for the deflection of a distributed load
+    # and by 1, L and L^3 for a point load
+    geometries, geometry_index = np.unique(relative_x[valid], axis=0, return_inverse=True)
+    geometry_index = geometry_index.ravel()
+    with instrumentation.stage('beam_sweep.solve', len(geometries)):
+        beams = unit_load_beams(beam_data, np.ones(len(geometries)), geometries).solve()
+    stations = np.broadcast_to(np.linspace(0., 1., n_stations), (len(geometries), n_stations))
+    critical = np.concatenate([
+        np.zeros((len(geometries), 1)), np.ones((len(geometries), 1)),
+        beams.support_x, beams.point_x.reshape(len(geometries), -1),
+        beams.dist_x1.reshape(len(geometries), -1), beams.dist_x2.reshape(len(geometries), -1)
+    ], axis=1)
+    # Both sides of the discontinuities at the supports and loads, but not outside the ends
+    right = np.where(np.concatenate([stations, critical], axis=1) < 1., 0., np.nan)[:, None, :]
+    left = np.where(critical > 0., 0., np.nan)[:, None, :]
+    diagram = lambda level: np.concatenate([
+        beams.diagram(np.concatenate([stations, critical], axis=1), level) + right,
+        beams.diagram(critical, level, inclusive=False) + left
+    ], axis=2)
+    distributed = np.array([load['Type'].upper() == 'DIST' for load in beam_data['Loads']], dtype=float)
+    scaled_factors = lambda points, power: factors[points] * L[points, None, None] ** (power + distributed)
+    envelope = lambda values: (np.nanmax(values, axis=(1, 2)), np.nanmin(values, axis=(1, 2)))
+    points = np.flatnonzero(valid)
+
+    with instrumentation.stage('beam_sweep.combine', len(points)):
+        # PyNite reports the moment with hogging positive
+        moment = np.einsum('nck,nkx->ncx', scaled_factors(points, 1), -diagram(1)[geometry_index])
+        results['Max Moment'][points], results['Min Moment'][points] = envelope(moment)
+        passed = np.ones(len(points), dtype=bool)
+        if max_moment is not None:
+            passed &= np.maximum(results['Max Moment'][points], -results['Min Moment'][points]) <= max_moment
+        # The points that fail the moment limit are not evaluated any further
+        points, geometry_index = points[passed], geometry_index[passed]
+        shear = np.einsum('nck,nkx->ncx', scaled_factors(points, 0), diagram(0)[geometry_index])
+        results['Max Shear'][points], results['Min Shear'][points] = envelope(shear)
+        deflection = np.einsum('nck,nkx->ncx', scaled_factors(points, 3), diagram(3)[geometry_index]) / EI[points, None, None]
+        results['Max Deflection'][points], results['Min Deflection'][points] = envelope(deflection)
+        passed = np.ones(len(points), dtype=bool)
+        if deflection_ratio is not None:
+            passed &= np.maximum(results['Max Deflection'][points], -results['Min Deflection'][points]) <= L[points] / deflection_ratio
+        results['Passed'][points] = passed
+
+    return results
+
+def _evaluate_chunk(parameters: dict[str, np.ndarray], **kwargs)-> dict[str, np.ndarray]:
+    return evaluate_sweep(parameters=parameters, **kwargs)
+
+def run_sweep(
+    beam_data: dict,
+    parameters: dict[str, np.ndarray],
+    load_combos: dict[str, dict[str, float]]|None = None,
+    n_stations: int = 101,
+    max_moment: float|None = None,
+    deflection_ratio: float|None = None,
+    max_workers: int|None = 1,
+    chunk_size: int = 4096,
+)-> np.ndarray:
+    """
+    Returns the results of the beam of 'beam_data' with the parameters of each point of a
+    sweep as a structured array, shape (N,), with one field per parameter, RESULT_FIELDS
+    (envelopes over the load combinations with the signs of the PyNite result methods)
+    and 'Passed'.
+
+    The beam must bend in its plane (see beam_analytical.is_plane_beam). It is solved in
+    closed form once per distinct set of support locations relative to the length, with
+    unit length and EI and each load as a load case. The length, loads and stiffness of
+    every point only scale those diagrams.
+    The supports and loads that are not parameters keep their location relative to the length.
+    The diagrams are sampled at 'n_stations' equally spaced stations and at the supports
+    and load ends, so extremes between the stations are approximate.
+
+    'parameters' - Values of each parameter at each point, shape (N,), from cartesian_grid,
+        latin_hypercube or any other design (see check_parameters for the names)
+    'load_combos' - Load combinations as {combo: {case: factor}}, all the cases with a factor of 1.0 by default
+    'max_moment' - Limit of the absolute moment. The points above it fail and their shears
+        and deflections are not evaluated (NaN)
+    'deflection_ratio' - The points with an absolute deflection above the length divided by it fail
+    'max_workers' - Number of worker processes. 1 runs the sweep in this process and None uses one per CPU
+    'chunk_size' - Number of points evaluated at a time. The points are sorted by geometry,
+        so the points of a chunk share few geometries
+    The points with supports outside the beam, at the same location or unstable fail with NaN results.
+    """
+    n_points = check_parameters(beam_data, parameters)
+    names = list(parameters)
+    values = {name: np.asarray(parameters[name], dtype=float) for name in names}
+    support_names = [name for name in names if name.startswith('Support')]
+    L = values.get('L', beam_data['L'])
+    order = np.lexsort([values[name] / L for name in reversed(support_names)]) if support_names else np.arange(n_points)
+    chunks = [
+        {name: values[name][order[start:start + chunk_size]] for name in names}
+        for start in range(0, n_points, chunk_size)
+    ]
+    function = partial(
+        _evaluate_chunk, beam_data=beam_data, load_combos=load_combos, n_stations=n_stations,
+        max_moment=max_moment, deflection_ratio=deflection_ratio
+    )
+    if max_workers == 1 or len(chunks) <= 1:
+        chunk_results = [function(chunk) for chunk in chunks]
+    else:
+        with ProcessPoolExecutor(max_workers=max_workers) as executor:
+            chunk_results = list(executor.map(function, chunks))
+
+    results = np.zeros(n_points, dtype=[(name, 'f8') for name in names] + [(name, 'f8') for name in RESULT_FIELDS] + [('Passed', '?')])
+    for name in names:
+        results[name] = values[name]
+    for name in RESULT_FIELDS + ('Passed',):
+        results[name][order] = np.concatenate([chunk[name] for chunk in chunk_results]) if chunk_results else []
+
+    return results
+
+def sweep_grid(beam_data: dict, axes: dict[str, np.ndarray], **kwargs)-> np.ndarray:
+    """
+    Returns the results of run_sweep on the Cartesian grid of 'axes', shaped like the grid
+    (one dimension per parameter in the order of 'axes')
+    """
+    shape = tuple(len(values) for values in axes.values())
+
+    return run_sweep(beam_data, cartesian_grid(axes), **kwargs).reshape(shape)
@@ -1,6 +1,18 @@
 import math, csv
-from PyNite import FEModel3D, Visualization
-from utils import str_to_int, str_to_float, read_csv_file
+from typing import TYPE_CHECKING
+from eng_module.utils import str_to_float, read_csv_file
+from eng_module.beam_analytical import AnalyticalBeamModel, is_plane_beam, is_single_span, load_cases
+from eng_module.beam_stiffness import StiffnessBeamModel
+from eng_module.beam_parser import (
+    BEAM_ATTRIBUTES, BeamFileCache, load_beam_data, load_dicts, parse_attributes_line,
+    parse_beam_records, parse_load_lines, parse_supports_line,
+)
+from eng_module import instrumentation
+
+# PyNite is only imported when a finite element model is built, so the closed-form
+# and stiffness solvers and the parsers do not load it
+if TYPE_CHECKING:
+    from PyNite import FEModel3D
 
 def calc_shear_modulus(nu: float, E: float)-> float:
     """
@@ -39,7 +51,7 @@ def beam_reactions_ss_cant(w: float, b: float, a: float)-> float:
     R2 = w*(a+b)-R1
     return R1, R2
 
-def fe_model_ss_cant(w: float, b: float, a:float, E: float=1., I: float=1., A: float=1., J: float=1., nu: float=1., rho: float=1.)-> FEModel3D:
+def fe_model_ss_cant(w: float, b: float, a:float, E: float=1., I: float=1., A: float=1., J: float=1., nu: float=1., rho: float=1.)-> 'FEModel3D':
     """
     Returns the FE model for a simple supported beam with a continuous cantilever on one end.
 
@@ -54,6 +66,8 @@ def fe_model_ss_cant(w: float, b: float, a:float, E: float=1., I: float=1., A: f
     'rho' - The density of the beam material
     """
 
+    from PyNite import FEModel3D
+
     beam_model = FEModel3D()
     
     G = calc_shear_modulus(nu, E)
@@ -72,6 +86,7 @@ def fe_model_ss_cant(w: float, b: float, a:float, E: float=1., I: float=1., A: f
 
     return beam_model
 
+@instrumentation.timed('beam.read')
 def read_beam_file(file_name: str)-> list[list[str]]:
     """
     Returns the contents of a file
@@ -91,7 +106,7 @@ def separate_data(file_data: list[str])-> list[list[str]]:
 
 def convert_to_numeric(str_data:list[list[str]])->list[list[float]]:
     '''
-    Return a list[list[float]]
+    Return a list[list[float]], the values that are not numbers are kept as strings
     '''
     numeric_data = []
     for line_data in str_data:
@@ -136,138 +151,107 @@ def get_spans(beam_length: float, cant_support_loc: float)-> tuple[float, float]
 
     return b, a
 
-def build_beam(beam_data: dict, A: float = 1., J: float = 1., nu: float = 0.2, rho: float = 25.) -> FEModel3D:
-    """
-    Returns a beam finite element model for the data in 'beam_data' dictionary
-    """
-    beam_model = FEModel3D()
-
-    G = beams.calc_shear_modulus(nu, beam_data['E'])
-    beam_model.add_material('Mat', beam_data['E'], G, nu, rho)
-
-    for idx, node in enumerate(beam_data['Supports']):
-         beam_model.add_node(f'N{idx}', node, 0., 0.)
-
-    beam_model.add_member(beam_data['Name'], 'N0', f'N{idx}', 'Mat', 1., beam_data['Iz'], J, A)
-
-    for node in beam_model.Nodes:
-        beam_model.def_support(node, False, True, True, False, False, False)
-    beam_model.def_support('N0', True, True, True, True, False, False)
-    
-    for idx,load in enumerate(beam_data['Loads']):
-        beam_model.add_member_dist_load(beam_data['Name'], 'Fy', load[0], load[0], load[1], load[2]) 
-
-    return beam_model
-
-def load_beam_model(file_name: str)-> FEModel3D:
+def load_beam_model(file_name: str, solver: str = 'auto', cache: BeamFileCache|str|None = None)-> 'FEModel3D|AnalyticalBeamModel':
     """
     Returns the the FE model of a simply supported beam loaded with an uniform load
     'file_name' - Name of the file were the data is located
+    'solver' - Type of model, see build_beam
+    'cache' - A beam_parser.BeamFileCache or its directory to skip parsing unchanged files
     """
-    beam_data = get_structured_beam_data(read_beam_file(file_name))
-    beam_model = build_beam(beam_data)
+    beam_data = load_beam_data(file_name, cache)
+    beam_model = build_beam(beam_data, solver)
     return beam_model
 
 def parse_supports(list_of_supports: list[str])-> dict[float, str]:
     '''
-    Returns a dicionary with the X coordinate of support and the rigidity of the node
+    Returns a dicionary with the X coordinate of support and the rigidity of the node.
+    The supports are parsed with beam_parser.SUPPORT_SCHEMA.
     '''
-    support_data = {}
-    for support in list_of_supports:
-        support_data.update({str_to_float(support[0:-2]): support[-1]})
+    supports = parse_supports_line([str(support) for support in list_of_supports])
+    supports.raise_errors('Supports')
 
-    return support_data
+    return dict(supports.data.tolist())
 
 def parse_loads(list_of_loads: list[list[float,str]])-> list[dict]:
     '''
-    Returns a dictionary with the load data
+    Returns a dictionary with the load data.
+    The loads are parsed with beam_parser.LOAD_SCHEMAS.
     '''
-    load_data = []
-    for load in list_of_loads:
-        if load[0][0:-3].upper() == 'POINT':
-            load_data.append(
-                {
-                    'Type': 'Point',
-                    'Direction': load[0][-2:],
-                    'Magnitude': load[1],
-                    'Location': load[2],
-                    'Case': load[3][5:]
-                }
-            )
-        elif load[0][0:-3].upper() == 'DIST':
-            load_data.append(
-                {
-                    'Type': 'Dist',
-                    'Direction': load[0][-2:],
-                    'Start Magnitude': load[1],
-                    'End Magnitude': load[2],
-                    'Start Location': load[3],
-                    'End Location': load[4],
-                    'Case': load[5][5:]
-                }
-            )
-    
-    return load_data
+    loads, errors = parse_load_lines([(None, [str(value) for value in load]) for load in list_of_loads])
+    if errors:
+        raise ValueError(f"Loads: {'; '.join(str(error) for error in errors)}")
+
+    return load_dicts(loads)
 
 def parse_beam_attributes(beam_attributes: list[float])-> dict[str,float]:
     '''
-    Returns a dictionary with the beam attributes
+    Returns a dictionary with the beam attributes.
+    The attributes are parsed with beam_parser.ATTRIBUTE_SCHEMA, the missing ones are 1.
     '''
-    beam_data = {
-        'L': 1.,
-        'E': 1.,
-        'Iz':1.,
-        'Iy':1.,
-        'A': 1.,
-        'J': 1.,
-        'nu': 1.,
-        'rho': 1.
-    }
-    aux_keys = [key for key in beam_data.keys()]
-    for idx, attribute in enumerate(beam_attributes):
-        beam_data.update({aux_keys[idx]: attribute})
-
-    return beam_data
+    attributes = parse_attributes_line([str(attribute) for attribute in beam_attributes])
+    attributes.raise_errors('Beam attributes')
+
+    return dict(zip(BEAM_ATTRIBUTES, attributes.data[0].tolist()))
 
+@instrumentation.timed('beam.parse')
 def get_structured_beam_data(str_data:list[list[str]])->dict:
     '''
-    Returns structured data in dictionary format
+    Returns structured data in dictionary format.
+    The lines are parsed with the schemas of beam_parser, so a ValueError with the line
+    numbers is raised for bad values instead of passing them on as strings.
     '''
-    beam_data = convert_to_numeric(str_data)
-    name = {'Name': beam_data[0][0]}
-    beam_atributes = parse_beam_attributes(beam_data[1])
-    supports = {'Supports': parse_supports(beam_data[2])}
-    loads = {'Loads': parse_loads(beam_data[3:])}
-
-    structured_beam_data = name| beam_atributes| supports| loads
+    records = [
+        (line_number, line_data) for line_number, line_data in enumerate(str_data, 1)
+        if line_data and any(data.strip() for data in line_data)
+    ]
 
-    return structured_beam_data
+    return parse_beam_records(records).to_beam_data()
 
 def get_node_locations(beam_length: float, supports: list[float])-> dict[str, float]:
     '''
-    Returns a dictionary with the node location
+    Returns a dictionary with the node location: 'N0' at the start of the beam, a node at each
+    support within the beam (in the order of 'supports', without duplicates) and a node at the end
     '''
-        
     node_locations = {'N0': 0.}
-    idx = 1
+    seen = set()
     for coord in supports:
-        if coord > 0. and coord < beam_length and coord not in node_locations.values():
-            node_locations.update({f'N{idx}': coord})
-            idx += 1
-    node_locations.update({f'N{idx}': beam_length})
+        if 0. < coord < beam_length and coord not in seen:
+            seen.add(coord)
+            node_locations[f'N{len(node_locations)}'] = coord
+    node_locations[f'N{len(node_locations)}'] = beam_length
 
-    return node_locations     
+    return node_locations
 
-def build_beam(beam_data: dict) -> FEModel3D:
+@instrumentation.timed('beam.build')
+def build_beam(beam_data: dict, solver: str = 'auto', load_combos: dict[str, dict[str, float]]|None = None) -> 'FEModel3D|AnalyticalBeamModel':
     """
-    Returns a beam finite element model for the data in 'beam_data' dictionary
+    Returns a beam model for the data in 'beam_data' dictionary
+
+    'solver' - 'auto' returns a closed-form AnalyticalBeamModel for the single spans it covers
+        (see beam_analytical.is_single_span), a StiffnessBeamModel for the other beams bending
+        in their plane (see beam_analytical.is_plane_beam) and a PyNite finite element model otherwise.
+        'fe', 'analytical' and 'stiffness' always return that type of model
+    'load_combos' - Load combinations as {combo: {case: factor}}. Each load is added to its
+        load case and by default all the load cases are added to 'Combo 1' with a factor of 1.0
     """
+    if solver not in ('auto', 'fe', 'analytical', 'stiffness'):
+        raise ValueError(f"The solver must be one of 'auto', 'fe', 'analytical' or 'stiffness', not {solver}")
+    if load_combos is None:
+        load_combos = {'Combo 1': {case: 1.0 for case in load_cases(beam_data)}}
+
+    node_locations = get_node_locations(beam_data['L'], list(beam_data['Supports'].keys()))
+    if solver == 'analytical' or (solver == 'auto' and is_single_span(beam_data)):
+        return AnalyticalBeamModel(beam_data, node_locations, load_combos)
+    if solver == 'stiffness' or (solver == 'auto' and is_plane_beam(beam_data)):
+        return StiffnessBeamModel(beam_data, node_locations, load_combos)
+
+    from PyNite import FEModel3D
+
     beam_model = FEModel3D()
 
     G = calc_shear_modulus(beam_data['nu'], beam_data['E'])
     beam_model.add_material('Mat', beam_data['E'], G, beam_data['nu'], beam_data['rho'])
 
-    node_locations = get_node_locations(beam_data['L'], list(beam_data['Supports'].keys()))
     connectivity = {'P': [True, True, True, False, False, False], 'F': [False, True, True, True, False, False], 'R': [True, True, True, True, True, True]}
     for idx, node in enumerate(node_locations.values()):
          beam_model.add_node(f'N{idx}', node, 0., 0.)
@@ -278,8 +262,15 @@ def build_beam(beam_data: dict) -> FEModel3D:
 
     for load in beam_data['Loads']:
         if load['Type'].upper() == 'POINT':
-            beam_model.add_member_pt_load(beam_data['Name'], *list(load.values())[1:-1])
+            beam_model.add_member_pt_load(beam_data['Name'], load['Direction'], load['Magnitude'], load['Location'], case=load['Case'])
         elif load['Type'].upper() == 'DIST':
-            beam_model.add_member_dist_load(beam_data['Name'], *list(load.values())[1:-1])
+            beam_model.add_member_dist_load(
+                beam_data['Name'], load['Direction'],
+                load['Start Magnitude'], load['End Magnitude'],
+                load['Start Location'], load['End Location'],
+                case=load['Case']
+            )
+    for combo, factors in load_combos.items():
+        beam_model.add_load_combo(combo, factors)
 
     return beam_model
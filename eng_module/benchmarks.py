@@ -0,0 +1,689 @@
+import argparse, csv, json, math, os, sys, tempfile, time, tracemalloc
+from dataclasses import dataclass, asdict
+from typing import Callable
+import numpy as np
+from eng_module import beams, beam_parser, beam_results, beam_sweep, columns, reports, seismic_analysis, section_catalog
+from eng_module import modal_analysis, seismic_hazard_map, seismic_monte_carlo, time_history
+from eng_module.beam_batch import extract_beam_results
+
+COLUMN_HEADER = ['Column', 'A', 'h', 'Ix', 'Iy', 'fy', 'E', 'kx', 'ky', 'D', 'L']
+
+SINGLE_SPAN_SUPPORTS = (
+    ('P', 'F'),
+    ('F', 'P'),
+    ('R', None),
+    ('R', 'F'),
+    ('R', 'R'),
+)
+
+LOAD_CASES = ('Dead', 'Live')
+
+MODAL_STOREYS = 10
+
+DEFAULT_SIZES = {
+    'beam_parsing': (100, 1000),
+    'beam_parser': (100, 1000),
+    'beam_parser_cached': (100, 1000),
+    'beam_fe': (10, 100),
+    'beam_analytical': (10, 100),
+    'beam_stiffness': (10, 100),
+    'beam_continuous': (100, 1000, 10000),
+    'beam_results': (10, 100),
+    'beam_sweep': (1000, 10000, 100000),
+    'column_check': (1000, 10000, 100000, 1000000),
+    'column_check_list': (1000, 10000, 100000),
+    'column_stream': (1000, 10000, 100000, 1000000),
+    'section_selection': (1000, 10000, 100000),
+    'seismic_demand': (10, 100, 1000),
+    'performance_points': (1000, 10000, 100000),
+    'seismic_monte_carlo': (10000, 100000, 1000000),
+    'modal_analysis': (1000, 10000, 100000),
+    'time_history': (100, 1000, 10000),
+    'hazard_map': (10000, 100000, 1000000),
+    'reports': (100, 1000, 10000),
+}
+
+@dataclass
+class BenchmarkResult:
+    '''
+    Timing of one benchmark for one workload size. 'seconds' is the best of the repeats,
+    'throughput' the number of items per second and 'peak_memory' the peak traced
+    allocation in bytes (0 when the memory was not measured)
+    '''
+    name: str
+    size: int
+    seconds: float
+    throughput: float
+    peak_memory: int = 0
+
+@dataclass
+class CheckResult:
+    '''
+    Largest difference between a fast path and its reference path
+    '''
+    name: str
+    size: int
+    max_error: float
+    tolerance: float
+    skipped: int = 0
+
+    @property
+    def passed(self)-> bool:
+        return bool(self.max_error <= self.tolerance)
+
+def random_beam_data(rng: np.random.Generator, name: str = 'Beam')-> dict:
+    '''
+    Returns the structured data of a random single span beam (see beams.get_structured_beam_data)
+    with point and distributed loads in the 'Dead' and 'Live' load cases.
+    The distributed loads do not change sign along their length.
+    '''
+    L = float(np.round(rng.uniform(2000., 12000.), 1))
+    first, second = SINGLE_SPAN_SUPPORTS[rng.integers(len(SINGLE_SPAN_SUPPORTS))]
+    if second is None:
+        supports = {0.: first}
+    elif first == 'R' or second == 'R':
+        supports = {0.: first, L: second}
+    else:
+        a, b = np.sort(np.round(rng.uniform(0., L, 2), 1))
+        supports = {float(a): first, float(b): second} if b - a > 0.2 * L else {0.: first, L: second}
+
+    loads = []
+    for _ in range(rng.integers(1, 4)):
+        loads.append({
+            'Type': 'Point',
+            'Direction': 'Fy',
+            'Magnitude': float(np.round(rng.uniform(-50000., 10000.), 1)),
+            'Location': float(np.round(rng.uniform(0., L), 1)),
+            'Case': LOAD_CASES[rng.integers(len(LOAD_CASES))],
+        })
+    for _ in range(rng.integers(1, 3)):
+        x1, x2 = np.sort(np.round(rng.uniform(0., L, 2), 1))
+        sign = -1. if rng.random() < 0.8 else 1.
+        loads.append({
+            'Type': 'Dist',
+            'Direction': 'Fy',
+            'Start Magnitude': float(sign * np.round(rng.uniform(0., 40.), 2)),
+            'End Magnitude': float(sign * np.round(rng.uniform(0., 40.), 2)),
+            'Start Location': float(x1),
+            'End Location': float(x2),
+            'Case': LOAD_CASES[rng.integers(len(LOAD_CASES))],
+        })
+
+    beam_data = {
+        'Name': name,
+        'L': L,
+        'E': 200000.,
+        'Iz': float(np.round(rng.uniform(50e6, 800e6), -3)),
+        'Iy': 20e6,
+        'A': 8000.,
+        'J': 1e6,
+        'nu': 0.3,
+        'rho': 7.85e-9,
+        'Supports': supports,
+        'Loads': loads,
+    }
+
+    return beam_data
+
+def random_continuous_beam_data(rng: np.random.Generator, n_supports: int, name: str = 'Girder')-> dict:
+    '''
+    Returns the structured data of a continuous beam on 'n_supports' supports with random spans,
+    a uniform 'Dead' load and one 'Live' point load per span at random locations
+    '''
+    support_x = np.concatenate([[0.], np.cumsum(np.round(rng.uniform(20000., 40000., n_supports - 1), 1))])
+    L = float(support_x[-1])
+    supports = {float(x): 'R' if idx % 10 == 0 else 'F' for idx, x in enumerate(support_x)}
+    supports[0.] = 'P'
+    loads = [{'Type': 'Dist', 'Direction': 'Fy', 'Start Magnitude': -60., 'End Magnitude': -60., 'Start Location': 0., 'End Location': L, 'Case': 'Dead'}]
+    loads += [
+        {'Type': 'Point', 'Direction': 'Fy', 'Magnitude': -200000., 'Location': float(x), 'Case': 'Live'}
+        for x in np.round(rng.uniform(0., L, n_supports - 1), 1)
+    ]
+
+    return {
+        'Name': name, 'L': L, 'E': 35000., 'Iz': 2e12, 'Iy': 1e12, 'A': 5e6, 'J': 1e12, 'nu': 0.2, 'rho': 2.5e-9,
+        'Supports': supports, 'Loads': loads,
+    }
+
+def beam_file_text(beam_data: dict)-> str:
+    '''
+    Returns the contents of a beam file ('beam_*_strc.txt' format) for the structured beam data
+    '''
+    attributes = ','.join(repr(beam_data[key]) for key in ('L', 'E', 'Iz', 'Iy', 'A', 'J', 'nu', 'rho'))
+    supports = ','.join(f'{location!r}:{support}' for location, support in beam_data['Supports'].items())
+    lines = [beam_data['Name'], attributes, supports]
+    for load in beam_data['Loads']:
+        if load['Type'] == 'Point':
+            values = (load['Magnitude'], load['Location'])
+        else:
+            values = (load['Start Magnitude'], load['End Magnitude'], load['Start Location'], load['End Location'])
+        lines.append(','.join([f"{load['Type'].upper()}:{load['Direction']}", *map(repr, values), f"case:{load['Case']}"]))
+
+    return '\n'.join(lines)
+
+def write_beam_files(directory: str, n_beams: int, seed: int = 0)-> list[str]:
+    '''
+    Returns the names of 'n_beams' random beam files written to 'directory'
+    '''
+    rng = np.random.default_rng(seed)
+    file_names = []
+    for idx in range(n_beams):
+        file_name = os.path.join(directory, f'beam_{idx}_strc.txt')
+        with open(file_name, 'w') as beam_file:
+            beam_file.write(beam_file_text(random_beam_data(rng, f'Beam {idx}')))
+        file_names.append(file_name)
+
+    return file_names
+
+def random_column_values(rng: np.random.Generator, n_rows: int)-> np.ndarray:
+    '''
+    Returns the properties of 'n_rows' random columns in the order of the
+    columns csv file (without the name), shape (n_rows, 10).
+    The loads give demand capacity ratios roughly between 0.1 and 3.
+    '''
+    A = rng.uniform(2000., 20000., n_rows)
+    rx = rng.uniform(50., 200., n_rows)
+    ry = rx * rng.uniform(0.3, 1.0, n_rows)
+    fy = rng.choice([235., 275., 355.], n_rows)
+    squash_load = A * fy
+    values = np.stack([
+        A,
+        rng.uniform(2500., 8000., n_rows),
+        A * rx ** 2,
+        A * ry ** 2,
+        fy,
+        np.full(n_rows, 210000.),
+        rng.choice([0.5, 0.7, 1.0, 2.0], n_rows),
+        rng.choice([0.5, 0.7, 1.0, 2.0], n_rows),
+        squash_load * rng.uniform(0.05, 0.6, n_rows),
+        squash_load * rng.uniform(0.02, 0.4, n_rows),
+    ], axis=1)
+
+    return np.round(values, 1)
+
+def write_column_csv(filename: str, n_rows: int, seed: int = 0, chunk_size: int = 100000):
+    '''
+    Writes a csv file with 'n_rows' random columns, generated in chunks of 'chunk_size' rows
+    '''
+    rng = np.random.default_rng(seed)
+    with open(filename, 'w', newline='') as csv_file:
+        csv_writer = csv.writer(csv_file)
+        csv_writer.writerow(COLUMN_HEADER)
+        for start in range(0, n_rows, chunk_size):
+            values = random_column_values(rng, min(chunk_size, n_rows - start))
+            csv_writer.writerows(
+                [f'C{start + idx + 1}', *row] for idx, row in enumerate(values.tolist())
+            )
+
+def random_spectra(rng: np.random.Generator, n_spectra: int)-> list[seismic_analysis.Ec_response_spectrum]:
+    '''
+    Returns 'n_spectra' random Eurocode response spectra
+    '''
+    return [
+        seismic_analysis.Ec_response_spectrum(
+            ag=float(rng.uniform(0.5, 5.)),
+            spectra_type=int(rng.integers(1, 3)),
+            soil_type=str(rng.choice(['A', 'B', 'C', 'D', 'E'])),
+            damping=float(rng.uniform(2., 20.)),
+        )
+        for _ in range(n_spectra)
+    ]
+
+def random_seismic_systems(rng: np.random.Generator, n_systems: int)-> dict[str, np.ndarray]:
+    '''
+    Returns the mass, the spectrum parameters and the bilinear capacity of 'n_systems' random systems
+    '''
+    spectra = random_spectra(rng, n_systems)
+    systems = {
+        parameter: np.array([getattr(spectrum, parameter) for spectrum in spectra])
+        for parameter in ('ag', 'S', 'Tb', 'Tc', 'Td', 'nu')
+    }
+    systems['mass'] = rng.uniform(500., 10000., n_systems)
+    k1 = rng.uniform(10000., 1000000., n_systems)
+    systems['capacity'] = seismic_analysis.CapacityCurve(
+        np.stack([k1, k1 * rng.uniform(0., 0.3, n_systems)], axis=1),
+        (systems['mass'] * rng.uniform(0.5, 5., n_systems))[:, None],
+    )
+
+    return systems
+
+def _parse_beam_files(file_names: list[str])-> list[dict]:
+    return [beams.get_structured_beam_data(beams.read_beam_file(file_name)) for file_name in file_names]
+
+def _load_cached_beam_files(file_names: list[str], cache_dir: str)-> list[dict]:
+    with beam_parser.BeamFileCache(cache_dir) as cache:
+        return [cache.load(file_name).to_beam_data() for file_name in file_names]
+
+def _analyze_beams(list_of_beam_data: list[dict], solver: str)-> list[dict]:
+    results = []
+    for beam_data in list_of_beam_data:
+        beam_model = beams.build_beam(beam_data, solver)
+        beam_model.analyze_linear()
+        results.append(extract_beam_results(beam_model, beam_data['Name']))
+
+    return results
+
+def _seismic_sweep(spectra: list[seismic_analysis.Ec_response_spectrum], mass: float, k1: float, k2: float, f1max: float):
+    for spectrum in spectra:
+        x_demand, _ = zip(*seismic_analysis.system_demand(mass, spectrum))
+        seismic_analysis.system_capacity('Multi-linear', x_demand, k1, k2, f1max)
+
+def setup_benchmark(name: str, size: int, directory: str, seed: int = 0)-> Callable[[], object]:
+    '''
+    Returns a function that runs the benchmark 'name' on a workload of 'size' items.
+    The workload is generated in 'directory' before returning, so it is not timed.
+    '''
+    rng = np.random.default_rng(seed)
+    if name == 'beam_parsing':
+        file_names = write_beam_files(directory, size, seed)
+        return lambda: _parse_beam_files(file_names)
+    if name == 'beam_parser':
+        file_names = write_beam_files(directory, size, seed)
+        return lambda: [beam_parser.load_beam_data(file_name) for file_name in file_names]
+    if name == 'beam_parser_cached':
+        file_names = write_beam_files(directory, size, seed)
+        cache_dir = os.path.join(directory, 'cache')
+        _load_cached_beam_files(file_names, cache_dir)
+        return lambda: _load_cached_beam_files(file_names, cache_dir)
+    if name in ('beam_fe', 'beam_analytical', 'beam_stiffness'):
+        list_of_beam_data = [random_beam_data(rng, f'Beam {idx}') for idx in range(size)]
+        solver = name.split('_')[1]
+        return lambda: _analyze_beams(list_of_beam_data, solver)
+    if name == 'beam_continuous':
+        beam_data = random_continuous_beam_data(rng, size)
+        return lambda: _analyze_beams([beam_data], 'stiffness')
+    if name == 'beam_results':
+        list_of_beam_data = [random_beam_data(rng, f'Beam {idx}') for idx in range(size)]
+        return lambda: beam_results.analyze_beams(list_of_beam_data)
+    if name == 'beam_sweep':
+        beam_data = random_beam_data(rng)
+        parameters = beam_sweep.latin_hypercube({'L': (0.5 * beam_data['L'], 1.5 * beam_data['L']), 'Iz': (0.5 * beam_data['Iz'], 2. * beam_data['Iz'])}, size, seed)
+        return lambda: beam_sweep.run_sweep(beam_data, parameters)
+    if name in ('column_check', 'column_check_list', 'column_stream'):
+        filename = os.path.join(directory, f'columns_{size}.csv')
+        if not os.path.exists(filename):
+            write_column_csv(filename, size, seed)
+        if name == 'column_check':
+            return lambda: columns.run_all_columns_array(filename)
+        if name == 'column_check_list':
+            return lambda: columns.run_all_columns(filename)
+        return lambda: columns.stream_all_columns(filename)
+    if name == 'reports':
+        filename = os.path.join(directory, f'columns_{size}.csv')
+        if not os.path.exists(filename):
+            write_column_csv(filename, size, seed)
+        output = os.path.join(directory, 'reports')
+        return lambda: reports.write_reports(reports.csv_column_reports(filename), output, include_plotlyjs='cdn')
+    if name == 'section_selection':
+        catalog = section_catalog.SectionCatalog.from_csv()
+        values = random_column_values(rng, size)
+        demand = values[:, 8] * 1.35 + values[:, 9] * 1.5
+        return lambda: catalog.lightest_sections(demand, values[:, 1], values[:, 6], values[:, 7], values[:, 4], values[:, 5])
+    if name == 'seismic_demand':
+        spectra = random_spectra(rng, size)
+        return lambda: _seismic_sweep(spectra, 4000., 350000., 35000., 10000.)
+    if name == 'performance_points':
+        systems = random_seismic_systems(rng, size)
+        return lambda: seismic_analysis.performance_points(**systems)
+    if name == 'hazard_map':
+        n_columns = int(np.ceil(np.sqrt(size)))
+        n_rows = int(np.ceil(size / n_columns))
+        grid = seismic_hazard_map.HazardGrid(rng.uniform(0.5, 4., (n_rows, n_columns)), rng.integers(0, 5, (n_rows, n_columns)))
+        periods = np.round(np.arange(0., 4. + 1e-9, 0.2), 1)
+        return lambda: seismic_hazard_map.compute_spectrum_map(grid, periods, os.path.join(directory, 'hazard_map.npy'))
+    if name == 'seismic_monte_carlo':
+        distribution = seismic_monte_carlo.Distribution
+        model = seismic_monte_carlo.SeismicModel(
+            ag = distribution.lognormal(2., 0.6, upper=15.),
+            mass = distribution.normal(4000., 400., lower=100.),
+            k1 = distribution.normal(350000., 35000., lower=1000.),
+            k_type = 'Multi-linear',
+            k2 = distribution.uniform(20000., 50000.),
+            f1max = distribution.normal(10000., 1000., lower=1.),
+            damping = distribution.uniform(3., 8.),
+            soil_type = distribution.choice(seismic_monte_carlo.SOIL_TYPES),
+        )
+        return lambda: seismic_monte_carlo.monte_carlo(model, size, seed)
+    if name == 'modal_analysis':
+        buildings = modal_analysis.ShearBuildings(
+            mass = rng.uniform(20., 80., (size, MODAL_STOREYS)),
+            stiffness = rng.uniform(50000., 500000., (size, MODAL_STOREYS)),
+            height = 3.,
+        )
+        spectrum = seismic_analysis.Ec_response_spectrum(2.5, soil_type='C')
+        return lambda: modal_analysis.response_spectrum_analysis(buildings, spectrum)
+    if name == 'time_history':
+        spectrum = seismic_analysis.Ec_response_spectrum(2.5, soil_type='C')
+        ground_motions = time_history.synthetic_records(spectrum, 1, duration=10., n_iterations=1, seed=seed)
+        systems = time_history.BilinearSystems(
+            mass = rng.uniform(500., 10000., size),
+            k1 = rng.uniform(100000., 1000000., size),
+            k2 = rng.uniform(0., 50000., size),
+            f1max = rng.uniform(1000., 20000., size),
+        )
+        return lambda: time_history.integrate(ground_motions, systems)
+
+    raise ValueError(f"The benchmark must be one of {', '.join(DEFAULT_SIZES)}, not {name}")
+
+def measure(function: Callable[[], object], repeat: int = 3, measure_memory: bool = True)-> tuple[float, int]:
+    '''
+    Returns the best time in seconds of 'repeat' runs of 'function' and the peak memory
+    in bytes allocated by one more run under tracemalloc (0 if 'measure_memory' is False).
+    The traced run is separate because tracing slows the code down.
+    '''
+    seconds = math.inf
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        seconds = min(seconds, time.perf_counter() - start)
+
+    peak_memory = 0
+    if measure_memory:
+        tracemalloc.start()
+        try:
+            function()
+            peak_memory = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+
+    return seconds, peak_memory
+
+def run_benchmarks(
+    names: list[str]|None = None,
+    sizes: list[int]|None = None,
+    repeat: int = 3,
+    measure_memory: bool = True,
+    seed: int = 0,
+)-> list[BenchmarkResult]:
+    '''
+    Returns the results of the benchmarks 'names' (all by default) for the workload
+    'sizes' (DEFAULT_SIZES of each benchmark by default)
+    '''
+    results = []
+    with tempfile.TemporaryDirectory() as directory:
+        for name in names or list(DEFAULT_SIZES):
+            for size in sizes or DEFAULT_SIZES[name]:
+                workload_directory = os.path.join(directory, f'{name}_{size}')
+                os.makedirs(workload_directory)
+                seconds, peak_memory = measure(setup_benchmark(name, size, workload_directory, seed), repeat, measure_memory)
+                results.append(BenchmarkResult(name, size, seconds, size / seconds if seconds > 0 else math.inf, peak_memory))
+
+    return results
+
+def scaling_exponents(results: list[BenchmarkResult])-> dict[str, float]:
+    '''
+    Returns the slope of log(time) against log(size) of each benchmark with at least two sizes.
+    1 is linear scaling and larger values scale worse than linear.
+    '''
+    exponents = {}
+    for name in dict.fromkeys(result.name for result in results):
+        sizes, seconds = zip(*[(result.size, result.seconds) for result in results if result.name == name])
+        if len(set(sizes)) > 1:
+            exponents[name] = float(np.polyfit(np.log(sizes), np.log(np.maximum(seconds, 1e-9)), 1)[0])
+
+    return exponents
+
+def save_baseline(results: list[BenchmarkResult], filename: str):
+    '''
+    Writes the benchmark results to a JSON baseline file
+    '''
+    with open(filename, 'w') as baseline_file:
+        json.dump({'results': [asdict(result) for result in results]}, baseline_file, indent=2)
+
+def load_baseline(filename: str)-> list[BenchmarkResult]:
+    '''
+    Returns the benchmark results of a JSON baseline file
+    '''
+    with open(filename, 'r') as baseline_file:
+        return [BenchmarkResult(**result) for result in json.load(baseline_file)['results']]
+
+def compare_to_baseline(results: list[BenchmarkResult], baseline: list[BenchmarkResult], tolerance: float = 0.25)-> list[str]:
+    '''
+    Returns a description of each result that is slower or uses more memory than the
+    baseline result of the same benchmark and size by more than 'tolerance' (a fraction)
+    '''
+    baseline_results = {(result.name, result.size): result for result in baseline}
+    regressions = []
+    for result in results:
+        reference = baseline_results.get((result.name, result.size))
+        if reference is None:
+            continue
+        if result.seconds > reference.seconds * (1. + tolerance):
+            regressions.append(f'{result.name} [{result.size}]: {result.seconds:.4g} s against {reference.seconds:.4g} s')
+        if reference.peak_memory and result.peak_memory > reference.peak_memory * (1. + tolerance):
+            regressions.append(f'{result.name} [{result.size}]: {result.peak_memory} bytes against {reference.peak_memory} bytes')
+
+    return regressions
+
+def check_columns(size: int = 1000, seed: int = 0)-> CheckResult:
+    '''
+    Returns the largest relative difference of the demand capacity ratios of the array
+    engine against the SteelColumn objects and calculate_factored_csv_load
+    '''
+    rng = np.random.default_rng(seed)
+    records = [[f'C{idx}', *map(str, row)] for idx, row in enumerate(random_column_values(rng, size).tolist())]
+    column_array = columns.check_csv_records(records)
+    reference = []
+    for record in records:
+        steelcolumn = columns.csv_record_to_steelcolumn(record)
+        capacity = min(steelcolumn.factored_compressive_resistance(), steelcolumn.factored_crushing_load())
+        reference.append(columns.calculate_factored_csv_load(record) / capacity)
+    reference = np.array(reference)
+    max_error = float(np.max(np.abs(column_array.demand_capacity_ratio - reference) / np.abs(reference)))
+
+    return CheckResult('columns', size, max_error, 1e-12)
+
+def check_section_catalog(size: int = 100, seed: int = 0)-> CheckResult:
+    '''
+    Returns the number of columns where the section chosen from the tabulated reduction
+    factors is not adequate for the exact capacity, is lighter than the exact choice or
+    differs from a scan of all the sections with SteelColumn (with buckling curve 'b')
+    '''
+    rng = np.random.default_rng(seed)
+    catalog = section_catalog.SectionCatalog.from_csv()
+    values = random_column_values(rng, size)
+    h, fy, E, kx, ky = values[:, 1], values[:, 4], values[:, 5], values[:, 6], values[:, 7]
+    demand = values[:, 8] * 1.35 + values[:, 9] * 1.5
+
+    exact = catalog.lightest_sections(demand, h, kx, ky, fy, E, exact=True)
+    tabulated = catalog.lightest_sections(demand, h, kx, ky, fy, E)
+    exact_capacity = catalog.capacity(h, kx, ky, fy, E, exact=True)
+    chosen = tabulated >= 0
+    errors = int(np.count_nonzero((tabulated >= 0) != (exact >= 0)))
+    errors += int(np.count_nonzero(exact_capacity[chosen, tabulated[chosen]] < demand[chosen]))
+    errors += int(np.count_nonzero(tabulated[chosen] < exact[chosen]))
+
+    curve_b = catalog.lightest_sections(demand, h, kx, ky, fy, E, buckling_curve='b', exact=True)
+    for idx in range(size):
+        capacities = [
+            columns.SteelColumn(h=h[idx], E=E[idx], A=A, Ix=Ix, Iy=Iy, kx=kx[idx], ky=ky[idx], fy=fy[idx]).factored_compressive_resistance('b')
+            for A, Ix, Iy in zip(catalog.A.tolist(), catalog.Ix.tolist(), catalog.Iy.tolist())
+        ]
+        adequate = [section for section, capacity in enumerate(capacities) if capacity >= demand[idx]]
+        errors += int((adequate[0] if adequate else -1) != curve_b[idx])
+
+    return CheckResult('section_catalog', size, float(errors), 0.)
+
+def reference_spectral_acceleration(T: float, spectrum: seismic_analysis.Ec_response_spectrum)-> float:
+    '''
+    Returns the elastic spectral acceleration of Eurocode 1998-1-1 for one period
+    '''
+    ag, S, Tb, Tc, Td, nu = spectrum.ag, spectrum.S, spectrum.Tb, spectrum.Tc, spectrum.Td, spectrum.nu
+    if T <= Tb:
+        return ag * S * (1 + T / Tb * (nu * 2.5 - 1))
+    if T <= Tc:
+        return ag * S * nu * 2.5
+    if T <= Td:
+        return ag * S * nu * 2.5 * Tc / T
+    return ag * S * nu * 2.5 * Tc * Td / T ** 2
+
+def check_spectrum(size: int = 100, seed: int = 0)-> CheckResult:
+    '''
+    Returns the largest relative difference of the vectorized spectral acceleration
+    against the scalar formula for 'size' random spectra
+    '''
+    rng = np.random.default_rng(seed)
+    periods = np.linspace(0., seismic_analysis.MAX_PERIOD, 401)
+    max_error = 0.
+    for spectrum in random_spectra(rng, size):
+        reference = np.array([reference_spectral_acceleration(T, spectrum) for T in periods.tolist()])
+        max_error = max(max_error, float(np.max(np.abs(spectrum.acceleration(periods) - reference) / reference)))
+
+    return CheckResult('spectrum', size, max_error, 1e-12)
+
+def check_performance_points(size: int = 100, seed: int = 0, n_periods: int = 4001)-> CheckResult:
+    '''
+    Returns the largest difference in seconds between the periods of the exact performance
+    points and the first crossing of the sampled demand and capacity curves. The sampled
+    crossing is interpolated between 'n_periods' periods, so the tolerance is one period step.
+    Systems where only one of the two methods finds a crossing count as an infinite error.
+    '''
+    rng = np.random.default_rng(seed)
+    systems = random_seismic_systems(rng, size)
+    periods = np.linspace(0., seismic_analysis.MAX_PERIOD, n_periods)
+    spectrum_parameters = [systems[parameter][:, None] for parameter in ('ag', 'S', 'Tb', 'Tc', 'Td', 'nu')]
+    acceleration = seismic_analysis.spectral_acceleration(periods, *spectrum_parameters)
+    x_demand = acceleration * (periods / (2 * math.pi)) ** 2
+    excess = systems['mass'][:, None] * acceleration - systems['capacity'].force(x_demand)
+
+    crossed = (excess[:, :-1] > 0.) & (excess[:, 1:] <= 0.)
+    first = np.argmax(crossed, axis=1)
+    rows = np.arange(size)
+    step = periods[1] - periods[0]
+    reference = periods[first] + step * excess[rows, first] / (excess[rows, first] - excess[rows, first + 1])
+    reference[~crossed.any(axis=1)] = np.nan
+
+    period = seismic_analysis.performance_points(**systems)[2]
+    errors = np.abs(period - reference)
+    errors[np.isnan(period) & np.isnan(reference)] = 0.
+    errors[np.isnan(errors)] = np.inf
+
+    return CheckResult('performance_points', size, float(np.max(errors, initial=0.)), step)
+
+def check_beams(size: int = 20, seed: int = 0)-> CheckResult:
+    '''
+    Returns the largest difference between the closed-form and the PyNite results of 'size'
+    random single span beams, relative to the largest value of the same result of the beam.
+    PyNite samples the deflection at 100 points, so the tolerance allows for the sampling error.
+    PyNite does not satisfy the vertical equilibrium for some distributed loads, so the beams
+    where its reactions do not balance the loads are skipped and counted in 'skipped'.
+    The closed-form reactions are always checked against the loads.
+    '''
+    rng = np.random.default_rng(seed)
+    max_error = 0.
+    skipped = 0
+    for idx in range(size):
+        beam_data = random_beam_data(rng, f'Beam {idx}')
+        analytical, fe = (_analyze_beams([beam_data], solver)[0]['Combo 1'] for solver in ('analytical', 'fe'))
+        total_load = _total_load(beam_data)
+        max_error = max(max_error, _equilibrium_error(analytical, total_load))
+        if _equilibrium_error(fe, total_load) > 1e-9:
+            skipped += 1
+            continue
+        for key in ('Fy', 'Mz'):
+            values, reference = (np.array([reaction[key] for reaction in results['Reactions']]) for results in (analytical, fe))
+            max_error = max(max_error, _relative_error(values, reference))
+        for result_type in ('Moment', 'Shear', 'Deflection'):
+            keys = (f'Max {result_type}', f'Min {result_type}')
+            values, reference = (np.array([results[key] for key in keys]) for results in (analytical, fe))
+            max_error = max(max_error, _relative_error(values, reference))
+
+    return CheckResult('beams', size, max_error, 1e-3, skipped)
+
+def check_beam_stiffness(size: int = 100, seed: int = 0)-> CheckResult:
+    '''
+    Returns the largest difference between the stiffness and the closed-form results of
+    'size' random single span beams, for every load case and a factored combination,
+    relative to the largest value of the same result of the beam
+    '''
+    rng = np.random.default_rng(seed)
+    load_combos = {'Combo 1': {case: 1.0 for case in LOAD_CASES}, 'ULS': dict(zip(LOAD_CASES, (1.35, 1.5)))}
+    max_error = 0.
+    for idx in range(size):
+        beam_data = random_beam_data(rng, f'Beam {idx}')
+        models = [beams.build_beam(beam_data, solver, load_combos) for solver in ('stiffness', 'analytical')]
+        for beam_model in models:
+            beam_model.analyze_linear()
+        x = np.linspace(0., beam_data['L'], 51)
+        for key in ('RxnFY', 'RxnMZ'):
+            max_error = max(max_error, _relative_error(models[0].case_results[key], models[1].case_results[key]))
+        for name in models[1].cases + list(load_combos):
+            for level in range(4):
+                max_error = max(max_error, _relative_error(*(beam_model.diagram(x, level, name) for beam_model in models)))
+
+    return CheckResult('beam_stiffness', size, max_error, 1e-6)
+
+def _total_load(beam_data: dict)-> float:
+    total_load = 0.
+    for load in beam_data['Loads']:
+        if load['Type'] == 'Point':
+            total_load += load['Magnitude']
+        else:
+            total_load += (load['Start Magnitude'] + load['End Magnitude']) / 2 * (load['End Location'] - load['Start Location'])
+
+    return total_load
+
+def _equilibrium_error(results: dict, total_load: float)-> float:
+    return abs(sum(reaction['Fy'] for reaction in results['Reactions']) + total_load) / max(abs(total_load), 1e-12)
+
+def _relative_error(values: np.ndarray, reference: np.ndarray)-> float:
+    scale = np.max(np.abs(reference), initial=0.)
+    if scale == 0.:
+        return float(np.max(np.abs(values), initial=0.))
+    return float(np.max(np.abs(values - reference)) / scale)
+
+def run_checks(size: int = 100, seed: int = 0)-> list[CheckResult]:
+    '''
+    Returns the differential checks of all the fast paths. The beams are checked on
+    a tenth of 'size' because the reference finite element analysis is slow.
+    '''
+    return [
+        check_columns(size, seed),
+        check_section_catalog(size, seed),
+        check_spectrum(size, seed),
+        check_performance_points(size, seed),
+        check_beams(max(1, size // 10), seed),
+        check_beam_stiffness(size, seed),
+    ]
+
+def main(argv: list[str]|None = None)-> int:
+    parser = argparse.ArgumentParser(description='Benchmark the beam, column and seismic engines and check them against their reference paths.')
+    parser.add_argument('--benchmarks', nargs='*', default=None, choices=list(DEFAULT_SIZES), help='benchmarks to run (default: all, none with an empty list)')
+    parser.add_argument('--sizes', nargs='+', type=int, default=None, help='workload sizes (default: the sizes of each benchmark in DEFAULT_SIZES)')
+    parser.add_argument('--repeat', type=int, default=3, help='timed runs per workload, the best one is reported')
+    parser.add_argument('--no-memory', action='store_true', help='do not measure the peak memory')
+    parser.add_argument('--seed', type=int, default=0, help='seed of the generated workloads')
+    parser.add_argument('--save-baseline', default=None, help='JSON file to save the results to')
+    parser.add_argument('--baseline', default=None, help='JSON baseline file to compare the results to')
+    parser.add_argument('--tolerance', type=float, default=0.25, help='allowed slowdown against the baseline as a fraction')
+    parser.add_argument('--check-size', type=int, default=100, help='number of items in the differential checks (0 skips them)')
+    args = parser.parse_args(argv)
+
+    failed = False
+    if args.benchmarks is None or args.benchmarks:
+        results = run_benchmarks(args.benchmarks, args.sizes, args.repeat, not args.no_memory, args.seed)
+        print(f"{'Benchmark':<20}{'Size':>10}{'Time [s]':>12}{'Items/s':>14}{'Peak [MiB]':>12}")
+        for result in results:
+            print(f'{result.name:<20}{result.size:>10}{result.seconds:>12.4g}{result.throughput:>14.4g}{result.peak_memory / 2**20:>12.2f}')
+        for name, exponent in scaling_exponents(results).items():
+            print(f'Scaling exponent of {name}: {exponent:.2f}')
+
+        if args.save_baseline is not None:
+            save_baseline(results, args.save_baseline)
+        if args.baseline is not None:
+            regressions = compare_to_baseline(results, load_baseline(args.baseline), args.tolerance)
+            for regression in regressions:
+                print(f'Regression in {regression}', file=sys.stderr)
+            failed = failed or bool(regressions)
+
+    if args.check_size > 0:
+        for check in run_checks(args.check_size, args.seed):
+            status = 'ok' if check.passed else 'FAILED'
+            skipped = f', {check.skipped} skipped' if check.skipped else ''
+            print(f'Check {check.name} [{check.size}{skipped}]: max error {check.max_error:.3g} (tolerance {check.tolerance:.3g}) {status}')
+            failed = failed or not check.passed
+
+    return 1 if failed else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,6 +1,37 @@
-from math import pi, sqrt
+import csv, hashlib
+from math import pi
 from dataclasses import dataclass
-from eng_module import utils, load_factors
+from typing import Iterator
+import numpy as np
+from eng_module import utils, load_factors, instrumentation, result_cache
+
+# The modules whose changes invalidate the cached column checks
+RESULT_MODULES = ('columns', 'load_factors', 'utils')
+
+# The columns of the column csv files, in file order
+COLUMN_SCHEMA = utils.Schema((
+    utils.Field('Column', 'U'),
+    utils.Field('A', unit='mm2'),
+    utils.Field('h', unit='mm'),
+    utils.Field('Ix', unit='mm4'),
+    utils.Field('Iy', unit='mm4'),
+    utils.Field('fy', unit='MPa'),
+    utils.Field('E', unit='MPa'),
+    utils.Field('kx'),
+    utils.Field('ky'),
+    utils.Field('D', unit='N'),
+    utils.Field('L', unit='N'),
+))
+
+COLUMN_PROPERTIES = ('A', 'h', 'Ix', 'Iy', 'fy', 'E', 'kx', 'ky')
+
+IMPERFECTION_FACTORS = {
+    'a0': 0.13,
+    'a': 0.21,
+    'b': 0.34,
+    'c': 0.49,
+    'd': 0.76
+}
 
 @dataclass
 class Column:
@@ -46,18 +77,119 @@ class SteelColumn(Column):
     def factored_crushing_load(self):
         return self.A*self.fy/self.gamma_m1
 
+@dataclass
+class SteelColumnArray:
+    '''
+    A set of steel columns stored as one NumPy array per property
+    '''
+    h: np.ndarray
+    E: np.ndarray
+    A: np.ndarray
+    Ix: np.ndarray
+    Iy: np.ndarray
+    kx: np.ndarray
+    ky: np.ndarray
+    fy: np.ndarray
+    gamma_m1: np.ndarray|float = 1.0
+    buckling_curve: np.ndarray|str = 'b'
+    factored_load: np.ndarray|None = None
+    governing_combination: np.ndarray|None = None
+    demand_capacity_ratio: np.ndarray|None = None
+
+    def __post_init__(self):
+        for attribute in ('h', 'E', 'A', 'Ix', 'Iy', 'kx', 'ky', 'fy'):
+            setattr(self, attribute, np.asarray(getattr(self, attribute), dtype=float))
+        size = len(self.h)
+        self.gamma_m1 = np.broadcast_to(np.asarray(self.gamma_m1, dtype=float), (size,))
+        self.buckling_curve = np.broadcast_to(np.asarray(self.buckling_curve, dtype=str), (size,))
+
+    def __len__(self)-> int:
+        return len(self.h)
+
+    def critical_buckling_load(self, axis: str)-> np.ndarray:
+        if axis.upper() == 'X':
+            return euler_buckling_load(self.h, self.E, self.Ix, self.kx)
+        elif axis.upper() == 'Y':
+            return euler_buckling_load(self.h, self.E, self.Iy, self.ky)
+        else:
+            raise ValueError(f"Axis must be one of 'x' or 'y', not {axis}")
+
+    def radius_of_gyration(self, axis: str)-> np.ndarray:
+        if axis.upper() == 'X':
+            return radius_gyration(self.Ix, self.A)
+        elif axis.upper() == 'Y':
+            return radius_gyration(self.Iy, self.A)
+        else:
+            raise ValueError(f"Axis must be one of 'x' or 'y', not {axis}")
+
+    def slenderness(self)-> np.ndarray:
+        pcr = np.minimum(
+            self.critical_buckling_load('x'),
+            self.critical_buckling_load('y')
+        )
+
+        return lamda(self.A, self.fy, pcr)
+
+    def buckling_reduction_factor(self)-> np.ndarray:
+        return reduction_factor(self.slenderness(), imperfection_factors(self.buckling_curve))
+
+    def factored_compressive_resistance(self)-> np.ndarray:
+        return self.buckling_reduction_factor()*self.A*self.fy/self.gamma_m1
+
+    def factored_crushing_load(self)-> np.ndarray:
+        return self.A*self.fy/self.gamma_m1
+
+    def factored_capacity(self)-> np.ndarray:
+        '''
+        Returns the lesser of the compressive resistance and the crushing load
+        '''
+        return np.minimum(self.factored_compressive_resistance(), self.factored_crushing_load())
+
+    @classmethod
+    def from_steelcolumns(cls, steelcolumns: list[SteelColumn], buckling_curve: str = 'b')-> 'SteelColumnArray':
+        '''
+        Returns a SteelColumnArray with the properties of a list of steel columns
+        '''
+        attributes = ('h', 'E', 'A', 'Ix', 'Iy', 'kx', 'ky', 'fy', 'gamma_m1')
+        values = {
+            attribute: np.array([getattr(sc, attribute) for sc in steelcolumns], dtype=float)
+            for attribute in attributes
+        }
+
+        return cls(**values, buckling_curve=buckling_curve)
+
+@dataclass
+class ColumnCheckSummary:
+    '''
+    Running aggregates of a column check that do not require holding all the columns
+    '''
+    count: int = 0
+    failures: int = 0
+    max_demand_capacity_ratio: float = 0.
+    worst_column: str|None = None
+
+    def update(self, names: list[str], demand_capacity_ratio: np.ndarray):
+        if len(names) == 0:
+            return
+        self.count += len(names)
+        self.failures += int(np.count_nonzero(demand_capacity_ratio > 1.0))
+        idx = int(np.argmax(demand_capacity_ratio))
+        if self.worst_column is None or demand_capacity_ratio[idx] > self.max_demand_capacity_ratio:
+            self.max_demand_capacity_ratio = float(demand_capacity_ratio[idx])
+            self.worst_column = names[idx]
+
 def euler_buckling_load(h: float, E: float, I: float, k: float)-> float:
     '''
     Returns the Euler critical bucking load
     '''
     return (pi**2)*E*I/(k*h)**2
-    
+
 
 def radius_gyration(I: float, A: float)-> float:
     '''
     Returns the radius of gyration
     '''
-    return sqrt(I/A)
+    return np.sqrt(I/A)
 
 def lamda(a_w: float, fy: float, pcr_mcr: float)-> float:
     '''
@@ -66,84 +198,286 @@ def lamda(a_w: float, fy: float, pcr_mcr: float)-> float:
     'fy' - Is the material yield stress
     'pcr_mcr' - Is either the Euler buckling load or the 
     '''
-    return sqrt(a_w*fy/pcr_mcr)
+    return np.sqrt(a_w*fy/pcr_mcr)
 
 def imperfection_factor(buckling_curve: str)-> float:
     '''
     Returns the imperfection factor
     '''
-    alfa = {
-        'a0': 0.13,
-        'a': 0.21,
-        'b': 0.34,
-        'c': 0.49,
-        'd': 0.76
-    }
-    
-    if buckling_curve.lower() in alfa.keys():
-        return alfa[buckling_curve.lower()]
+    if buckling_curve.lower() in IMPERFECTION_FACTORS.keys():
+        return IMPERFECTION_FACTORS[buckling_curve.lower()]
     else:
         raise ValueError(f"The buckling curve must be one of 'a0', 'a', 'b', 'c' or 'd', not {buckling_curve}")
 
-def qsi(lmda: float, buckling_curve: str)-> float:
+def imperfection_factors(buckling_curves: np.ndarray)-> np.ndarray:
     '''
-    Returns the reduction factor for the compressive resistance
+    Returns the imperfection factor for each buckling curve in an array
+    '''
+    curves, inverse = np.unique(np.asarray(buckling_curves, dtype=str), return_inverse=True)
+    alfa = np.array([imperfection_factor(curve) for curve in curves], dtype=float)
+
+    return alfa[inverse].reshape(np.shape(buckling_curves))
+
+def reduction_factor(lmda: float|np.ndarray, alfa: float|np.ndarray)-> float|np.ndarray:
+    '''
+    Returns the reduction factor for the compressive resistance for an imperfection factor
     '''
-    alfa = imperfection_factor(buckling_curve)
     teta = 0.5*(1+alfa*(lmda-0.2)+lmda**2)
-    qsi = 1/(teta+sqrt(teta**2-lmda**2))
+    qsi = 1/(teta+np.sqrt(teta**2-lmda**2))
 
     return (qsi <= 1.0) * qsi + (qsi> 1.0)*1
 
+def qsi(lmda: float, buckling_curve: str)-> float:
+    '''
+    Returns the reduction factor for the compressive resistance
+    '''
+    return reduction_factor(lmda, imperfection_factor(buckling_curve))
+
+def parse_column_records(records: list[list[str]], first_line: int|None = 2)-> np.ndarray:
+    '''
+    Returns the csv records of columns as a structured array of COLUMN_SCHEMA.
+    A ValueError listing the bad values with their line numbers is raised if there are any.
+
+    'first_line' - Line number of the first record, None does not number the records
+    '''
+    typed_records = utils.parse_typed_records(records, COLUMN_SCHEMA, first_line=first_line)
+    typed_records.raise_errors('Column records')
+
+    return typed_records.data
+
+def read_column_csv(filename: str)-> utils.TypedRecords:
+    '''
+    Returns the columns in a csv file with the COLUMN_SCHEMA columns, the bad records
+    reported in its errors rather than raised
+    '''
+    with instrumentation.stage('csv.read'):
+        return utils.read_typed_csv(filename, COLUMN_SCHEMA)
+
 def csv_record_to_steelcolumn(record: list[str], **kwargs)-> SteelColumn:
-    sc = SteelColumn(
-        A = utils.str_to_float(record[1]),
-        h = utils.str_to_float(record[2]),
-        Ix = utils.str_to_float(record[3]),
-        Iy = utils.str_to_float(record[4]),
-        fy = utils.str_to_float(record[5]),
-        E = utils.str_to_float(record[6]),
-        kx = utils.str_to_float(record[7]),
-        ky = utils.str_to_float(record[8]),
-        **kwargs
-    )
-    
-    return sc
+    '''
+    Returns a SteelColumn for a csv record. A ValueError is raised for bad values.
+    '''
+    return structured_to_steelcolumns(parse_column_records([record], first_line=None), **kwargs)[0]
+
+def structured_to_steelcolumns(data: np.ndarray|dict[str, np.ndarray], **kwargs)-> list[SteelColumn]:
+    '''
+    Returns a SteelColumn for each record of a structured array of COLUMN_SCHEMA
+
+    'data' - The structured array or a dictionary with an array for each of the COLUMN_PROPERTIES
+    '''
+    values = {name: np.asarray(data[name], dtype=float).tolist() for name in COLUMN_PROPERTIES}
+
+    return [
+        SteelColumn(**{name: values[name][idx] for name in COLUMN_PROPERTIES}, **kwargs)
+        for idx in range(len(values['A']))
+    ]
+
+def structured_to_steelcolumnarray(data: np.ndarray, **kwargs)-> SteelColumnArray:
+    '''
+    Returns a SteelColumnArray for a structured array of COLUMN_SCHEMA
+    '''
+    return SteelColumnArray(**{name: data[name].astype(float) for name in COLUMN_PROPERTIES}, **kwargs)
+
+def csv_records_to_steelcolumnarray(records: list[list[str]], **kwargs)-> SteelColumnArray:
+    '''
+    Returns a SteelColumnArray for a list of csv records
+    '''
+    return structured_to_steelcolumnarray(parse_column_records(records), **kwargs)
 
 def convert_csv_data_to_steelcolumns(csv_data: list[list[str]])-> list[SteelColumn]:
     '''
     Returns a list of steel columns
     '''
-    converted_data = []
-    for data in csv_data[1:]:
-        converted_data.append(csv_record_to_steelcolumn(data))
-
-    return converted_data
+    return structured_to_steelcolumns(parse_column_records(csv_data[1:]))
 
 def calculate_factored_csv_load(record: list[str])-> float:
     '''
     Returns the factored load from csv data
     '''
-    loads = {'D': utils.str_to_float(record[9]), 'L': utils.str_to_float(record[10])}
+    data = parse_column_records([record], first_line=None)
+    loads = {'D': float(data['D'][0]), 'L': float(data['L'][0])}
     factored_load = []
     for combo in load_factors.EC_COMBINATIONS.values():
         factored_load.append(load_factors.factor_load(**loads, **combo))
 
     return max(factored_load)
 
-def run_all_columns(filename: str, **kwargs)-> list[SteelColumn]:
+def calculate_factored_csv_loads(records: list[list[str]])-> np.ndarray:
+    '''
+    Returns the governing factored load of each csv record
+    '''
+    return calculate_factored_csv_envelope(records)['Max']
+
+def calculate_factored_csv_envelope(records: list[list[str]])-> dict[str, np.ndarray]:
+    '''
+    Returns the envelope of the factored loads of the csv records for EC_COMBINATIONS
+    with the index of the governing load combination (see LoadCombinations.envelope)
+    '''
+    return factored_load_envelope(parse_column_records(records))
+
+def factored_load_envelope(data: np.ndarray)-> dict[str, np.ndarray]:
+    '''
+    Returns the envelope of the factored loads of a structured array of COLUMN_SCHEMA
+    for EC_COMBINATIONS (see calculate_factored_csv_envelope)
+    '''
+    combinations = load_factors.EC_LOAD_COMBINATIONS
+
+    return combinations.envelope(np.stack([data[case].astype(float) for case in combinations.cases], axis=1))
+
+def column_result_key(data: np.ndarray, **kwargs)-> str:
+    '''
+    Returns the result cache key of the check of a structured array of COLUMN_SCHEMA (without
+    the column names) with the EC_COMBINATIONS and the SteelColumnArray parameters 'kwargs'
+    '''
+    values = np.stack([data[name].astype(float) for name in COLUMN_SCHEMA.names[1:]], axis=1)
+    records_hash = hashlib.sha256(np.ascontiguousarray(values).tobytes()).hexdigest()
+    payload = {'records': records_hash, 'combinations': load_factors.EC_COMBINATIONS, 'parameters': kwargs}
+
+    return result_cache.canonical_key('columns', payload, result_cache.source_version(RESULT_MODULES))
+
+def check_csv_records(
+    records: list[list[str]],
+    cache: result_cache.ResultCache|str|None = None,
+    first_line: int|None = 2,
+    **kwargs
+)-> SteelColumnArray:
+    '''
+    Returns a SteelColumnArray for the csv records with the loading demand and capacity.
+    A ValueError listing the bad values with their line numbers is raised if there are any
+    (see parse_column_records).
+
+    'cache' - See check_column_data
+    '''
+    with instrumentation.stage('column.convert', len(records)):
+        data = parse_column_records(records, first_line)
+
+    return check_column_data(data, cache, **kwargs)
+
+def check_column_data(data: np.ndarray, cache: result_cache.ResultCache|str|None = None, **kwargs)-> SteelColumnArray:
+    '''
+    Returns a SteelColumnArray for a structured array of COLUMN_SCHEMA with the loading demand and capacity
+
+    'cache' - A result_cache.ResultCache or its file name. The checks of the same columns
+        (see column_result_key) are then read from it instead of being calculated again.
+        The checked columns are a few microseconds each, so the columns are cached as a
+        whole (a file or a chunk of iter_column_checks) rather than one by one.
+    '''
+    cache, close_cache = result_cache.open_cache(cache)
+    try:
+        key = None
+        if cache is not None:
+            key = column_result_key(data, **kwargs)
+            column_array = cache.get(key)
+            if column_array is not None:
+                instrumentation.count('result_cache.hits')
+                return column_array
+            instrumentation.count('result_cache.misses')
+        with instrumentation.stage('column.convert', len(data)):
+            column_array = structured_to_steelcolumnarray(data, **kwargs)
+            envelope = factored_load_envelope(data)
+        with instrumentation.stage('column.capacity', len(data)):
+            column_array.factored_load = envelope['Max']
+            column_array.governing_combination = envelope['Max Combo']
+            column_array.demand_capacity_ratio = column_array.factored_load / column_array.factored_capacity()
+        if cache is not None:
+            cache.put(key, column_array)
+    finally:
+        if close_cache:
+            cache.close()
+
+    return column_array
+
+def read_checked_column_csv(filename: str)-> np.ndarray:
+    '''
+    Returns the columns in a csv file as a structured array of COLUMN_SCHEMA.
+    A ValueError listing the bad values with their line numbers is raised if there are any.
+    '''
+    typed_records = read_column_csv(filename)
+    typed_records.raise_errors(filename)
+
+    return typed_records.data
+
+def run_all_columns_array(filename: str, cache: result_cache.ResultCache|str|None = None, **kwargs)-> SteelColumnArray:
+    '''
+    Returns a SteelColumnArray of the columns in a csv file with the loading demand and capacity
+
+    'cache' - See check_column_data
+    '''
+    return check_column_data(read_checked_column_csv(filename), cache, **kwargs)
+
+def run_all_columns(filename: str, cache: result_cache.ResultCache|str|None = None, **kwargs)-> list[SteelColumn]:
     '''
     Returns a list of Steel Columns in a csv file with the loading demand and capacity
+
+    'cache' - See check_column_data
+    'kwargs' - SteelColumnArray parameters, e.g. gamma_m1
     '''
-    file_data = utils.read_csv_file(filename)
-    list_of_steelcolumns = []
-    for data in file_data[1:]:
-        steelcolumn = csv_record_to_steelcolumn(data)
-        list_of_steelcolumns.append(steelcolumn)
-        demand = calculate_factored_csv_load(data)
-        capacity = min(steelcolumn.factored_compressive_resistance(), steelcolumn.factored_crushing_load())
-        ratio = demand / capacity
-        steelcolumn.factored_load = demand
-        steelcolumn.demand_capacity_ratio = ratio
-    
-    return list_of_steelcolumns
\ No newline at end of file
+    column_array = check_column_data(read_checked_column_csv(filename), cache, **kwargs)
+    # The checked array holds the parsed properties, so the records are not parsed again
+    properties = {name: getattr(column_array, name) for name in COLUMN_PROPERTIES}
+    list_of_steelcolumns = structured_to_steelcolumns(properties)
+    for steelcolumn, gamma_m1, factored_load, demand_capacity_ratio in zip(
+        list_of_steelcolumns,
+        column_array.gamma_m1.tolist(),
+        column_array.factored_load.tolist(),
+        column_array.demand_capacity_ratio.tolist()
+    ):
+        steelcolumn.gamma_m1 = gamma_m1
+        steelcolumn.factored_load = factored_load
+        steelcolumn.demand_capacity_ratio = demand_capacity_ratio
+
+    return list_of_steelcolumns
+
+def iter_column_checks(
+    filename: str,
+    chunk_size: int = 10000,
+    cache: result_cache.ResultCache|str|None = None,
+    **kwargs
+)-> Iterator[tuple[list[str], SteelColumnArray]]:
+    '''
+    Yields the column names and the checked SteelColumnArray of each chunk of a csv file.
+    A ValueError with the line numbers of the bad values of a chunk is raised when it is read.
+
+    'cache' - See check_column_data. Each chunk is cached separately, so only the chunks
+        with changed columns are checked again
+    '''
+    cache, close_cache = result_cache.open_cache(cache)
+    try:
+        for typed_records in utils.iter_typed_csv_chunks(filename, COLUMN_SCHEMA, chunk_size):
+            typed_records.raise_errors(filename)
+            yield typed_records.data['Column'].tolist(), check_column_data(typed_records.data, cache, **kwargs)
+    finally:
+        if close_cache:
+            cache.close()
+
+def stream_all_columns(
+    filename: str,
+    output_filename: str|None = None,
+    chunk_size: int = 10000,
+    cache: result_cache.ResultCache|str|None = None,
+    **kwargs
+)-> ColumnCheckSummary:
+    '''
+    Returns the summary of the columns in a csv file checked in chunks of 'chunk_size' rows.
+    The results of each chunk are written to 'output_filename' before the next chunk is read,
+    so the memory used does not grow with the number of columns
+    '''
+    summary = ColumnCheckSummary()
+    output_file = open(output_filename, 'w', newline='') if output_filename is not None else None
+    try:
+        if output_file is not None:
+            csv_writer = csv.writer(output_file)
+            csv_writer.writerow(['Column', 'Factored Load', 'Demand Capacity Ratio'])
+        for names, column_array in iter_column_checks(filename, chunk_size, cache, **kwargs):
+            summary.update(names, column_array.demand_capacity_ratio)
+            if output_file is not None:
+                csv_writer.writerows(zip(
+                    names,
+                    column_array.factored_load.tolist(),
+                    column_array.demand_capacity_ratio.tolist()
+                ))
+    finally:
+        if output_file is not None:
+            output_file.close()
+
+    return summary
\ No newline at end of file
@@ -0,0 +1,233 @@
+import cProfile, json, os, threading, time, tracemalloc
+from bisect import bisect_right
+from contextlib import contextmanager, nullcontext
+from dataclasses import dataclass, field
+from functools import wraps
+
+ENVIRONMENT_VARIABLE = 'ENG_MODULE_INSTRUMENTATION'
+
+# Upper bounds in seconds of the latency histogram buckets, 4 per decade from 1 us to 100 s.
+# The last bucket counts the latencies above the last bound.
+HISTOGRAM_BOUNDS = tuple(10. ** (exponent / 4) for exponent in range(-24, 9))
+
+_NULL_CONTEXT = nullcontext()
+
+@dataclass
+class StageStats:
+    '''
+    Timings of one named stage. 'histogram' counts the calls by their latency per item
+    in the buckets of HISTOGRAM_BOUNDS, 'self_seconds' excludes the time of nested stages
+    and 'max_memory' is the largest traced memory in bytes at the end of a call
+    (0 unless the memory is traced).
+    '''
+    count: int = 0
+    items: int = 0
+    seconds: float = 0.
+    self_seconds: float = 0.
+    min_seconds: float = float('inf')
+    max_seconds: float = 0.
+    max_memory: int = 0
+    histogram: list[int] = field(default_factory=lambda: [0] * (len(HISTOGRAM_BOUNDS) + 1))
+
+    def add(self, seconds: float, self_seconds: float, items: int, memory: int):
+        self.count += 1
+        self.items += items
+        self.seconds += seconds
+        self.self_seconds += self_seconds
+        self.min_seconds = min(self.min_seconds, seconds)
+        self.max_seconds = max(self.max_seconds, seconds)
+        self.max_memory = max(self.max_memory, memory)
+        self.histogram[bisect_right(HISTOGRAM_BOUNDS, seconds / max(items, 1))] += 1
+
+    def to_dict(self)-> dict:
+        return {
+            'count': self.count,
+            'items': self.items,
+            'seconds': self.seconds,
+            'self_seconds': self.self_seconds,
+            'mean_seconds': self.seconds / self.count if self.count else 0.,
+            'seconds_per_item': self.seconds / self.items if self.items else 0.,
+            'min_seconds': self.min_seconds if self.count else 0.,
+            'max_seconds': self.max_seconds,
+            'max_memory': self.max_memory,
+            'histogram': self.histogram,
+        }
+
+class Instrumentation:
+    '''
+    Named stage timers, counters and memory snapshots. Everything is off until enable()
+    is called, and a disabled stage only costs one attribute check.
+    The stages can be nested and are recorded per thread.
+    '''
+    def __init__(self):
+        self.enabled = False
+        self.trace_memory = False
+        self.profiler = None
+        self.stages = {}
+        self.counters = {}
+        self.snapshots = []
+        self.folded = {}
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    def enable(self, memory: bool = False, profile: bool = False):
+        '''
+        Starts recording
+
+        'memory' - Also trace the memory allocations with tracemalloc (slow)
+        'profile' - Also run the cProfile profiler for dump_profile (slow)
+        '''
+        self.enabled = True
+        if memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+        self.trace_memory = memory or self.trace_memory
+        if profile and self.profiler is None:
+            self.profiler = cProfile.Profile()
+            self.profiler.enable()
+
+    def disable(self):
+        '''
+        Stops recording and the memory tracing and profiler started by enable(). The records are kept.
+        '''
+        self.enabled = False
+        if self.trace_memory:
+            tracemalloc.stop()
+            self.trace_memory = False
+        if self.profiler is not None:
+            self.profiler.disable()
+
+    def reset(self):
+        '''
+        Removes all the records
+        '''
+        with self._lock:
+            self.stages = {}
+            self.counters = {}
+            self.snapshots = []
+            self.folded = {}
+        if self.profiler is not None:
+            self.profiler = cProfile.Profile()
+            if self.enabled:
+                self.profiler.enable()
+
+    def stage(self, name: str, items: int = 1):
+        '''
+        Returns a context manager that times the block as the stage 'name' processing 'items' items
+        '''
+        if not self.enabled:
+            return _NULL_CONTEXT
+        return self._timed_stage(name, items)
+
+    @contextmanager
+    def _timed_stage(self, name: str, items: int):
+        stack = getattr(self._local, 'stack', None)
+        if stack is None:
+            stack = self._local.stack = []
+        # Each entry holds the name and the time spent in the nested stages
+        entry = [name, 0.]
+        stack.append(entry)
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            seconds = time.perf_counter() - start
+            stack.pop()
+            if stack:
+                stack[-1][1] += seconds
+            self_seconds = seconds - entry[1]
+            memory = tracemalloc.get_traced_memory()[0] if self.trace_memory else 0
+            path = ';'.join([parent[0] for parent in stack] + [name])
+            with self._lock:
+                self.stages.setdefault(name, StageStats()).add(seconds, self_seconds, items, memory)
+                self.folded[path] = self.folded.get(path, 0.) + self_seconds
+
+    def timed(self, name: str):
+        '''
+        Returns a decorator that times each call of a function as the stage 'name'
+        '''
+        def decorator(function):
+            @wraps(function)
+            def wrapper(*args, **kwargs):
+                if not self.enabled:
+                    return function(*args, **kwargs)
+                with self._timed_stage(name, 1):
+                    return function(*args, **kwargs)
+            return wrapper
+        return decorator
+
+    def count(self, name: str, n: int = 1):
+        '''
+        Adds 'n' to the counter 'name'
+        '''
+        if not self.enabled:
+            return
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + n
+
+    def snapshot_memory(self, label: str):
+        '''
+        Records the current and peak traced memory in bytes under 'label' (zeros unless the memory is traced)
+        '''
+        if not self.enabled:
+            return
+        current, peak = tracemalloc.get_traced_memory() if self.trace_memory else (0, 0)
+        with self._lock:
+            self.snapshots.append({'label': label, 'time': time.time(), 'current': current, 'peak': peak})
+
+    def report(self)-> dict:
+        '''
+        Returns all the records as a JSON compatible dictionary
+        '''
+        with self._lock:
+            return {
+                'histogram_bounds': list(HISTOGRAM_BOUNDS),
+                'stages': {name: stats.to_dict() for name, stats in sorted(self.stages.items())},
+                'counters': dict(sorted(self.counters.items())),
+                'memory': list(self.snapshots),
+            }
+
+    def save_json(self, filename: str):
+        '''
+        Writes the report to a JSON file
+        '''
+        with open(filename, 'w') as json_file:
+            json.dump(self.report(), json_file, indent=2)
+
+    def save_folded(self, filename: str):
+        '''
+        Writes the self time of each stage and its parent stages in the folded stack format
+        ('outer;inner microseconds' per line) read by flamegraph.pl, speedscope and similar tools
+        '''
+        with self._lock:
+            lines = [f'{path} {round(seconds * 1e6)}' for path, seconds in sorted(self.folded.items())]
+        with open(filename, 'w') as folded_file:
+            folded_file.write('\n'.join(lines) + '\n')
+
+    def dump_profile(self, filename: str):
+        '''
+        Writes the cProfile statistics to 'filename' for pstats, snakeviz or flameprof.
+        Needs enable(profile=True).
+        '''
+        if self.profiler is None:
+            raise RuntimeError('The profiler is not running. Call enable(profile=True) first')
+        self.profiler.create_stats()
+        self.profiler.dump_stats(filename)
+        if self.enabled:
+            self.profiler.enable()
+
+INSTRUMENTATION = Instrumentation()
+
+stage = INSTRUMENTATION.stage
+timed = INSTRUMENTATION.timed
+count = INSTRUMENTATION.count
+snapshot_memory = INSTRUMENTATION.snapshot_memory
+enable = INSTRUMENTATION.enable
+disable = INSTRUMENTATION.disable
+reset = INSTRUMENTATION.reset
+report = INSTRUMENTATION.report
+save_json = INSTRUMENTATION.save_json
+save_folded = INSTRUMENTATION.save_folded
+dump_profile = INSTRUMENTATION.dump_profile
+
+if os.environ.get(ENVIRONMENT_VARIABLE, '') not in ('', '0'):
+    enable()
@@ -1,3 +1,7 @@
+import itertools
+from dataclasses import dataclass
+import numpy as np
+
 AREMA_COMBINATIONS = {
     'SLD_G1': {'D': 1., 'L': 1., 'I': 1., 'CF': 1., 'E': 1., 'B': 1., 'SF': 1.},
     'SLD_G2': {'D': 1., 'E': 1., 'B': 1., 'SF': 1., 'W': 1.},
@@ -26,4 +30,195 @@ def factor_load(
         + L_factor * L
     )
 
-    return factored_load
\ No newline at end of file
+    return factored_load
+
+@dataclass
+class LoadCombinations:
+    '''
+    A set of load combinations stored as a matrix of load factors
+    'names' - Name of each load combination (M)
+    'cases' - Name of each load case (K)
+    'factors' - Load factors, shape (M, K)
+    '''
+    names: list[str]
+    cases: list[str]
+    factors: np.ndarray
+
+    def __post_init__(self):
+        self.names = list(self.names)
+        self.cases = list(self.cases)
+        self.factors = np.asarray(self.factors, dtype=float).reshape(len(self.names), len(self.cases))
+
+    def __len__(self)-> int:
+        return len(self.names)
+
+    @classmethod
+    def from_dict(cls, combinations: dict[str, dict[str, float]], cases: list[str]|None = None)-> 'LoadCombinations':
+        '''
+        Returns the load combinations of a dictionary like AREMA_COMBINATIONS or EC_COMBINATIONS.
+        A '_factor' suffix in the load case names is removed.
+        'cases' - Load cases of the matrix. By default all the cases in 'combinations' in order of appearance
+        '''
+        combinations = {
+            name: {case.removesuffix('_factor'): factor for case, factor in combo.items()}
+            for name, combo in combinations.items()
+        }
+        if cases is None:
+            cases = list(dict.fromkeys(case for combo in combinations.values() for case in combo))
+        factors = [[combo.get(case, 0.) for case in cases] for combo in combinations.values()]
+
+        return cls(list(combinations), cases, np.array(factors, dtype=float))
+
+    def to_dict(self)-> dict[str, dict[str, float]]:
+        '''
+        Returns the load combinations as {combination: {case: factor}} without the zero factors
+        '''
+        return {
+            name: {case: float(factor) for case, factor in zip(self.cases, row) if factor != 0.}
+            for name, row in zip(self.names, self.factors)
+        }
+
+    def select(self, index: np.ndarray)-> 'LoadCombinations':
+        '''
+        Returns the load combinations in 'index' (integer indices or a boolean mask)
+        '''
+        index = np.arange(len(self))[index]
+
+        return LoadCombinations([self.names[idx] for idx in index], self.cases, self.factors[index])
+
+    def factored_effects(self, effects: np.ndarray)-> np.ndarray:
+        '''
+        Returns the factored effects of every member and load combination, shape (N, M)
+        'effects' - Effect of each load case on each member, shape (N, K)
+        '''
+        return np.asarray(effects, dtype=float) @ self.factors.T
+
+    def envelope(self, effects: np.ndarray)-> dict[str, np.ndarray]:
+        '''
+        Returns the maximum and minimum factored effect of every member and the index of
+        the load combination that governs each of them
+        'effects' - Effect of each load case on each member, shape (N, K)
+        '''
+        factored_effects = self.factored_effects(effects)
+        max_combo = np.argmax(factored_effects, axis=1)
+        min_combo = np.argmin(factored_effects, axis=1)
+        rows = np.arange(len(factored_effects))
+
+        return {
+            'Max': factored_effects[rows, max_combo],
+            'Max Combo': max_combo,
+            'Min': factored_effects[rows, min_combo],
+            'Min Combo': min_combo,
+        }
+
+    def prune_dominated(self, case_signs: np.ndarray, envelope: str = 'both')-> 'LoadCombinations':
+        '''
+        Returns the load combinations without the ones that can never govern the envelope.
+        Combination B is dominated by A if, for every load case, A's factor is not smaller
+        where the effects are known to be positive, not larger where they are known to be
+        negative and equal where the sign is unknown.
+        'case_signs' - +1, -1 or 0 (unknown) for each load case, see case_signs()
+        'envelope' - 'max', 'min' or 'both'
+        '''
+        if envelope not in ('max', 'min', 'both'):
+            raise ValueError(f"The envelope must be one of 'max', 'min' or 'both', not {envelope}")
+
+        keep = np.zeros(len(self), dtype=bool)
+        if envelope in ('max', 'both'):
+            keep |= ~_dominated(self.factors, np.asarray(case_signs))
+        if envelope in ('min', 'both'):
+            keep |= ~_dominated(self.factors, -np.asarray(case_signs))
+
+        return self.select(keep)
+
+def _dominated(factors: np.ndarray, case_signs: np.ndarray)-> np.ndarray:
+    '''
+    Returns True for the rows of 'factors' whose maximum effect is never larger than another row's
+    '''
+    # difference[a, b, k] is how much row 'a' adds over row 'b' in the direction of the effect of case k
+    difference = (factors[:, None, :] - factors[None, :, :]) * case_signs
+    not_worse = np.all(np.where(case_signs == 0, factors[:, None, :] == factors[None, :, :], difference >= 0.), axis=2)
+    identical = np.all(factors[:, None, :] == factors[None, :, :], axis=2)
+    # A row dominates another if it is never worse and either differs from it or comes first
+    earlier = np.arange(len(factors))[:, None] < np.arange(len(factors))[None, :]
+    dominates = not_worse & (~identical | earlier)
+
+    return np.any(dominates, axis=0)
+
+def case_signs(effects: np.ndarray)-> np.ndarray:
+    '''
+    Returns +1 for the load cases whose effects are never negative, -1 for the ones that are
+    never positive and 0 for the rest
+    'effects' - Effect of each load case on each member, shape (N, K)
+    '''
+    effects = np.asarray(effects, dtype=float)
+    positive = np.all(effects >= 0., axis=0)
+    negative = np.all(effects <= 0., axis=0)
+
+    return np.where(positive, 1, np.where(negative, -1, 0))
+
+def generate_ec_combinations(
+    case_categories: dict[str, str],
+    gamma_g_sup: float = 1.35,
+    gamma_g_inf: float = 1.0,
+    gamma_q: float = 1.5,
+    psi_0: dict[str, float]|float = 0.7,
+)-> LoadCombinations:
+    '''
+    Returns the Eurocode (EN 1990, eq. 6.10) ultimate limit state combinations.
+    Every permanent case is taken as unfavourable or favourable and every variable case
+    as leading, accompanying or absent, with at most one leading variable case.
+    'case_categories' - {case: 'G' (permanent) or 'Q' (variable)}
+    'psi_0' - Combination factor of the accompanying variable cases, one value or one per case
+    '''
+    permanent = [case for case, category in case_categories.items() if category.upper() == 'G']
+    variable = [case for case, category in case_categories.items() if category.upper() == 'Q']
+    unknown = [case for case, category in case_categories.items() if category.upper() not in ('G', 'Q')]
+    if unknown:
+        raise ValueError(f"The case categories must be 'G' or 'Q', not {[case_categories[case] for case in unknown]}")
+    if isinstance(psi_0, dict):
+        psi_0 = [psi_0[case] for case in variable]
+    else:
+        psi_0 = [psi_0] * len(variable)
+
+    rows = []
+    for g_factors in itertools.product((gamma_g_sup, gamma_g_inf), repeat=len(permanent)):
+        for leading in [None] + list(range(len(variable))):
+            accompanying = [idx for idx in range(len(variable)) if idx != leading] if leading is not None else []
+            for present in itertools.product((True, False), repeat=len(accompanying)):
+                q_factors = [0.] * len(variable)
+                if leading is not None:
+                    q_factors[leading] = gamma_q
+                for idx, is_present in zip(accompanying, present):
+                    q_factors[idx] = psi_0[idx] * gamma_q if is_present else 0.
+                rows.append(list(g_factors) + q_factors)
+
+    factors = np.unique(np.array(rows, dtype=float).reshape(-1, len(permanent) + len(variable)), axis=0)[::-1]
+    names = [f'ULS_{idx + 1:02d}' for idx in range(len(factors))]
+
+    return LoadCombinations(names, permanent + variable, factors)
+
+def generate_arema_combinations(case_categories: dict[str, str])-> LoadCombinations:
+    '''
+    Returns the AREMA load groups of AREMA_COMBINATIONS for a set of load cases.
+    Every case takes the factor of its category in each group and groups that
+    repeat another group for these cases are dropped.
+    'case_categories' - {case: AREMA load category ('D', 'L', 'I', 'CF', 'E', 'B', 'SF', 'W', 'WL', 'LF' or 'F')}
+    '''
+    categories = {category for combo in AREMA_COMBINATIONS.values() for category in combo}
+    unknown = [category for category in case_categories.values() if category not in categories]
+    if unknown:
+        raise ValueError(f'Unknown AREMA load categories: {unknown}')
+
+    cases = list(case_categories)
+    names = []
+    rows = []
+    for name, combo in AREMA_COMBINATIONS.items():
+        row = [combo.get(case_categories[case], 0.) for case in cases]
+        if any(row) and row not in rows:
+            names.append(name)
+            rows.append(row)
+
+    return LoadCombinations(names, cases, np.array(rows, dtype=float))
+
+EC_LOAD_COMBINATIONS = LoadCombinations.from_dict(EC_COMBINATIONS)
@@ -0,0 +1,215 @@
+from math import pi
+from dataclasses import dataclass
+import numpy as np
+from eng_module import seismic_analysis
+
+COMBINATIONS = ('SRSS', 'CQC')
+
+@dataclass
+class ShearBuildings:
+    '''
+    A batch of B shear buildings with n storeys each: rigid floors connected by storey
+    springs, with one horizontal degree of freedom per floor. The storeys are numbered
+    from the ground up. Buildings with fewer storeys can be analyzed in separate batches.
+
+    'mass' - Mass of each floor in tons, shape (B, n)
+    'stiffness' - Lateral stiffness of each storey in kN/m, shape (B, n). Storey i connects
+        floor i to the floor below it (the ground for the first storey)
+    'height' - Height of each storey in m, shape (B, n), only needed for the drift ratios
+    '''
+    mass: np.ndarray
+    stiffness: np.ndarray
+    height: np.ndarray|None = None
+
+    def __post_init__(self):
+        self.mass = np.atleast_2d(np.asarray(self.mass, dtype=float))
+        self.stiffness = np.atleast_2d(np.asarray(self.stiffness, dtype=float))
+        if self.mass.shape != self.stiffness.shape:
+            raise ValueError(f'The masses {self.mass.shape} and stiffnesses {self.stiffness.shape} must have the same shape')
+        if np.any(self.mass <= 0.) or np.any(self.stiffness <= 0.):
+            raise ValueError('The masses and stiffnesses must be positive')
+        if self.height is not None:
+            self.height = np.broadcast_to(np.asarray(self.height, dtype=float), self.mass.shape)
+
+    def __len__(self)-> int:
+        return self.mass.shape[0]
+
+    @property
+    def n_storeys(self)-> int:
+        return self.mass.shape[1]
+
+    def stiffness_matrix(self)-> np.ndarray:
+        '''
+        Returns the lateral stiffness matrix of each building, shape (B, n, n)
+        '''
+        k = self.stiffness
+        above = np.concatenate([k[:, 1:], np.zeros((len(self), 1))], axis=1)
+        K = np.zeros((len(self), self.n_storeys, self.n_storeys))
+        idx = np.arange(self.n_storeys)
+        K[:, idx, idx] = k + above
+        K[:, idx[:-1], idx[1:]] = -k[:, 1:]
+        K[:, idx[1:], idx[:-1]] = -k[:, 1:]
+
+        return K
+
+    def modes(self)-> 'ModalProperties':
+        '''
+        Returns the modes of vibration of all the buildings from one batched eigensolve.
+        The mass matrix is diagonal, so the generalized problem K phi = w^2 M phi becomes the
+        symmetric problem (M^-1/2 K M^-1/2) v = w^2 v with phi = M^-1/2 v.
+        '''
+        scale = 1. / np.sqrt(self.mass)
+        A = scale[:, :, None] * self.stiffness_matrix() * scale[:, None, :]
+        eigenvalues, eigenvectors = np.linalg.eigh(A)
+        # Mass normalized shapes, phi^T M phi = 1, one mode per row
+        shapes = np.swapaxes(eigenvectors * scale[:, :, None], 1, 2)
+        # The sign of an eigenvector is arbitrary, so the roof displacement is made positive
+        shapes *= np.where(shapes[:, :, -1:] < 0., -1., 1.)
+        participation_factors = np.einsum('bms,bs->bm', shapes, self.mass)
+        circular_frequencies = np.sqrt(np.maximum(eigenvalues, 0.))
+
+        return ModalProperties(
+            circular_frequencies = circular_frequencies,
+            periods = 2 * pi / circular_frequencies,
+            shapes = shapes,
+            participation_factors = participation_factors,
+            effective_masses = participation_factors ** 2,
+            total_mass = self.mass.sum(axis=1),
+        )
+
+@dataclass
+class ModalProperties:
+    '''
+    The modes of a batch of buildings sorted from the longest period, N modes per building
+
+    'circular_frequencies' - Circular frequencies in rad/s, shape (B, N)
+    'periods' - Periods in s, shape (B, N)
+    'shapes' - Mass normalized mode shapes (roof displacement positive), shape (B, N, n)
+    'participation_factors' - Modal participation factors in tons^0.5, shape (B, N)
+    'effective_masses' - Effective modal masses in tons, shape (B, N)
+    'total_mass' - Mass of each building in tons, shape (B,)
+    '''
+    circular_frequencies: np.ndarray
+    periods: np.ndarray
+    shapes: np.ndarray
+    participation_factors: np.ndarray
+    effective_masses: np.ndarray
+    total_mass: np.ndarray
+
+    def effective_mass_ratios(self)-> np.ndarray:
+        '''
+        Returns the cumulative effective mass of the modes divided by the mass of the building, shape (B, N)
+        '''
+        return np.cumsum(self.effective_masses, axis=1) / self.total_mass[:, None]
+
+    def modes_for_mass_ratio(self, ratio: float = 0.9)-> np.ndarray:
+        '''
+        Returns the number of modes of each building needed for a cumulative effective mass
+        of at least 'ratio' of its mass (Eurocode 1998-1-1 4.3.3.3.1 asks for 90 %), shape (B,)
+        '''
+        reached = self.effective_mass_ratios() >= ratio - 1e-12
+        return np.where(reached.any(axis=1), np.argmax(reached, axis=1) + 1, reached.shape[1])
+
+@dataclass
+class ModalResponse:
+    '''
+    The peak responses of a batch of buildings combined over the modes. Each quantity is
+    combined separately, so the combined storey forces are not in equilibrium with the
+    combined storey shears.
+
+    'spectral_accelerations' - Spectral acceleration of each mode in m/s2, shape (B, N)
+    'displacements' - Floor displacements in m, shape (B, n)
+    'drifts' - Storey drifts (relative displacement of the floors) in m, shape (B, n)
+    'drift_ratios' - Storey drifts divided by the storey heights, shape (B, n), None without heights
+    'storey_forces' - Lateral floor forces in kN, shape (B, n)
+    'storey_shears' - Storey shears in kN, shape (B, n)
+    'base_shear' - Base shear in kN, shape (B,)
+    '''
+    spectral_accelerations: np.ndarray
+    displacements: np.ndarray
+    drifts: np.ndarray
+    drift_ratios: np.ndarray|None
+    storey_forces: np.ndarray
+    storey_shears: np.ndarray
+    base_shear: np.ndarray
+
+def cqc_correlation(circular_frequencies: np.ndarray, damping_ratio: float|np.ndarray)-> np.ndarray:
+    '''
+    Returns the correlation coefficients between the modes of the complete quadratic
+    combination for equal modal damping (Der Kiureghian, 1981), shape (B, N, N).
+    Modes with equal frequencies are fully correlated, also without damping, where the
+    formula is 0 / 0.
+
+    'damping_ratio' - Damping ratio of the modes (0.05 for 5 %), a scalar or shape (B,)
+    '''
+    zeta = np.asarray(damping_ratio, dtype=float).reshape(-1, 1, 1)
+    beta = circular_frequencies[:, None, :] / circular_frequencies[:, :, None]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        rho = 8 * zeta ** 2 * (1 + beta) * beta ** 1.5 / ((1 - beta ** 2) ** 2 + 4 * zeta ** 2 * beta * (1 + beta) ** 2)
+
+    return np.where(beta == 1., 1., rho)
+
+def combine_modes(modal_values: np.ndarray, combination: str = 'CQC', correlation: np.ndarray|None = None)-> np.ndarray:
+    '''
+    Returns the peak of a response combined over the modes, shape (B, ...)
+
+    'modal_values' - Peak response of each mode, shape (B, N, ...)
+    'combination' - 'SRSS' (square root of the sum of the squares) or 'CQC' (complete quadratic combination)
+    'correlation' - Correlation coefficients of the modes for 'CQC' (see cqc_correlation), shape (B, N, N)
+    '''
+    if combination == 'SRSS':
+        return np.sqrt(np.sum(modal_values ** 2, axis=1))
+    elif combination == 'CQC':
+        if correlation is None:
+            raise ValueError('The CQC combination needs the correlation coefficients of the modes')
+        values = modal_values.reshape(modal_values.shape[0], modal_values.shape[1], -1)
+        squared = np.sum(values * (correlation @ values), axis=1)
+        return np.sqrt(np.maximum(squared, 0.)).reshape(modal_values.shape[:1] + modal_values.shape[2:])
+    else:
+        raise ValueError(f"The combination must be one of {', '.join(COMBINATIONS)}, not {combination}")
+
+def response_spectrum_analysis(
+    buildings: ShearBuildings,
+    spectrum: seismic_analysis.Ec_response_spectrum,
+    n_modes: int|None = None,
+    combination: str = 'CQC',
+    modes: ModalProperties|None = None,
+)-> ModalResponse:
+    '''
+    Returns the peak responses of a batch of shear buildings to the elastic response spectrum
+
+    'spectrum' - Elastic response spectrum. Its 'ag' can be an array of shape (B, 1) for a
+        different ground acceleration per building. Its damping is the damping of the modes for CQC
+    'n_modes' - Number of modes combined (the ones with the longest periods), all of them if None
+    'combination' - 'SRSS' or 'CQC' (see combine_modes)
+    'modes' - The modes of the buildings if already calculated (see ShearBuildings.modes)
+
+    Raises a ValueError if a combined mode has a period beyond the 4 s of the spectrum.
+    '''
+    modes = buildings.modes() if modes is None else modes
+    n_modes = buildings.n_storeys if n_modes is None else min(n_modes, buildings.n_storeys)
+    omega = modes.circular_frequencies[:, :n_modes]
+    shapes = modes.shapes[:, :n_modes]
+    gamma = modes.participation_factors[:, :n_modes]
+
+    Sa = spectrum.acceleration(modes.periods[:, :n_modes])
+    # Peak floor displacements of each mode, shape (B, N, n)
+    displacements = (gamma * Sa / omega ** 2)[:, :, None] * shapes
+    drifts = np.diff(displacements, axis=2, prepend=0.)
+    storey_forces = buildings.mass[:, None, :] * shapes * (gamma * Sa)[:, :, None]
+    storey_shears = np.cumsum(storey_forces[:, :, ::-1], axis=2)[:, :, ::-1]
+
+    correlation = None
+    if combination == 'CQC':
+        correlation = cqc_correlation(omega, np.broadcast_to(np.asarray(spectrum.damping, dtype=float) / 100., (len(buildings),)))
+    combined = {
+        name: combine_modes(values, combination, correlation)
+        for name, values in (('displacements', displacements), ('drifts', drifts), ('storey_forces', storey_forces), ('storey_shears', storey_shears))
+    }
+
+    return ModalResponse(
+        spectral_accelerations = Sa,
+        drift_ratios = None if buildings.height is None else combined['drifts'] / buildings.height,
+        base_shear = combined['storey_shears'][:, 0],
+        **combined,
+    )
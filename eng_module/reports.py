@@ -0,0 +1,439 @@
+import argparse, html, itertools, json, os, re, sys
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from functools import lru_cache, partial
+from typing import Iterable, Iterator
+import numpy as np
+from eng_module.beam_batch import extract_beam_results
+from eng_module import columns, instrumentation, load_factors, seismic_analysis
+
+# Points of a curve after downsampling (see downsample). Curves with more points are
+# drawn with WebGL traces, which stay responsive with a few thousand points per figure
+MAX_POINTS = 2000
+
+FIGURE_WIDTH = 700
+
+FIGURE_HEIGHT = 500
+
+# The axis styling of the seismic design app
+AXIS_STYLE = dict(
+    title_font=dict(size=18, color='black'),
+    zeroline=True, zerolinewidth=2, zerolinecolor='black',
+    showgrid=True, gridwidth=1, gridcolor='black', griddash='dash', minor_griddash='dot',
+    ticks='inside', tickwidth=2, tickcolor='black', ticklen=10,
+)
+
+PLOTLYJS_NAME = 'plotly.min.js'
+
+INDEX_NAME = 'index.html'
+
+PAGE_STYLE = '''
+body { font-family: sans-serif; margin: 2em; }
+table { border-collapse: collapse; margin-bottom: 1em; }
+td, th { border: 1px solid #999; padding: 0.25em 0.75em; text-align: left; }
+.fail { color: #b00; font-weight: bold; }
+.pass { color: #070; }
+'''
+
+@dataclass
+class MemberReport:
+    '''
+    The content of the report of one member: a table of results and plotly figures
+
+    'name' - Name of the member
+    'kind' - 'Column', 'Beam' or 'Seismic system'
+    'results' - Rows of the results table as {label: value}
+    'figures' - Figures as {'data': traces, 'layout': layout}, in the format of plotly.js.
+        The layout is applied over the shared template (see figure_template)
+    'demand_capacity_ratio' - Governing demand to capacity ratio, None if there is no capacity
+    'governing' - Name of the governing load combination, if any
+    '''
+    name: str
+    kind: str
+    results: dict = field(default_factory=dict)
+    figures: list[dict] = field(default_factory=list)
+    demand_capacity_ratio: float|None = None
+    governing: str|None = None
+
+@lru_cache(maxsize=None)
+def figure_template()-> str:
+    '''
+    Returns the JSON of the plotly layout template shared by all the figures. It is validated
+    by plotly once per process and the figures of the reports only reference it, so plotly
+    is not used (or imported) to render the members.
+    '''
+    from plotly import graph_objects as go
+    from plotly.utils import PlotlyJSONEncoder
+
+    template = go.layout.Template(layout=go.Layout(
+        width=FIGURE_WIDTH, height=FIGURE_HEIGHT,
+        xaxis=AXIS_STYLE, yaxis=AXIS_STYLE,
+        legend=dict(orientation='h', yanchor='bottom', y=1.02, xanchor='right', x=1.),
+        plot_bgcolor='white',
+    ))
+
+    return json.dumps(template.to_plotly_json(), cls=PlotlyJSONEncoder, separators=(',', ':'))
+
+def plotlyjs_source(directory: str, include_plotlyjs: str = 'directory')-> str:
+    '''
+    Returns the src of the plotly.js script of the reports in 'directory'
+
+    'include_plotlyjs' - 'directory' copies plotly.js next to the reports once, so they work
+        offline, and 'cdn' loads it from the plotly CDN
+    '''
+    from plotly import offline
+
+    if include_plotlyjs == 'cdn':
+        return f'https://cdn.plot.ly/plotly-{offline.get_plotlyjs_version()}.min.js'
+    if include_plotlyjs != 'directory':
+        raise ValueError(f"The plotly.js source must be one of 'directory' or 'cdn', not {include_plotlyjs}")
+    path = os.path.join(directory, PLOTLYJS_NAME)
+    if not os.path.exists(path):
+        with open(path, 'w', encoding='utf-8') as script_file:
+            script_file.write(offline.get_plotlyjs())
+
+    return PLOTLYJS_NAME
+
+def downsample(x: np.ndarray, y: np.ndarray, max_points: int = MAX_POINTS)-> tuple[np.ndarray, np.ndarray]:
+    '''
+    Returns at most about 'max_points' points of the curve ('x', 'y'): the first and last
+    points and the smallest and largest 'y' of each of max_points / 2 buckets of
+    consecutive points, so the peaks of the curve are kept
+    '''
+    x, y = np.asarray(x, dtype=float), np.asarray(y, dtype=float)
+    n = len(y)
+    if n <= max_points:
+        return x, y
+    n_buckets = max(1, (max_points - 2) // 2)
+    bucket_size = -(-n // n_buckets)
+    index = np.minimum(np.arange(n_buckets * bucket_size), n - 1).reshape(n_buckets, bucket_size)
+    rows = np.arange(n_buckets)
+    values = np.nan_to_num(y[index], nan=0.)
+    keep = np.unique(np.concatenate([[0, n - 1], index[rows, values.argmin(axis=1)], index[rows, values.argmax(axis=1)]]))
+
+    return x[keep], y[keep]
+
+def curve(x: np.ndarray, y: np.ndarray, name: str, max_points: int = MAX_POINTS, **kwargs)-> dict:
+    '''
+    Returns a WebGL line trace of the curve ('x', 'y') downsampled to 'max_points'
+    '''
+    x, y = downsample(x, y, max_points)
+
+    return {'type': 'scattergl', 'mode': 'lines', 'name': name, 'x': x, 'y': y} | kwargs
+
+def _axes(x_title: str, y_title: str, title: str)-> dict:
+    return {'title': {'text': title}, 'xaxis': {'title': {'text': x_title}}, 'yaxis': {'title': {'text': y_title}}}
+
+def column_reports(
+    column_array: columns.SteelColumnArray|list[columns.SteelColumn],
+    names: list[str],
+    combinations: load_factors.LoadCombinations = load_factors.EC_LOAD_COMBINATIONS,
+)-> Iterator[MemberReport]:
+    '''
+    Yields the report of each checked column
+
+    'column_array' - A checked SteelColumnArray (see columns.check_csv_records) or the
+        list of columns of columns.run_all_columns, which has no governing combination
+    'names' - Names of the columns
+    'combinations' - The load combinations of the indices in 'governing_combination'
+    '''
+    if isinstance(column_array, list):
+        steelcolumns = column_array
+        column_array = columns.SteelColumnArray.from_steelcolumns(steelcolumns)
+        column_array.factored_load = np.array([steelcolumn.factored_load for steelcolumn in steelcolumns])
+        column_array.demand_capacity_ratio = np.array([steelcolumn.demand_capacity_ratio for steelcolumn in steelcolumns])
+    capacities = {
+        'Buckling resistance': column_array.factored_compressive_resistance(),
+        'Crushing load': column_array.factored_crushing_load(),
+    }
+    slenderness = column_array.slenderness()
+    reduction = column_array.buckling_reduction_factor()
+    for idx, name in enumerate(names):
+        governing = None
+        if column_array.governing_combination is not None:
+            governing = combinations.names[int(column_array.governing_combination[idx])]
+        demand = float(column_array.factored_load[idx])
+        values = {label: float(values[idx]) for label, values in capacities.items()}
+        figure = {
+            'data': [{
+                'type': 'bar', 'name': 'Demand and capacity',
+                'x': [f'Demand ({governing})' if governing else 'Demand', *values],
+                'y': [demand, *values.values()],
+                'marker': {'color': ['#d62728' if column_array.demand_capacity_ratio[idx] > 1. else '#1f77b4', '#7f7f7f', '#bcbd22']},
+            }],
+            'layout': _axes('', 'Axial force [N]', f'{name}: axial demand vs capacity') | {'showlegend': False},
+        }
+        yield MemberReport(
+            name=name,
+            kind='Column',
+            results={
+                'Height [mm]': float(column_array.h[idx]),
+                'Area [mm2]': float(column_array.A[idx]),
+                'Yield strength [MPa]': float(column_array.fy[idx]),
+                'Buckling curve': str(column_array.buckling_curve[idx]),
+                'Slenderness': float(slenderness[idx]),
+                'Reduction factor': float(reduction[idx]),
+                'Factored load [N]': demand,
+            } | {f'{label} [N]': value for label, value in values.items()},
+            figures=[figure],
+            demand_capacity_ratio=float(column_array.demand_capacity_ratio[idx]),
+            governing=governing,
+        )
+
+def csv_column_reports(filename: str, chunk_size: int = 10000, **kwargs)-> Iterator[MemberReport]:
+    '''
+    Yields the report of each column of a csv file, checked in chunks of 'chunk_size' rows
+    (see columns.iter_column_checks), so the reports of any number of columns can be written
+    without holding them all in memory
+    '''
+    for names, column_array in columns.iter_column_checks(filename, chunk_size, **kwargs):
+        yield from column_reports(column_array, names)
+
+def beam_report(beam_model, member_name: str, n_stations: int = 501, moment_resistance: float|None = None, max_points: int = MAX_POINTS)-> MemberReport:
+    '''
+    Returns the report of an analyzed beam model (see beams.build_beam): the extreme results
+    and reactions of each load combination and the shear, moment and deflection diagrams
+
+    'n_stations' - Number of stations of the diagrams
+    'moment_resistance' - Bending resistance of the beam, for the demand to capacity ratio
+        of the largest moment magnitude
+    '''
+    member = beam_model.Members[member_name]
+    summary = extract_beam_results(beam_model, member_name)
+    diagrams = [
+        ('Shear', 'shear_array', 'Fy', 'Shear [N]'),
+        ('Moment', 'moment_array', 'Mz', 'Moment [Nmm]'),
+        ('Deflection', 'deflection_array', 'dy', 'Deflection [mm]'),
+    ]
+    figures = []
+    for title, method, direction, y_title in diagrams:
+        data = []
+        for combo in beam_model.LoadCombos:
+            x, values = getattr(member, method)(direction, n_stations, combo)
+            data.append(curve(x, values, combo, max_points))
+        figures.append({'data': data, 'layout': _axes('x [mm]', y_title, f'{member_name}: {title.lower()}')})
+
+    results = {}
+    largest_moment, governing = 0., None
+    for combo, combo_results in summary.items():
+        moment = max(abs(combo_results['Max Moment']), abs(combo_results['Min Moment']))
+        if governing is None or moment > largest_moment:
+            largest_moment, governing = moment, combo
+        for key in ('Max Moment', 'Min Moment', 'Max Shear', 'Min Shear', 'Max Deflection', 'Min Deflection'):
+            results[f'{combo}: {key}'] = combo_results[key]
+        for reaction in combo_results['Reactions']:
+            results[f"{combo}: Reaction {reaction['Node']} (x = {reaction['X']:g})"] = reaction['Fy']
+
+    return MemberReport(
+        name=member_name,
+        kind='Beam',
+        results=results,
+        figures=figures,
+        demand_capacity_ratio=None if moment_resistance is None else largest_moment / moment_resistance,
+        governing=governing,
+    )
+
+def seismic_report(
+    name: str,
+    mass: float,
+    spectrum: seismic_analysis.Ec_response_spectrum,
+    capacity: seismic_analysis.CapacityCurve,
+)-> MemberReport:
+    '''
+    Returns the report of the performance point of a system with 'mass' (ton) and the
+    'capacity' curve (kN, m) under the demand of 'spectrum', as in the seismic design app
+    '''
+    x_demand, y_demand = np.array(seismic_analysis.system_demand(mass, spectrum)).T
+    x_breaks, f_breaks = capacity.breakpoints()
+    x_max = x_demand.max()
+    in_range = x_breaks < x_max
+    x_capacity = [*x_breaks[in_range], x_max]
+    y_capacity = [*f_breaks[in_range], *capacity.force([x_max])]
+    force, displacement, period = seismic_analysis.performance_point(mass, spectrum, capacity)
+
+    layout = _axes('Displacements [m]', 'Force [kN]', f'{name}: seismic demand vs capacity')
+    layout['xaxis']['range'] = [0., x_max * 1.1]
+    layout['yaxis']['range'] = [0., y_demand.max() * 1.1]
+    figure = {
+        'data': [
+            curve(x_demand, y_demand, 'Demand'),
+            curve(x_capacity, y_capacity, 'Capacity'),
+            {'type': 'scattergl', 'mode': 'markers', 'name': 'Performance point', 'x': [displacement], 'y': [force], 'marker': {'size': 12}},
+        ],
+        'layout': layout,
+    }
+
+    return MemberReport(
+        name=name,
+        kind='Seismic system',
+        results={
+            'Mass [ton]': mass,
+            'Peak ground acceleration [m/s2]': spectrum.ag,
+            'Spectra type': spectrum.spectra_type,
+            'Soil type': spectrum.soil_type,
+            'Damping [%]': spectrum.damping,
+            'System force [kN]': force,
+            'System displacement [mm]': displacement * 1000.,
+            'System period [s]': period,
+            'System acceleration [m/s2]': force / mass,
+        },
+        figures=[figure],
+    )
+
+def _format(value)-> str:
+    if isinstance(value, float):
+        return f'{value:.4g}'
+    return html.escape(str(value))
+
+def _status(demand_capacity_ratio: float|None)-> str:
+    if demand_capacity_ratio is None:
+        return ''
+    passed = demand_capacity_ratio <= 1.
+    return f'<span class="{"pass" if passed else "fail"}">{"OK" if passed else "FAIL"}</span>'
+
+def _json(value)-> str:
+    # Tags inside the data (names of members) must not end the script element
+    return json.dumps(value, separators=(',', ':'), default=_to_list).replace('<', '\\u003c')
+
+def _to_list(value):
+    if isinstance(value, (np.ndarray, np.generic)):
+        return value.tolist()
+    raise TypeError(f'{type(value).__name__} is not JSON serializable')
+
+def render_member(report: MemberReport, template: str, plotlyjs: str)-> str:
+    '''
+    Returns the HTML page of a member report
+
+    'template' - JSON of the layout template (see figure_template)
+    'plotlyjs' - The src of the plotly.js script (see plotlyjs_source)
+    '''
+    title = html.escape(f'{report.kind} {report.name}')
+    template = template.replace('<', '\\u003c')
+    parts = [
+        f'<!DOCTYPE html>\n<html>\n<head>\n<meta charset="utf-8">\n<title>{title}</title>\n',
+        f'<style>{PAGE_STYLE}</style>\n<script src="{html.escape(plotlyjs)}"></script>\n',
+        f'<script>const TEMPLATE = {template};</script>\n</head>\n<body>\n<h1>{title}</h1>\n<table>\n',
+    ]
+    if report.demand_capacity_ratio is not None:
+        parts.append(f'<tr><th>Demand/capacity</th><td>{report.demand_capacity_ratio:.3f} {_status(report.demand_capacity_ratio)}</td></tr>\n')
+    if report.governing is not None:
+        parts.append(f'<tr><th>Governing combination</th><td>{html.escape(report.governing)}</td></tr>\n')
+    parts.extend(f'<tr><th>{html.escape(label)}</th><td>{_format(value)}</td></tr>\n' for label, value in report.results.items())
+    parts.append('</table>\n')
+    for idx, figure in enumerate(report.figures):
+        parts.append(
+            f'<div id="figure-{idx}"></div>\n<script>Plotly.newPlot("figure-{idx}", {_json(figure["data"])}, '
+            f'Object.assign({{template: TEMPLATE}}, {_json(figure["layout"])}));</script>\n'
+        )
+    parts.append('</body>\n</html>\n')
+
+    return ''.join(parts)
+
+def file_name(name: str, kind: str, used: set[str])-> str:
+    '''
+    Returns a file name for the report of a member that is not in 'used' and adds it to 'used'
+    '''
+    stem = re.sub(r'[^\w.-]+', '_', f'{kind}_{name}').strip('._') or 'member'
+    candidate = f'{stem}.html'
+    for idx in itertools.count(2):
+        if candidate.lower() not in used and candidate != INDEX_NAME:
+            break
+        candidate = f'{stem}_{idx}.html'
+    used.add(candidate.lower())
+
+    return candidate
+
+def _write_member(item: tuple[MemberReport, str], directory: str, template: str, plotlyjs: str)-> dict:
+    report, report_file = item
+    with open(os.path.join(directory, report_file), 'w', encoding='utf-8') as output_file:
+        output_file.write(render_member(report, template, plotlyjs))
+
+    return {
+        'Name': report.name,
+        'Kind': report.kind,
+        'File': report_file,
+        'Demand/Capacity': report.demand_capacity_ratio,
+        'Governing': report.governing,
+    }
+
+@instrumentation.timed('reports.write')
+def write_reports(
+    reports: Iterable[MemberReport],
+    directory: str,
+    max_workers: int|None = None,
+    chunksize: int = 64,
+    include_plotlyjs: str = 'directory',
+    keep_summaries: bool = True,
+)-> list[dict]:
+    '''
+    Writes one HTML page per member report to 'directory' and an index page linking them,
+    and returns the summary of each report (name, kind, file, demand to capacity ratio
+    and governing combination) in order
+
+    'reports' - The member reports, for example a generator of csv_column_reports
+    'max_workers' - Number of worker processes rendering and writing the pages. None uses
+        one per CPU and 1 writes them in this process
+    'chunksize' - Number of reports sent to a worker at a time
+    'include_plotlyjs' - See plotlyjs_source
+    'keep_summaries' - If False, the summaries are only written to the index page and an
+        empty list is returned
+
+    The reports are consumed in batches, so only a few chunks of reports per worker are held
+    in memory, and the index rows are written as the pages of each batch are done. The file
+    names already used (to keep them unique) and the returned summaries still take one small
+    entry per member.
+    '''
+    os.makedirs(directory, exist_ok=True)
+    render = partial(_write_member, directory=directory, template=figure_template(), plotlyjs=plotlyjs_source(directory, include_plotlyjs))
+    n_workers = max_workers or os.cpu_count() or 1
+    batch_size = chunksize * n_workers * 4
+    used, summaries = set(), []
+    executor = ProcessPoolExecutor(max_workers=max_workers) if n_workers > 1 else None
+    index_name = os.path.join(directory, INDEX_NAME)
+    try:
+        with open(index_name, 'w', encoding='utf-8') as index_file:
+            index_file.write(
+                f'<!DOCTYPE html>\n<html>\n<head>\n<meta charset="utf-8">\n<title>Member reports</title>\n<style>{PAGE_STYLE}</style>\n</head>\n'
+                '<body>\n<h1>Member reports</h1>\n<table>\n<tr><th>Member</th><th>Type</th><th>Demand/capacity</th><th>Status</th><th>Governing combination</th></tr>\n'
+            )
+            reports = iter(reports)
+            while batch := list(itertools.islice(reports, batch_size)):
+                items = [(report, file_name(report.name, report.kind, used)) for report in batch]
+                if executor is None:
+                    batch_summaries = [render(item) for item in items]
+                else:
+                    batch_summaries = list(executor.map(render, items, chunksize=chunksize))
+                for summary in batch_summaries:
+                    ratio = summary['Demand/Capacity']
+                    index_file.write(
+                        f'<tr><td><a href="{html.escape(summary["File"])}">{html.escape(summary["Name"])}</a></td><td>{html.escape(summary["Kind"])}</td>'
+                        f'<td>{"" if ratio is None else f"{ratio:.3f}"}</td><td>{_status(ratio)}</td><td>{html.escape(summary["Governing"] or "")}</td></tr>\n'
+                    )
+                if keep_summaries:
+                    summaries.extend(batch_summaries)
+                instrumentation.count('reports.pages', len(batch_summaries))
+            index_file.write('</table>\n</body>\n</html>\n')
+    finally:
+        if executor is not None:
+            executor.shutdown()
+
+    return summaries
+
+def main(argv: list[str]|None = None)-> int:
+    parser = argparse.ArgumentParser(description='Write the HTML reports of the columns of csv files.')
+    parser.add_argument('files', nargs='+', help='csv files of columns (see columns.run_all_columns)')
+    parser.add_argument('--output', required=True, help='directory of the reports')
+    parser.add_argument('--workers', type=int, default=None, help='number of worker processes (default: one per CPU)')
+    parser.add_argument('--chunksize', type=int, default=64, help='number of reports sent to a worker at a time')
+    parser.add_argument('--cdn', action='store_true', help='load plotly.js from the CDN instead of copying it next to the reports')
+    args = parser.parse_args(argv)
+
+    reports = itertools.chain.from_iterable(csv_column_reports(filename) for filename in args.files)
+    summaries = write_reports(reports, args.output, args.workers, args.chunksize, 'cdn' if args.cdn else 'directory')
+    failed = [summary for summary in summaries if (summary['Demand/Capacity'] or 0.) > 1.]
+    print(f'{len(summaries)} reports written to {args.output}, {len(failed)} members with a demand/capacity ratio over 1')
+
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
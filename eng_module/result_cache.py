@@ -0,0 +1,235 @@
+import hashlib, json, math, os, pickle, sqlite3, time
+from contextlib import contextmanager
+from functools import lru_cache
+from importlib import metadata
+import numpy as np
+
+CACHE_VERSION = 1
+
+DEFAULT_MAX_BYTES = 1024 * 2 ** 20
+
+# Fraction of 'max_bytes' the cache is trimmed down to when it grows beyond it, so the
+# eviction does not run again on every new entry
+EVICTION_TARGET = 0.9
+
+# SQLite limits the number of parameters of a statement
+MAX_PARAMETERS = 900
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS results (
+    key TEXT PRIMARY KEY,
+    value BLOB NOT NULL,
+    size INTEGER NOT NULL,
+    last_access REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS results_last_access ON results (last_access);
+'''
+
+def canonical(value):
+    '''
+    Returns 'value' as nested lists, strings, numbers and None that serialize to the same JSON
+    for equal values: dictionaries become lists of [key, value] pairs sorted by key, tuples
+    and arrays become lists and NumPy scalars become Python numbers. -0.0 is 0.0.
+    '''
+    if isinstance(value, dict):
+        items = [[canonical(key), canonical(item)] for key, item in value.items()]
+        return sorted(items, key=lambda item: json.dumps(item[0]))
+    if isinstance(value, (list, tuple)):
+        return [canonical(item) for item in value]
+    if isinstance(value, np.ndarray):
+        return canonical(value.tolist())
+    if isinstance(value, np.generic):
+        return canonical(value.item())
+    if isinstance(value, float):
+        if not math.isfinite(value):
+            return repr(value)
+        return value + 0.
+    if value is None or isinstance(value, (bool, int, str)):
+        return value
+    raise TypeError(f'A {type(value).__name__} cannot be part of a cache key')
+
+def canonical_key(namespace: str, payload, version: str = '')-> str:
+    '''
+    Returns the SHA-256 hex digest of the canonical JSON of 'payload', 'namespace' and 'version'
+    '''
+    text = json.dumps([CACHE_VERSION, namespace, version, canonical(payload)], separators=(',', ':'))
+
+    return hashlib.sha256(text.encode()).hexdigest()
+
+@lru_cache(maxsize=None)
+def source_version(module_names: tuple[str, ...], distributions: tuple[str, ...] = ())-> str:
+    '''
+    Returns a digest of the source files of the modules of this package 'module_names'
+    and the installed versions of the 'distributions', so the cached results are
+    not used after any of them changes
+    '''
+    digest = hashlib.sha256()
+    directory = os.path.dirname(os.path.abspath(__file__))
+    for module_name in module_names:
+        with open(os.path.join(directory, f'{module_name}.py'), 'rb') as source_file:
+            digest.update(source_file.read())
+    for distribution in distributions:
+        try:
+            digest.update(metadata.version(distribution).encode())
+        except metadata.PackageNotFoundError:
+            digest.update(b'-')
+
+    return digest.hexdigest()
+
+class ResultCache:
+    '''
+    A disk-backed cache of analysis results in one SQLite file, addressed by the
+    canonical_key of their inputs.
+
+    The values are pickled. When the cache grows beyond 'max_bytes' the least recently
+    used entries are removed until it is down to EVICTION_TARGET of it.
+    Worker processes can share the file: SQLite serializes the writes (in WAL mode,
+    readers do not block the writer) and each batch of entries is written in one transaction.
+
+    The values are pickles, so the cache file must not be writable by untrusted users.
+    '''
+    def __init__(self, filename: str, max_bytes: int = DEFAULT_MAX_BYTES, timeout: float = 60.):
+        directory = os.path.dirname(os.path.abspath(filename))
+        os.makedirs(directory, exist_ok=True)
+        self.filename = filename
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.connection = sqlite3.connect(filename, timeout=timeout, isolation_level=None)
+        self.connection.execute('PRAGMA journal_mode=WAL')
+        self.connection.execute('PRAGMA synchronous=NORMAL')
+        self.connection.executescript(SCHEMA)
+
+    def __enter__(self)-> 'ResultCache':
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        self.connection.close()
+
+    def __len__(self)-> int:
+        return self.connection.execute('SELECT COUNT(*) FROM results').fetchone()[0]
+
+    def __contains__(self, key: str)-> bool:
+        return self.connection.execute('SELECT 1 FROM results WHERE key = ?', (key,)).fetchone() is not None
+
+    @property
+    def nbytes(self)-> int:
+        '''
+        Size of the stored values in bytes
+        '''
+        return self.connection.execute('SELECT COALESCE(SUM(size), 0) FROM results').fetchone()[0]
+
+    def get(self, key: str, default=None):
+        '''
+        Returns the value stored under 'key', or 'default' if there is none
+        '''
+        return self.get_many([key]).get(key, default)
+
+    def get_many(self, keys: list[str])-> dict:
+        '''
+        Returns the values stored under 'keys' that are in the cache, by key.
+        Their access times are updated in one transaction.
+        '''
+        keys = list(dict.fromkeys(keys))
+        rows = []
+        for start in range(0, len(keys), MAX_PARAMETERS):
+            chunk = keys[start:start + MAX_PARAMETERS]
+            rows += self.connection.execute(
+                f"SELECT key, value FROM results WHERE key IN ({','.join('?' * len(chunk))})", chunk
+            ).fetchall()
+        values = {}
+        for key, value in rows:
+            try:
+                values[key] = pickle.loads(value)
+            except Exception:
+                # An entry written by another version of the classes is computed again
+                continue
+        self.hits += len(values)
+        self.misses += len(keys) - len(values)
+        if values:
+            now = time.time()
+            with self._transaction():
+                self.connection.executemany('UPDATE results SET last_access = ? WHERE key = ?', [(now, key) for key in values])
+
+        return values
+
+    def put(self, key: str, value):
+        '''
+        Stores 'value' under 'key'
+        '''
+        self.put_many({key: value})
+
+    def put_many(self, values: dict):
+        '''
+        Stores the values of the dictionary under their keys in one transaction and
+        evicts the least recently used entries if the cache is larger than 'max_bytes'
+        '''
+        if not values:
+            return
+        now = time.time()
+        rows = []
+        for key, value in values.items():
+            blob = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+            rows.append((key, blob, len(blob), now))
+        with self._transaction():
+            self.connection.executemany('INSERT OR REPLACE INTO results (key, value, size, last_access) VALUES (?, ?, ?, ?)', rows)
+            self._evict()
+
+    def evict(self, max_bytes: int|None = None):
+        '''
+        If the cache is larger than 'max_bytes' (its size limit by default), removes the
+        least recently used entries until it is not larger than EVICTION_TARGET of it
+        '''
+        with self._transaction():
+            self._evict(max_bytes)
+
+    def clear(self):
+        '''
+        Removes all the entries
+        '''
+        with self._transaction():
+            self.connection.execute('DELETE FROM results')
+        self.connection.execute('VACUUM')
+
+    def _evict(self, max_bytes: int|None = None):
+        max_bytes = self.max_bytes if max_bytes is None else max_bytes
+        total = self.connection.execute('SELECT COALESCE(SUM(size), 0) FROM results').fetchone()[0]
+        if total <= max_bytes:
+            return
+        excess = total - int(max_bytes * EVICTION_TARGET)
+        # The entries up to the one where the cumulative size reaches the excess are removed
+        self.connection.execute(
+            '''
+            DELETE FROM results WHERE key IN (
+                SELECT key FROM (
+                    SELECT key, SUM(size) OVER (ORDER BY last_access, key) - size AS freed
+                    FROM results
+                ) WHERE freed < ?
+            )
+            ''',
+            (excess,)
+        )
+
+    @contextmanager
+    def _transaction(self):
+        # The write lock is taken at the start (BEGIN IMMEDIATE), so two processes never
+        # both read the size of the cache and then write
+        self.connection.execute('BEGIN IMMEDIATE')
+        try:
+            yield
+        except BaseException:
+            self.connection.execute('ROLLBACK')
+            raise
+        self.connection.execute('COMMIT')
+
+def open_cache(cache: 'ResultCache|str|None', max_bytes: int = DEFAULT_MAX_BYTES)-> tuple['ResultCache|None', bool]:
+    '''
+    Returns the ResultCache of 'cache' (a ResultCache or the file name of one) and whether
+    it was opened here and must be closed by the caller
+    '''
+    if cache is None or isinstance(cache, ResultCache):
+        return cache, False
+    return ResultCache(cache, max_bytes), True
@@ -0,0 +1,234 @@
+import os
+from math import ceil
+from dataclasses import dataclass, field
+import numpy as np
+from eng_module import columns, utils
+
+SECTIONS_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data', 'sections.csv')
+
+BUCKLING_CURVES = tuple(columns.IMPERFECTION_FACTORS)
+
+# The columns of the section csv files
+SECTION_SCHEMA = utils.Schema((
+    utils.Field('Section', 'U'),
+    utils.Field('mass', unit='kg/m'),
+    utils.Field('depth', unit='mm'),
+    utils.Field('width', unit='mm'),
+    utils.Field('tf', unit='mm'),
+    utils.Field('A', unit='mm2'),
+    utils.Field('Ix', unit='mm4'),
+    utils.Field('Iy', unit='mm4'),
+    utils.Field('curve_x', 'U2', choices=BUCKLING_CURVES),
+    utils.Field('curve_y', 'U2', choices=BUCKLING_CURVES),
+))
+
+SLENDERNESS_STEP = 0.001
+
+MAX_SLENDERNESS = 6.
+
+@dataclass
+class BucklingCurveTable:
+    '''
+    The reduction factor of each buckling curve ('a0' to 'd') tabulated on a slenderness grid
+    from 0 to 'max_slenderness' in steps of 'step'
+    '''
+    step: float = SLENDERNESS_STEP
+    max_slenderness: float = MAX_SLENDERNESS
+    reduction_factors: np.ndarray = field(init=False, repr=False)
+
+    def __post_init__(self):
+        grid = np.arange(int(ceil(self.max_slenderness / self.step)) + 1) * self.step
+        alfa = columns.imperfection_factors(np.array(BUCKLING_CURVES))
+        self.reduction_factors = np.minimum(columns.reduction_factor(grid, alfa[:, None]), 1.)
+
+    def lookup(self, lmda: np.ndarray, curve_index: np.ndarray)-> np.ndarray:
+        '''
+        Returns the reduction factor at the grid point at or above each slenderness,
+        which is never larger than the exact value because the reduction factor
+        decreases with the slenderness. Slenderness beyond the grid returns the
+        exact value.
+
+        'lmda' - Non-dimensional slenderness
+        'curve_index' - Index of the buckling curve in BUCKLING_CURVES, broadcast against 'lmda'
+        '''
+        lmda, curve_index = np.broadcast_arrays(np.asarray(lmda, dtype=float), curve_index)
+        grid_index = np.ceil(lmda / self.step - 1e-9).astype(np.int64)
+        on_grid = grid_index < self.reduction_factors.shape[1]
+        values = self.reduction_factors[curve_index, np.where(on_grid, grid_index, 0)]
+        if not on_grid.all():
+            alfa = columns.imperfection_factors(np.array(BUCKLING_CURVES))[curve_index[~on_grid]]
+            values[~on_grid] = columns.reduction_factor(lmda[~on_grid], alfa)
+
+        return values
+
+@dataclass
+class SectionCatalog:
+    '''
+    A table of standard sections sorted from the lightest to the heaviest.
+    The section depth and width are 'depth' and 'width' because 'h' is the column height.
+
+    'names' - Section designations, shape (S,)
+    'mass' - Mass per unit length in kg/m, shape (S,)
+    'A', 'Ix', 'Iy' - Area and moments of inertia about the strong and weak axis, shape (S,)
+    'curve_x', 'curve_y' - Buckling curve about the strong and weak axis, shape (S,)
+    '''
+    names: np.ndarray
+    mass: np.ndarray
+    A: np.ndarray
+    Ix: np.ndarray
+    Iy: np.ndarray
+    curve_x: np.ndarray
+    curve_y: np.ndarray
+    depth: np.ndarray|None = None
+    width: np.ndarray|None = None
+    table: BucklingCurveTable = field(default_factory=BucklingCurveTable, repr=False)
+
+    def __post_init__(self):
+        order = np.argsort(np.asarray(self.mass, dtype=float), kind='stable')
+        self.names = np.asarray(self.names, dtype=str)[order]
+        for attribute in ('mass', 'A', 'Ix', 'Iy', 'depth', 'width'):
+            if getattr(self, attribute) is not None:
+                setattr(self, attribute, np.asarray(getattr(self, attribute), dtype=float)[order])
+        self.curve_x = np.broadcast_to(np.asarray(self.curve_x, dtype=str), order.shape)[order]
+        self.curve_y = np.broadcast_to(np.asarray(self.curve_y, dtype=str), order.shape)[order]
+        self._curve_index_x = _curve_indices(self.curve_x)
+        self._curve_index_y = _curve_indices(self.curve_y)
+
+    def __len__(self)-> int:
+        return len(self.names)
+
+    @classmethod
+    def from_csv(cls, filename: str = SECTIONS_FILE, series: list[str]|None = None, **kwargs)-> 'SectionCatalog':
+        '''
+        Returns the catalog of the sections in a csv file with the columns
+        Section, mass, depth, width, tf, A, Ix, Iy, curve_x and curve_y
+
+        'series' - Prefixes of the sections to keep, e.g. ['HEB']. None keeps all of them
+        '''
+        typed_records = utils.read_typed_csv(filename, SECTION_SCHEMA)
+        typed_records.raise_errors(filename)
+        table = typed_records.data
+        if series is not None:
+            table = table[np.array([name.startswith(tuple(series)) for name in table['Section'].tolist()], dtype=bool)]
+
+        return cls(
+            names = table['Section'],
+            mass = table['mass'],
+            A = table['A'],
+            Ix = table['Ix'],
+            Iy = table['Iy'],
+            curve_x = table['curve_x'],
+            curve_y = table['curve_y'],
+            depth = table['depth'],
+            width = table['width'],
+            **kwargs
+        )
+
+    def capacity(
+        self,
+        h: float|np.ndarray,
+        kx: float|np.ndarray,
+        ky: float|np.ndarray,
+        fy: float|np.ndarray,
+        E: float|np.ndarray = 210000.,
+        gamma_m1: float|np.ndarray = 1.0,
+        buckling_curve: str|None = None,
+        exact: bool = False,
+    )-> np.ndarray:
+        '''
+        Returns the factored compressive resistance of every section for each column, shape (..., S)
+
+        'h', 'kx', 'ky', 'fy', 'E', 'gamma_m1' - Column properties as in SteelColumn, broadcast together
+        'buckling_curve' - None uses the curves of each section about each axis. A curve name
+            applies it to both axes, which gives the same capacity as SteelColumnArray
+        'exact' - If False the reduction factors are read from the BucklingCurveTable, which is
+            conservative by less than one grid step. If True they are calculated directly
+        '''
+        h, kx, ky, fy, E, gamma_m1 = (np.asarray(value, dtype=float)[..., None] for value in (h, kx, ky, fy, E, gamma_m1))
+        if buckling_curve is None:
+            curve_index_x, curve_index_y = self._curve_index_x, self._curve_index_y
+        else:
+            curve_index_x = curve_index_y = np.full(len(self), BUCKLING_CURVES.index(buckling_curve))
+
+        crushing_load = self.A * fy
+        lmda_x = columns.lamda(self.A, fy, columns.euler_buckling_load(h, E, self.Ix, kx))
+        lmda_y = columns.lamda(self.A, fy, columns.euler_buckling_load(h, E, self.Iy, ky))
+        if exact:
+            alfa = columns.imperfection_factors(np.array(BUCKLING_CURVES))
+            reduction_factor_x = np.minimum(columns.reduction_factor(lmda_x, alfa[curve_index_x]), 1.)
+            reduction_factor_y = np.minimum(columns.reduction_factor(lmda_y, alfa[curve_index_y]), 1.)
+        else:
+            reduction_factor_x = self.table.lookup(lmda_x, curve_index_x)
+            reduction_factor_y = self.table.lookup(lmda_y, curve_index_y)
+
+        return np.minimum(reduction_factor_x, reduction_factor_y) * crushing_load / gamma_m1
+
+    def lightest_sections(
+        self,
+        demand: float|np.ndarray,
+        h: float|np.ndarray,
+        kx: float|np.ndarray,
+        ky: float|np.ndarray,
+        fy: float|np.ndarray,
+        E: float|np.ndarray = 210000.,
+        gamma_m1: float|np.ndarray = 1.0,
+        buckling_curve: str|None = None,
+        exact: bool = False,
+    )-> np.ndarray:
+        '''
+        Returns the index in the catalog of the lightest section with a capacity at least equal
+        to the demand of each column, or -1 where no section is adequate, shape (N,)
+
+        The capacities of all the sections are calculated once for each distinct combination of
+        the column properties. Along the catalog (sorted by mass) the running maximum of the
+        capacity first reaches the demand at the lightest adequate section, which is found with
+        one vectorized comparison of the demands against those running maxima.
+
+        See capacity for the other arguments.
+        '''
+        demand, h, kx, ky, fy, E, gamma_m1 = np.broadcast_arrays(*(
+            np.atleast_1d(np.asarray(value, dtype=float)) for value in (demand, h, kx, ky, fy, E, gamma_m1)
+        ))
+        if len(self) == 0:
+            return np.full(demand.size, -1, dtype=np.int64)
+        properties, inverse = np.unique(np.stack([h, kx, ky, fy, E, gamma_m1], axis=-1).reshape(-1, 6), axis=0, return_inverse=True)
+        inverse = inverse.reshape(-1)
+        best_capacity = np.maximum.accumulate(self.capacity(*properties.T, buckling_curve=buckling_curve, exact=exact), axis=-1)
+
+        adequate = best_capacity[inverse] >= demand.reshape(-1)[:, None]
+
+        return np.where(adequate[:, -1], np.argmax(adequate, axis=1), -1)
+
+    def select(self, demand: float|np.ndarray, h: float|np.ndarray, kx: float|np.ndarray, ky: float|np.ndarray, fy: float|np.ndarray, **kwargs)-> list[str|None]:
+        '''
+        Returns the name of the lightest adequate section of each column, None where there is none.
+        See lightest_sections for the arguments.
+        '''
+        indices = self.lightest_sections(demand, h, kx, ky, fy, **kwargs)
+
+        return [None if idx < 0 else name for idx, name in zip(indices.tolist(), self.names[np.maximum(indices, 0)].tolist())]
+
+def _curve_indices(curves: np.ndarray)-> np.ndarray:
+    '''
+    Returns the index in BUCKLING_CURVES of each buckling curve name
+    '''
+    unknown = set(np.unique(curves).tolist()) - set(BUCKLING_CURVES)
+    if unknown:
+        raise ValueError(f"The buckling curves must be one of {', '.join(BUCKLING_CURVES)}, not {', '.join(sorted(unknown))}")
+
+    return np.array([BUCKLING_CURVES.index(curve) for curve in curves.tolist()], dtype=np.int64)
+
+def select_csv_sections(filename: str, catalog: SectionCatalog|None = None, **kwargs)-> dict[str, str|None]:
+    '''
+    Returns the lightest adequate section of each column of a columns csv file for its
+    factored load (see columns.factored_load_envelope). The section properties of the
+    file are ignored and only the column height, effective length factors, fy and E are used.
+
+    'catalog' - SectionCatalog to choose from, the default catalog file if None
+    '''
+    catalog = SectionCatalog.from_csv() if catalog is None else catalog
+    data = columns.read_checked_column_csv(filename)
+    demand = columns.factored_load_envelope(data)['Max']
+    names = catalog.select(demand, h=data['h'], kx=data['kx'], ky=data['ky'], fy=data['fy'], E=data['E'], **kwargs)
+
+    return dict(zip(data['Column'].tolist(), names))
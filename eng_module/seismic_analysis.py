@@ -1,5 +1,49 @@
-from math import sqrt, pi
-from dataclasses import dataclass
+from math import pi
+from dataclasses import dataclass, field
+from functools import lru_cache
+import numpy as np
+from eng_module import instrumentation
+
+RESPONSE_SPECTRUM_PARAMETERS = {
+    1:{
+        'A':{
+            'S': 1.0, 'Tb': 0.15, 'Tc': 0.4, 'Td':2.0
+        },
+        'B':{
+            'S': 1.2, 'Tb': 0.15, 'Tc': 0.5, 'Td':2.0
+        },
+        'C':{
+            'S': 1.15, 'Tb': 0.20, 'Tc': 0.6, 'Td':2.0
+        },
+        'D':{
+            'S': 1.35, 'Tb': 0.20, 'Tc': 0.8, 'Td':2.0
+        },
+        'E':{
+            'S': 1.4, 'Tb': 0.15, 'Tc': 0.5, 'Td':2.0
+        }
+    },
+    2:{
+        'A':{
+            'S': 1.0, 'Tb': 0.05, 'Tc': 0.25, 'Td':1.2
+        },
+        'B':{
+            'S': 1.35, 'Tb': 0.05, 'Tc': 0.25, 'Td':1.2
+        },
+        'C':{
+            'S': 1.5, 'Tb': 0.10, 'Tc': 0.25, 'Td':1.2
+        },
+        'D':{
+            'S': 1.8, 'Tb': 0.10, 'Tc': 0.3, 'Td':1.2
+        },
+        'E':{
+            'S': 1.6, 'Tb': 0.05, 'Tc': 0.25, 'Td':1.2
+        }
+    }
+}
+
+MAX_PERIOD = 4.
+
+CACHE_SIZE = 128
 
 @dataclass
 class Ec_response_spectrum:
@@ -7,99 +51,349 @@ class Ec_response_spectrum:
     spectra_type: int = 1
     soil_type: str = 'C'
     damping: float = 5.0
+    S: float = field(init=False, repr=False)
+    Tb: float = field(init=False, repr=False)
+    Tc: float = field(init=False, repr=False)
+    Td: float = field(init=False, repr=False)
+    nu: float = field(init=False, repr=False)
 
-    def acceleration(self, T: float) -> float:
-        S, Tb, Tc, Td = response_spectrum_parameters(self.spectra_type, self.soil_type).values()
-        n = sqrt(10 / (5 + self.damping))
-        nu = (n >= 0.55) * n + (n < 0.55)*0.55
-       
-        if T >= 0. and T <= Tb:
-            Se = self.ag * S * (1 + T / Tb * (nu * 2.5 - 1.))
+    def __post_init__(self):
+        self.S, self.Tb, self.Tc, self.Td = response_spectrum_parameters(self.spectra_type, self.soil_type).values()
+        self.nu = damping_correction(self.damping)
 
-        elif T > Tb and T <= Tc:
-            Se = self.ag * S * nu * 2.5
+    def acceleration(self, T: float|np.ndarray) -> float|np.ndarray:
+        '''
+        Returns the elastic spectral acceleration for a period or an array of periods
+        '''
+        return spectral_acceleration(T, self.ag, self.S, self.Tb, self.Tc, self.Td, self.nu)
 
-        elif T > Tc and T <= Td:
-            Se = self.ag * S * nu * 2.5 * (Tc / T)
+    def displacement(self, T: float|np.ndarray)-> float|np.ndarray:
+        '''
+        Returns the elastic spectral displacement for a period or an array of periods
+        '''
+        Sd = self.acceleration(T) * (np.asarray(T, dtype=float) / (2 * pi)) ** 2
 
-        elif T > Td and T <= 4:
-            Se = self.ag * S * nu * 2.5 * (Tc * Td / T ** 2)
-        
+        return _as_output(Sd, T)
+
+@dataclass
+class CapacityCurve:
+    '''
+    Piecewise linear force-displacement capacity curve starting at the origin.
+    'stiffness' - Stiffness of each branch, shape (..., n)
+    'max_force' - Force at the end of each branch but the last, shape (..., n - 1).
+        The last branch extends indefinitely.
+    Leading dimensions describe many systems at once.
+    '''
+    stiffness: np.ndarray
+    max_force: np.ndarray
+
+    def __post_init__(self):
+        self.stiffness = np.atleast_1d(np.asarray(self.stiffness, dtype=float))
+        self.max_force = np.asarray(self.max_force, dtype=float).reshape(self.stiffness.shape[:-1] + (-1,))
+        if self.max_force.shape[-1] != self.stiffness.shape[-1] - 1:
+            raise ValueError(f'A capacity curve with {self.stiffness.shape[-1]} branches needs {self.stiffness.shape[-1] - 1} maximum forces, not {self.max_force.shape[-1]}')
+
+    @classmethod
+    def from_k_type(cls, k_type: str, k1: float, k2: float = 0., f1max: float = 0.) -> 'CapacityCurve':
+        '''
+        Returns the 'Linear' or 'Multi-linear' (bilinear) capacity curve of system_capacity
+        '''
+        if k_type == 'Linear':
+            return cls(np.asarray(k1, dtype=float)[..., None], np.zeros(np.shape(k1) + (0,)))
+        elif k_type == 'Multi-linear':
+            k1, k2, f1max = np.broadcast_arrays(np.asarray(k1, dtype=float), k2, f1max)
+            return cls(np.stack([k1, k2], axis=-1), f1max[..., None])
         else:
-            raise ValueError(f'The value of the period of the system needs to be between 0 sec and 4 sec. The current value is {T}')
-    
-        return Se
+            raise ValueError(f"The type of stiffness must be one of 'Linear' or 'Multi-linear', not {k_type}")
+
+    def breakpoints(self) -> tuple[np.ndarray, np.ndarray]:
+        '''
+        Returns the displacement and force at the start of each branch, shape (..., n)
+        '''
+        f_breaks = np.concatenate([np.zeros(self.max_force.shape[:-1] + (1,)), self.max_force], axis=-1)
+        x_breaks = np.cumsum(np.diff(f_breaks, prepend=0., axis=-1) / np.concatenate([np.ones(self.stiffness.shape[:-1] + (1,)), self.stiffness[..., :-1]], axis=-1), axis=-1)
 
-    def displacement(self, T: float)-> float:
-        Sd = self.acceleration(T) * (T/(2 * pi)) ** 2
+        return x_breaks, f_breaks
 
-        return Sd
+    def force(self, x: np.ndarray) -> np.ndarray:
+        '''
+        Returns the force of the capacity curve at the displacements 'x', shape (..., S)
+        '''
+        x = np.asarray(x, dtype=float)
+        x_breaks, f_breaks = self.breakpoints()
+        branch = np.sum(x[..., None] >= x_breaks[..., None, :], axis=-1) - 1
+        branch = np.clip(branch, 0, self.stiffness.shape[-1] - 1)
+        take = lambda values: np.take_along_axis(np.broadcast_to(values[..., None, :], branch.shape + values.shape[-1:]), branch[..., None], axis=-1)[..., 0]
+
+        return take(f_breaks) + take(self.stiffness) * (x - take(x_breaks))
 
 def response_spectrum_parameters(spectra_type: int, soil_type: int) -> dict[str, float]:
-    rsp = {
-        1:{
-            'A':{
-                'S': 1.0, 'Tb': 0.15, 'Tc': 0.4, 'Td':2.0
-            },
-            'B':{
-                'S': 1.2, 'Tb': 0.15, 'Tc': 0.5, 'Td':2.0
-            },
-            'C':{
-                'S': 1.15, 'Tb': 0.20, 'Tc': 0.6, 'Td':2.0
-            },
-            'D':{
-                'S': 1.35, 'Tb': 0.20, 'Tc': 0.8, 'Td':2.0
-            },
-            'E':{
-                'S': 1.4, 'Tb': 0.15, 'Tc': 0.5, 'Td':2.0
-            }
-        },
-        2:{
-            'A':{
-                'S': 1.0, 'Tb': 0.05, 'Tc': 0.25, 'Td':1.2
-            },
-            'B':{
-                'S': 1.35, 'Tb': 0.05, 'Tc': 0.25, 'Td':1.2
-            },
-            'C':{
-                'S': 1.5, 'Tb': 0.10, 'Tc': 0.25, 'Td':1.2
-            },
-            'D':{
-                'S': 1.8, 'Tb': 0.10, 'Tc': 0.3, 'Td':1.2
-            },
-            'E':{
-                'S': 1.6, 'Tb': 0.05, 'Tc': 0.25, 'Td':1.2
-            }
-        }
-    }
-        
-    return rsp[spectra_type][soil_type]
+    return RESPONSE_SPECTRUM_PARAMETERS[spectra_type][soil_type]
+
+def damping_correction(damping: float|np.ndarray) -> float|np.ndarray:
+    '''
+    Returns the damping correction factor 'nu' (not less than 0.55)
+    'damping' - Viscous damping ratio of the structure in percentage
+    '''
+    n = np.sqrt(10 / (5 + np.asarray(damping, dtype=float)))
+    nu = np.maximum(n, 0.55)
+
+    return _as_output(nu, damping)
+
+def spectral_acceleration(
+    T: float|np.ndarray,
+    ag: float|np.ndarray,
+    S: float|np.ndarray,
+    Tb: float|np.ndarray,
+    Tc: float|np.ndarray,
+    Td: float|np.ndarray,
+    nu: float|np.ndarray,
+) -> float|np.ndarray:
+    '''
+    Returns the elastic spectral acceleration Se(T) of Eurocode 1998-1-1.
+    All arguments are broadcast against each other, so the periods, the spectrum
+    parameters or both can be arrays. Each branch is evaluated as a masked operation.
+    '''
+    T_arr = np.asarray(T, dtype=float)
+    if np.any((T_arr < 0.) | (T_arr > MAX_PERIOD)):
+        bad_values = T_arr[(T_arr < 0.) | (T_arr > MAX_PERIOD)]
+        raise ValueError(f'The value of the period of the system needs to be between 0 sec and 4 sec. The current value is {bad_values.flat[0]}')
 
+    T_arr, ag, S, Tb, Tc, Td, nu = np.broadcast_arrays(T_arr, ag, S, Tb, Tc, Td, nu)
+    Se = np.empty(T_arr.shape)
+
+    branch_1 = T_arr <= Tb
+    branch_2 = ~branch_1 & (T_arr <= Tc)
+    branch_3 = ~branch_1 & ~branch_2 & (T_arr <= Td)
+    branch_4 = ~branch_1 & ~branch_2 & ~branch_3
+
+    Se[branch_1] = ag[branch_1] * S[branch_1] * (1 + T_arr[branch_1] / Tb[branch_1] * (nu[branch_1] * 2.5 - 1.))
+    Se[branch_2] = ag[branch_2] * S[branch_2] * nu[branch_2] * 2.5
+    Se[branch_3] = ag[branch_3] * S[branch_3] * nu[branch_3] * 2.5 * (Tc[branch_3] / T_arr[branch_3])
+    Se[branch_4] = ag[branch_4] * S[branch_4] * nu[branch_4] * 2.5 * (Tc[branch_4] * Td[branch_4] / T_arr[branch_4] ** 2)
+
+    return _as_output(Se, T)
+
+def _as_output(values: np.ndarray, T: float|np.ndarray) -> float|np.ndarray:
+    '''
+    Returns a float when 'T' is a scalar and the array otherwise
+    '''
+    if np.ndim(T) == 0 and np.ndim(values) == 0:
+        return float(values)
+    return values
+
+@instrumentation.timed('seismic.demand')
 def system_demand(mass: float, spectrum: Ec_response_spectrum) -> list[float]:
-    period_range = list(range(0, 400, 1))
-    y_demand = []
-    x = []
-    for t in period_range:
-        force = mass * spectrum.acceleration(t/100)
-        disp = spectrum.displacement(t/100)
-        y_demand.append(force)
-        x.append(disp)
-    xy_demand = list(zip(x, y_demand))
+    periods = np.arange(0, 400, 1) / 100
+    acceleration = spectrum.acceleration(periods)
+    y_demand = mass * acceleration
+    x = acceleration * (periods / (2 * pi)) ** 2
+    xy_demand = list(zip(x.tolist(), y_demand.tolist()))
 
     return xy_demand
 
+@instrumentation.timed('seismic.capacity')
 def system_capacity(k_type: str, x: list[float], k1: float, k2: float = 0., f1max: float = 0.) -> list[float]:
-    y_capacity = []
-    for xi in x:
-        if k_type == 'Linear':
-            capacity = k1 * xi
-            y_capacity.append(capacity)
-        elif k_type == 'Multi-linear':
-            force_first_branch = k1 * xi
-            capacity = (force_first_branch <= f1max) * force_first_branch + (force_first_branch > f1max) * (f1max + k2 * (xi - f1max / k1))
-            y_capacity.append(capacity)   
-    xy_capacity = list(zip(x, y_capacity))
+    capacity = CapacityCurve.from_k_type(k_type, k1, k2, f1max)
+    y_capacity = capacity.force(np.asarray(x, dtype=float))
+    xy_capacity = list(zip(x, y_capacity.tolist()))
 
     return xy_capacity
 
+def performance_point(mass: float, spectrum: Ec_response_spectrum, capacity: CapacityCurve) -> tuple[float, float, float]:
+    '''
+    Returns the force, displacement and period of the intersection of the demand of
+    'spectrum' on 'mass' with the capacity curve (NaN if they do not intersect up to 4 s)
+    '''
+    force, displacement, period = performance_points(
+        mass, spectrum.ag, spectrum.S, spectrum.Tb, spectrum.Tc, spectrum.Td, spectrum.nu, capacity
+    )
+
+    return float(force), float(displacement), float(period)
+
+@instrumentation.timed('seismic.performance_points')
+def performance_points(
+    mass: float|np.ndarray,
+    ag: float|np.ndarray,
+    S: float|np.ndarray,
+    Tb: float|np.ndarray,
+    Tc: float|np.ndarray,
+    Td: float|np.ndarray,
+    nu: float|np.ndarray,
+    capacity: CapacityCurve,
+) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    '''
+    Returns the force, displacement and period of the performance point of many systems.
+    The demand curve of each spectral branch (0-Tb, Tb-Tc, Tc-Td and Td-4 s) against each
+    branch of the capacity curve is a polynomial in the period of degree 3 or less, so the
+    intersections are found exactly from its roots instead of by sampling the curves.
+    The first intersection (smallest period) is returned and NaN where there is none.
+
+    The spectrum parameters and the mass broadcast against the leading dimensions of the capacity.
+    '''
+    x_breaks, f_breaks = capacity.breakpoints()
+    k = capacity.stiffness
+    shape = np.broadcast_shapes(np.shape(mass), np.shape(ag), np.shape(S), np.shape(Tb), np.shape(Tc), np.shape(Td), np.shape(nu), k.shape[:-1])
+    m, agS, Tb, Tc, Td, nu = (
+        np.broadcast_to(np.asarray(value, dtype=float), shape)[..., None]
+        for value in (mass, np.asarray(ag) * np.asarray(S), Tb, Tc, Td, nu)
+    )
+    k = np.broadcast_to(k, shape + k.shape[-1:])
+    x_breaks = np.broadcast_to(x_breaks, shape + x_breaks.shape[-1:])
+    a = np.broadcast_to(f_breaks - k * x_breaks, k.shape)
+    c = 1 / (4 * pi ** 2)
+    A = agS * nu * 2.5
+    p1 = agS * (nu * 2.5 - 1.) / Tb
+    x_Td = A * Tc * Td * c
+    zero = np.zeros(k.shape)
+
+    # Coefficients of T^3, T^2, T and 1 for each (system, capacity branch, spectral branch)
+    coefficients = np.stack([
+        np.stack([-p1 * k * c, -agS * k * c, p1 * m + zero, agS * m - a], axis=-1),
+        np.stack([zero, k * A * c, zero, a - m * A], axis=-1),
+        np.stack([zero, k * A * Tc * c, a, -m * A * Tc + zero], axis=-1),
+        np.stack([zero, a + k * x_Td, zero, -m * A * Tc * Td + zero], axis=-1),
+    ], axis=-2)
+    T = _real_polynomial_roots(coefficients)
+
+    T_lower = np.stack(np.broadcast_arrays(0. * Tb, Tb, Tc, Td), axis=-1)[..., 0, None, :, None]
+    T_upper = np.stack(np.broadcast_arrays(Tb, Tc, Td, MAX_PERIOD + 0. * Td), axis=-1)[..., 0, None, :, None]
+    x_lower = x_breaks[..., :, None, None]
+    x_upper = np.concatenate([x_breaks[..., 1:], np.full(shape + (1,), np.inf)], axis=-1)[..., :, None, None]
+    with np.errstate(invalid='ignore', divide='ignore'):
+        # Each root is only valid inside its own spectral branch, so Se follows that branch's formula
+        Se = np.stack([
+            agS[..., None] * (1 + T[..., 0, :] / Tb[..., None] * (nu[..., None] * 2.5 - 1.)),
+            np.broadcast_to(A[..., None], T[..., 1, :].shape),
+            A[..., None] * Tc[..., None] / T[..., 2, :],
+            A[..., None] * Tc[..., None] * Td[..., None] / T[..., 3, :] ** 2,
+        ], axis=-2)
+        x = Se * c * T ** 2
+        tolerance = 1e-9 * np.abs(x) + 1e-15
+        valid = (
+            (T >= T_lower) & (T <= T_upper)
+            & (x >= x_lower - tolerance) & (x <= x_upper + tolerance)
+        )
+    T = np.where(valid, T, np.inf).reshape(shape + (-1,)).min(axis=-1)
+    T = np.where(np.isfinite(T), T, np.nan)
+
+    with np.errstate(invalid='ignore'):
+        Se = spectral_acceleration(np.nan_to_num(T, nan=0.), agS[..., 0], 1., Tb[..., 0], Tc[..., 0], Td[..., 0], nu[..., 0])
+    Se = np.where(np.isnan(T), np.nan, Se)
+    force = m[..., 0] * Se
+    displacement = Se * c * T ** 2
+
+    return force, displacement, T
+
+def _real_polynomial_roots(coefficients: np.ndarray) -> np.ndarray:
+    '''
+    Returns the real roots of polynomials of degree 3 or less, NaN-padded, shape (..., 3)
+    'coefficients' - Coefficients from the highest power (T^3) to the constant, shape (..., 4)
+    '''
+    shape = coefficients.shape[:-1]
+    coefficients = coefficients.reshape(-1, 4)
+    roots = np.full((len(coefficients), 3), np.nan)
+    scale = np.max(np.abs(coefficients), axis=1)
+    negligible = np.abs(coefficients) <= 1e-12 * scale[:, None]
+    cubic = ~negligible[:, 0]
+    quadratic = negligible[:, 0] & ~negligible[:, 1]
+    linear = negligible[:, 0] & negligible[:, 1] & ~negligible[:, 2]
+
+    if np.any(cubic):
+        roots[cubic] = _real_cubic_roots(*(coefficients[cubic, idx] for idx in range(4)))
+    if np.any(quadratic):
+        c2, c1, c0 = (coefficients[quadratic, idx] for idx in range(1, 4))
+        discriminant = c1 ** 2 - 4 * c2 * c0
+        vertex = -c1 / (2 * c2)
+        # Complex roots with a negligible imaginary part are a double root
+        is_real = np.sqrt(np.maximum(-discriminant, 0.)) / (2 * np.abs(c2)) <= 1e-9 * np.maximum(np.abs(vertex), 1.)
+        half_width = np.sqrt(np.maximum(discriminant, 0.)) / (2 * c2)
+        roots[quadratic, 0] = np.where(is_real, vertex + half_width, np.nan)
+        roots[quadratic, 1] = np.where(is_real, vertex - half_width, np.nan)
+    if np.any(linear):
+        roots[linear, 0] = -coefficients[linear, 3] / coefficients[linear, 2]
+
+    # One Newton step polishes the closed-form roots to full precision
+    with np.errstate(invalid='ignore', divide='ignore'):
+        value = ((coefficients[:, 0:1] * roots + coefficients[:, 1:2]) * roots + coefficients[:, 2:3]) * roots + coefficients[:, 3:4]
+        slope = (3 * coefficients[:, 0:1] * roots + 2 * coefficients[:, 1:2]) * roots + coefficients[:, 2:3]
+        step = np.where(slope != 0., value / slope, 0.)
+    roots = roots - np.nan_to_num(step)
+
+    return roots.reshape(shape + (3,))
+
+def _real_cubic_roots(c3: np.ndarray, c2: np.ndarray, c1: np.ndarray, c0: np.ndarray) -> np.ndarray:
+    '''
+    Returns the real roots of cubic polynomials in closed form, NaN-padded, shape (..., 3).
+    The cubics are reduced to t^3 + p t + q with T = t - c2 / (3 c3) and solved with
+    Cardano's formula when there is one real root and the trigonometric formula when there are three.
+    '''
+    shift = c2 / (3 * c3)
+    p = c1 / c3 - c2 * shift / c3
+    q = c0 / c3 - shift * c1 / c3 + 2 * shift ** 3
+    half_q, third_p = q / 2, p / 3
+    discriminant = half_q ** 2 + third_p ** 3
+    one_root = discriminant >= 0
+    roots = np.full(c3.shape + (3,), np.nan)
+
+    # Cardano's formula, taking the cube root of the larger term to avoid cancellation
+    u = np.cbrt(-half_q - np.copysign(np.sqrt(np.where(one_root, discriminant, 0.)), half_q))
+    with np.errstate(divide='ignore', invalid='ignore'):
+        t = np.where(u != 0., u - third_p / u, 0.)
+    roots[..., 0] = np.where(one_root, t - shift, np.nan)
+
+    radius = np.sqrt(np.where(one_root, 1., -third_p))
+    with np.errstate(divide='ignore', invalid='ignore'):
+        angle = np.arccos(np.clip(np.where(one_root, 0., -half_q / radius ** 3), -1., 1.)) / 3
+    for k in range(3):
+        roots[..., k] = np.where(one_root, roots[..., k], 2 * radius * np.cos(angle - 2 * pi * k / 3) - shift)
+
+    return roots
+
+@lru_cache(maxsize=CACHE_SIZE)
+def cached_system_demand(mass: float, ag: float, spectra_type: int = 1, soil_type: str = 'C', damping: float = 5.0) -> tuple[tuple[float, float], ...]:
+    '''
+    Returns system_demand for the spectrum parameters. The last CACHE_SIZE results are kept,
+    so the demand is only recomputed when the mass or the spectrum parameters change.
+    '''
+    spectrum = Ec_response_spectrum(ag, spectra_type, soil_type, damping)
+
+    return tuple(system_demand(mass, spectrum))
+
+@lru_cache(maxsize=CACHE_SIZE)
+def cached_capacity_curve(k_type: str, k1: float, k2: float = 0., f1max: float = 0.) -> CapacityCurve:
+    '''
+    Returns CapacityCurve.from_k_type for the capacity parameters. The last CACHE_SIZE curves
+    are kept and their arrays are read-only because they are shared between callers.
+    '''
+    capacity = CapacityCurve.from_k_type(k_type, k1, k2, f1max)
+    capacity.stiffness.flags.writeable = False
+    capacity.max_force.flags.writeable = False
+
+    return capacity
+
+@lru_cache(maxsize=CACHE_SIZE)
+def cached_performance_point(
+    mass: float,
+    ag: float,
+    spectra_type: int,
+    soil_type: str,
+    damping: float,
+    k_type: str,
+    k1: float,
+    k2: float = 0.,
+    f1max: float = 0.,
+) -> tuple[float, float, float]:
+    '''
+    Returns performance_point for the spectrum and capacity parameters, reusing the cached capacity curve
+    '''
+    spectrum = Ec_response_spectrum(ag, spectra_type, soil_type, damping)
+
+    return performance_point(mass, spectrum, cached_capacity_curve(k_type, k1, k2, f1max))
 
+def clear_caches():
+    '''
+    Empties the caches of the cached_* functions
+    '''
+    for cached_function in (cached_system_demand, cached_capacity_curve, cached_performance_point):
+        cached_function.cache_clear()
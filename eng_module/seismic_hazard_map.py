@@ -0,0 +1,275 @@
+import argparse, json, os, sys
+from dataclasses import dataclass, field
+from math import pi
+import numpy as np
+from eng_module import instrumentation, seismic_analysis
+from eng_module.seismic_monte_carlo import SOIL_TYPES, SPECTRA_TYPES, SPECTRUM_TABLE
+
+QUANTITIES = ('Se', 'Sd')
+
+DEFAULT_MEMORY_BUDGET = 64 * 2 ** 20
+
+# Bytes of the temporary arrays of a tile per site and period (gathered spectrum shapes,
+# accelerations and displacements) on top of the output values
+BYTES_PER_SITE_AND_PERIOD = 48
+
+RASTER_HEADER_KEYS = ('ncols', 'nrows', 'xllcorner', 'yllcorner', 'xllcenter', 'yllcenter', 'cellsize', 'nodata_value')
+
+@dataclass
+class HazardGrid:
+    '''
+    The sites of a region on a regular grid of ny rows by nx columns
+
+    'ag' - Peak ground acceleration of each site in m/s2, shape (ny, nx). NaN for no data.
+        It can be a memory-mapped array (see read_grid)
+    'soil_type' - Eurocode 1998-1-1 ground type of each site as its index in SOIL_TYPES
+        (0 for 'A' to 4 for 'E') or its letter, shape (ny, nx). A negative index or NaN is no data
+    'spectra_type' - Spectrum type (1 or 2) of the whole grid or of each site, shape (ny, nx)
+    'damping' - Viscous damping ratio in percentage
+    'header' - Georeference of the grid as in the header of an ESRI ASCII raster (see read_grid)
+    '''
+    ag: np.ndarray
+    soil_type: np.ndarray
+    spectra_type: int|np.ndarray = 1
+    damping: float = 5.
+    header: dict = field(default_factory=dict)
+
+    def __post_init__(self):
+        if np.shape(self.ag) != np.shape(self.soil_type):
+            raise ValueError(f'The ground accelerations {np.shape(self.ag)} and soil types {np.shape(self.soil_type)} must have the same shape')
+        if np.ndim(self.ag) != 2:
+            raise ValueError(f'The grid must have two dimensions, not {np.ndim(self.ag)}')
+        if np.ndim(self.spectra_type) not in (0, 2):
+            raise ValueError('The spectra type must be one value or one value per site')
+
+    @property
+    def shape(self)-> tuple[int, int]:
+        return np.shape(self.ag)
+
+    @classmethod
+    def from_files(cls, ag_file: str, soil_file: str, spectra_type: int = 1, damping: float = 5.)-> 'HazardGrid':
+        '''
+        Returns the grid of the ground acceleration and soil type rasters (see read_grid)
+        '''
+        ag, header = read_grid(ag_file)
+        soil_type, soil_header = read_grid(soil_file)
+        if header and soil_header and any(header.get(key) != soil_header.get(key) for key in ('ncols', 'nrows', 'cellsize')):
+            raise ValueError(f'The rasters {ag_file} and {soil_file} do not cover the same grid')
+
+        return cls(ag, soil_type, spectra_type, damping, header or soil_header)
+
+    def cell(self, x: float, y: float)-> tuple[int, int]:
+        '''
+        Returns the row and column of the cell containing the point ('x', 'y') of the georeference
+        '''
+        if 'cellsize' not in self.header:
+            raise ValueError('The grid has no georeference')
+        return _cell(self.header, x, y, self.shape)
+
+def read_grid(filename: str)-> tuple[np.ndarray, dict]:
+    '''
+    Returns the values of a raster file and its header
+
+    'filename' - A NumPy .npy file, memory-mapped read only so a grid larger than the
+        memory can be processed in tiles (with no header), or an ESRI ASCII raster (.asc)
+        whose no data values become NaN
+    '''
+    if filename.endswith('.npy'):
+        return np.load(filename, mmap_mode='r'), {}
+
+    header = {}
+    with open(filename) as raster_file:
+        for line in raster_file:
+            words = line.split()
+            if len(words) != 2 or words[0].lower() not in RASTER_HEADER_KEYS:
+                break
+            header[words[0].lower()] = float(words[1])
+    for key in ('ncols', 'nrows', 'cellsize'):
+        if key not in header:
+            raise ValueError(f'The raster {filename} has no {key} in its header')
+    values = np.loadtxt(filename, skiprows=len(header), ndmin=2)
+    if values.shape != (int(header['nrows']), int(header['ncols'])):
+        raise ValueError(f"The raster {filename} has {values.shape[0]} rows of {values.shape[1]} values, not {int(header['nrows'])} of {int(header['ncols'])}")
+    if 'nodata_value' in header:
+        values[values == header['nodata_value']] = np.nan
+
+    return values, header
+
+def spectrum_shapes(periods: np.ndarray, damping: float = 5.)-> np.ndarray:
+    '''
+    Returns the elastic spectral acceleration for ag = 1 of each spectra type and soil type
+    at the 'periods', shape (len(SPECTRA_TYPES), len(SOIL_TYPES), n_periods).
+    Se(T) is proportional to ag, so the spectrum of any site is its ag times one of these.
+    '''
+    S, Tb, Tc, Td = (SPECTRUM_TABLE[..., idx, None] for idx in range(4))
+
+    return seismic_analysis.spectral_acceleration(
+        np.asarray(periods, dtype=float), 1., S, Tb, Tc, Td, seismic_analysis.damping_correction(damping)
+    )
+
+def tile_rows(n_columns: int, n_periods: int, memory_budget: int = DEFAULT_MEMORY_BUDGET)-> int:
+    '''
+    Returns the number of grid rows computed at once to stay within 'memory_budget' bytes
+    '''
+    return max(1, int(memory_budget // (BYTES_PER_SITE_AND_PERIOD * n_columns * n_periods)))
+
+def compute_tile(grid: HazardGrid, rows: slice, shapes: np.ndarray, periods: np.ndarray)-> np.ndarray:
+    '''
+    Returns Se and Sd of the sites in the 'rows' of the grid, shape (n_rows, nx, len(QUANTITIES), n_periods).
+    The sites without data are NaN.
+
+    'shapes' - The spectrum shapes at the 'periods' (see spectrum_shapes)
+    '''
+    ag = np.asarray(grid.ag[rows], dtype=float)
+    soil_type = np.asarray(grid.soil_type[rows])
+    if soil_type.dtype.kind in 'US':
+        soil_type = np.select([soil_type == soil for soil in SOIL_TYPES], range(len(SOIL_TYPES)), -1)
+    soil_type = np.nan_to_num(soil_type.astype(float), nan=-1.).astype(int)
+    if np.ndim(grid.spectra_type) == 0:
+        spectra_type = np.full(ag.shape, grid.spectra_type)
+    else:
+        spectra_type = np.asarray(grid.spectra_type[rows])
+
+    if np.any(soil_type >= len(SOIL_TYPES)):
+        raise ValueError(f'The soil type index must be less than {len(SOIL_TYPES)}, not {soil_type.max()}')
+    unknown = ~np.isin(spectra_type, SPECTRA_TYPES)
+    if np.any(unknown):
+        raise ValueError(f"The spectra type must be one of {', '.join(map(str, SPECTRA_TYPES))}, not {spectra_type[unknown].flat[0]}")
+
+    valid = (soil_type >= 0) & np.isfinite(ag)
+    values = np.full(ag.shape + (len(QUANTITIES), len(periods)), np.nan)
+    Se = ag[valid, None] * shapes[np.searchsorted(SPECTRA_TYPES, spectra_type[valid]), soil_type[valid]]
+    values[valid, 0] = Se
+    values[valid, 1] = Se * (periods / (2 * pi)) ** 2
+
+    return values
+
+@instrumentation.timed('seismic.hazard_map')
+def compute_spectrum_map(
+    grid: HazardGrid,
+    periods: np.ndarray,
+    filename: str,
+    memory_budget: int = DEFAULT_MEMORY_BUDGET,
+    dtype: str = 'float32',
+)-> 'SpectrumMap':
+    '''
+    Computes the elastic spectral acceleration Se(T) in m/s2 and displacement Sd(T) in m of
+    every site of the grid at the 'periods' and returns them as a SpectrumMap.
+
+    The values are written tile by tile (blocks of rows sized to 'memory_budget' bytes) to a
+    memory-mapped .npy file of shape (ny, nx, len(QUANTITIES), n_periods), so the grid and the
+    results do not need to fit in memory. The spectrum of a site is contiguous in the file.
+    The periods and the georeference of the grid are saved next to it (see SpectrumMap.open).
+
+    'periods' - Periods in s between 0 and 4 s
+    'filename' - The .npy file of the values
+    'dtype' - Data type of the stored values
+    '''
+    periods = np.atleast_1d(np.asarray(periods, dtype=float))
+    shapes = spectrum_shapes(periods, grid.damping)
+    ny, nx = grid.shape
+    directory = os.path.dirname(os.path.abspath(filename))
+    os.makedirs(directory, exist_ok=True)
+
+    values = np.lib.format.open_memmap(filename, mode='w+', dtype=dtype, shape=(ny, nx, len(QUANTITIES), len(periods)))
+    n_rows = tile_rows(nx, len(periods), memory_budget)
+    for start in range(0, ny, n_rows):
+        rows = slice(start, min(start + n_rows, ny))
+        values[rows] = compute_tile(grid, rows, shapes, periods)
+    values.flush()
+    del values
+
+    metadata = {'periods': periods.tolist(), 'quantities': list(QUANTITIES), 'damping': grid.damping, 'header': grid.header}
+    with open(_metadata_file(filename), 'w') as metadata_file:
+        json.dump(metadata, metadata_file, indent=2)
+
+    return SpectrumMap.open(filename)
+
+@dataclass
+class SpectrumMap:
+    '''
+    The Se and Sd of every site of a grid at a set of periods (see compute_spectrum_map)
+
+    'values' - Se and Sd of each site, shape (ny, nx, len(QUANTITIES), n_periods), memory-mapped
+        read only when opened from a file, so reading one site only reads its spectrum
+    'periods' - Periods in s, shape (n_periods,)
+    'header' - Georeference of the grid (see read_grid)
+    '''
+    values: np.ndarray
+    periods: np.ndarray
+    header: dict = field(default_factory=dict)
+
+    @classmethod
+    def open(cls, filename: str)-> 'SpectrumMap':
+        '''
+        Returns the map saved to 'filename' by compute_spectrum_map
+        '''
+        with open(_metadata_file(filename)) as metadata_file:
+            metadata = json.load(metadata_file)
+
+        return cls(np.load(filename, mmap_mode='r'), np.array(metadata['periods']), metadata['header'])
+
+    @property
+    def shape(self)-> tuple[int, int]:
+        return self.values.shape[:2]
+
+    def site(self, row: int, column: int)-> dict[str, np.ndarray]:
+        '''
+        Returns the periods 'T' and the spectral accelerations 'Se' and displacements 'Sd' of a site
+        '''
+        values = np.array(self.values[row, column], dtype=float)
+
+        return {'T': self.periods} | dict(zip(QUANTITIES, values))
+
+    def site_at(self, x: float, y: float)-> dict[str, np.ndarray]:
+        '''
+        Returns the spectrum of the site containing the point ('x', 'y') of the georeference (see site)
+        '''
+        if 'cellsize' not in self.header:
+            raise ValueError('The map has no georeference')
+        return self.site(*_cell(self.header, x, y, self.shape))
+
+    def quantity(self, name: str, period: float)-> np.ndarray:
+        '''
+        Returns the map of 'Se' or 'Sd' at one of the periods of the map, shape (ny, nx)
+        '''
+        matches = np.flatnonzero(np.isclose(self.periods, period))
+        if name not in QUANTITIES or not len(matches):
+            raise KeyError(f'The map has no {name} at T = {period} s')
+        return self.values[:, :, QUANTITIES.index(name), matches[0]]
+
+def _metadata_file(filename: str)-> str:
+    return os.path.splitext(filename)[0] + '.json'
+
+def _cell(header: dict, x: float, y: float, shape: tuple[int, int])-> tuple[int, int]:
+    cellsize = header['cellsize']
+    x0 = header.get('xllcorner', header.get('xllcenter', 0.) - cellsize / 2)
+    y0 = header.get('yllcorner', header.get('yllcenter', 0.) - cellsize / 2)
+    # The rows of a raster start at the top (north) edge
+    row = shape[0] - 1 - int(np.floor((y - y0) / cellsize))
+    column = int(np.floor((x - x0) / cellsize))
+    if not (0 <= row < shape[0] and 0 <= column < shape[1]):
+        raise ValueError(f'The point ({x}, {y}) is outside the grid')
+
+    return row, column
+
+def main(argv: list[str]|None = None)-> int:
+    parser = argparse.ArgumentParser(description='Compute the elastic response spectra of every site of a hazard grid.')
+    parser.add_argument('ag', help='raster of the peak ground acceleration in m/s2 (.npy or ESRI ASCII .asc)')
+    parser.add_argument('soil', help='raster of the soil type index, 0 for A to 4 for E (.npy or .asc)')
+    parser.add_argument('output', help='.npy file of the spectra, with the periods in a .json file next to it')
+    parser.add_argument('--periods', type=float, nargs='+', default=None, help='periods in s (default: 0 to 4 s every 0.05 s)')
+    parser.add_argument('--spectra-type', type=int, default=1, choices=SPECTRA_TYPES, help='spectrum type')
+    parser.add_argument('--damping', type=float, default=5., help='viscous damping ratio in percentage')
+    parser.add_argument('--memory', type=float, default=DEFAULT_MEMORY_BUDGET / 2 ** 20, help='memory budget of a tile in MiB')
+    args = parser.parse_args(argv)
+
+    periods = np.round(np.arange(0., 4. + 1e-9, 0.05), 2) if args.periods is None else args.periods
+    grid = HazardGrid.from_files(args.ag, args.soil, args.spectra_type, args.damping)
+    spectrum_map = compute_spectrum_map(grid, periods, args.output, int(args.memory * 2 ** 20))
+    print(f'{spectrum_map.shape[0]} x {spectrum_map.shape[1]} sites at {len(spectrum_map.periods)} periods written to {args.output}')
+
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,302 @@
+from dataclasses import dataclass, field
+import numpy as np
+from eng_module import seismic_analysis
+
+SOIL_TYPES = ('A', 'B', 'C', 'D', 'E')
+
+SPECTRA_TYPES = (1, 2)
+
+RNG_BLOCK_SIZE = 2 ** 16
+
+BYTES_PER_SAMPLE_AND_BRANCH = 2048
+
+DEFAULT_MEMORY_BUDGET = 64 * 2 ** 20
+
+# S, Tb, Tc and Td of each spectra type and soil type, shape (2, 5, 4)
+SPECTRUM_TABLE = np.array([
+    [list(seismic_analysis.response_spectrum_parameters(spectra_type, soil_type).values()) for soil_type in SOIL_TYPES]
+    for spectra_type in SPECTRA_TYPES
+])
+
+@dataclass(frozen=True)
+class Distribution:
+    '''
+    A random variable sampled by the Monte Carlo analysis
+
+    'kind' - 'constant', 'uniform', 'normal', 'lognormal' or 'choice'
+    'parameters' - (value,) for 'constant', (low, high) for 'uniform', (mean, standard deviation)
+        for 'normal', (median, logarithmic standard deviation) for 'lognormal'
+        and the possible values for 'choice'
+    'probabilities' - Probability of each value of a 'choice' (equally likely if None)
+    'lower', 'upper' - Bounds the samples are clipped to
+    '''
+    kind: str
+    parameters: tuple
+    probabilities: tuple|None = None
+    lower: float = -np.inf
+    upper: float = np.inf
+
+    def __post_init__(self):
+        expected = {'constant': 1, 'uniform': 2, 'normal': 2, 'lognormal': 2}
+        if self.kind not in (*expected, 'choice'):
+            raise ValueError(f"The kind of distribution must be one of {', '.join((*expected, 'choice'))}, not {self.kind}")
+        if self.kind in expected and len(self.parameters) != expected[self.kind]:
+            raise ValueError(f'A {self.kind} distribution needs {expected[self.kind]} parameters, not {len(self.parameters)}')
+
+    @classmethod
+    def constant(cls, value)-> 'Distribution':
+        return cls('constant', (value,))
+
+    @classmethod
+    def uniform(cls, low: float, high: float)-> 'Distribution':
+        return cls('uniform', (low, high))
+
+    @classmethod
+    def normal(cls, mean: float, std: float, lower: float = -np.inf, upper: float = np.inf)-> 'Distribution':
+        return cls('normal', (mean, std), lower=lower, upper=upper)
+
+    @classmethod
+    def lognormal(cls, median: float, dispersion: float, lower: float = -np.inf, upper: float = np.inf)-> 'Distribution':
+        return cls('lognormal', (median, dispersion), lower=lower, upper=upper)
+
+    @classmethod
+    def choice(cls, values: list, probabilities: list[float]|None = None)-> 'Distribution':
+        return cls('choice', tuple(values), None if probabilities is None else tuple(probabilities))
+
+    def sample(self, rng: np.random.Generator, size: int)-> np.ndarray:
+        '''
+        Returns 'size' samples drawn with 'rng'
+        '''
+        if self.kind == 'constant':
+            return np.full(size, self.parameters[0])
+        if self.kind == 'choice':
+            return np.asarray(self.parameters)[rng.choice(len(self.parameters), size, p=self.probabilities)]
+        if self.kind == 'uniform':
+            values = rng.uniform(*self.parameters, size)
+        elif self.kind == 'normal':
+            values = rng.normal(*self.parameters, size)
+        else:
+            median, dispersion = self.parameters
+            values = median * np.exp(dispersion * rng.standard_normal(size))
+
+        return np.clip(values, self.lower, self.upper)
+
+def _as_distribution(value)-> Distribution:
+    return value if isinstance(value, Distribution) else Distribution.constant(value)
+
+@dataclass
+class SeismicModel:
+    '''
+    The random variables of a seismic system with the units of the seismic design app.
+    Any of them can be a Distribution or a constant value.
+
+    'ag' - Peak ground acceleration [m/s2]
+    'mass' - Mass of the system [ton]
+    'k1' - Stiffness of the first branch [kN/m]
+    'k_type' - 'Linear' or 'Multi-linear' (bilinear) capacity curve
+    'k2', 'f1max' - Stiffness of the second branch [kN/m] and maximum force of the first one [kN]
+    'damping' - Viscous damping ratio [%]
+    'soil_type', 'spectra_type' - Eurocode 1998-1-1 ground type and spectrum type
+    '''
+    ag: Distribution|float
+    mass: Distribution|float
+    k1: Distribution|float
+    k_type: str = 'Linear'
+    k2: Distribution|float = 0.
+    f1max: Distribution|float = 0.
+    damping: Distribution|float = 5.
+    soil_type: Distribution|str = 'C'
+    spectra_type: Distribution|int = 1
+
+    def __post_init__(self):
+        if self.k_type not in ('Linear', 'Multi-linear'):
+            raise ValueError(f"The type of stiffness must be one of 'Linear' or 'Multi-linear', not {self.k_type}")
+        for name in ('ag', 'mass', 'k1', 'k2', 'f1max', 'damping', 'soil_type', 'spectra_type'):
+            setattr(self, name, _as_distribution(getattr(self, name)))
+
+    @property
+    def n_branches(self)-> int:
+        return 1 if self.k_type == 'Linear' else 2
+
+    def sample(self, rng: np.random.Generator, size: int)-> dict[str, np.ndarray]:
+        '''
+        Returns 'size' samples of each random variable. The soil and spectra types are
+        returned as the index of the spectrum parameters in SPECTRUM_TABLE.
+        '''
+        samples = {
+            name: getattr(self, name).sample(rng, size)
+            for name in ('ag', 'mass', 'k1', 'k2', 'f1max', 'damping', 'soil_type', 'spectra_type')
+        }
+        samples['soil_type'] = _lookup_index(samples['soil_type'], SOIL_TYPES, 'soil type')
+        samples['spectra_type'] = _lookup_index(samples['spectra_type'], SPECTRA_TYPES, 'spectra type')
+
+        return samples
+
+def _lookup_index(values: np.ndarray, options: tuple, description: str)-> np.ndarray:
+    unique, inverse = np.unique(values, return_inverse=True)
+    unknown = [value for value in unique.tolist() if value not in options]
+    if unknown:
+        raise ValueError(f"The {description} must be one of {', '.join(map(str, options))}, not {unknown[0]}")
+
+    return np.array([options.index(value) for value in unique.tolist()], dtype=np.int64)[inverse]
+
+@dataclass
+class MonteCarloResult:
+    '''
+    Statistics of the performance points of a Monte Carlo analysis
+
+    'n_samples' - Number of samples
+    'no_intersection' - Samples where the capacity does not meet the demand up to 4 s.
+        They are counted as exceeding every displacement and force threshold
+    'displacement_thresholds', 'force_thresholds' - Thresholds of the exceedance curves
+    'displacement_exceedance', 'force_exceedance' - Probability of exceeding each threshold
+    'statistics' - Mean and standard deviation of the force, displacement and period
+        of the samples with a performance point
+    'ag_bins' - Edges of the peak ground acceleration bins of the fragility curves
+    'limit_states' - Displacement limits of the fragility curves
+    'ag_counts' - Number of samples in each ag bin, shape (B,)
+    'limit_state_counts' - Samples of each ag bin exceeding each limit state, shape (B, L)
+    'samples' - Force, displacement and period of every sample if they were kept
+    '''
+    n_samples: int
+    no_intersection: int
+    displacement_thresholds: np.ndarray
+    displacement_exceedance: np.ndarray
+    force_thresholds: np.ndarray
+    force_exceedance: np.ndarray
+    statistics: dict[str, dict[str, float]]
+    ag_bins: np.ndarray
+    limit_states: np.ndarray
+    ag_counts: np.ndarray
+    limit_state_counts: np.ndarray
+    samples: dict[str, np.ndarray]|None = field(default=None, repr=False)
+
+    def fragility(self)-> np.ndarray:
+        '''
+        Returns the probability of exceeding each limit state given the ag of each bin,
+        NaN for empty bins, shape (B, L)
+        '''
+        with np.errstate(invalid='ignore', divide='ignore'):
+            return self.limit_state_counts / self.ag_counts[:, None]
+
+    def ag_bin_centers(self)-> np.ndarray:
+        return (self.ag_bins[1:] + self.ag_bins[:-1]) / 2
+
+def chunk_size(n_branches: int, memory_budget: int = DEFAULT_MEMORY_BUDGET)-> int:
+    '''
+    Returns the number of samples solved at once to stay within 'memory_budget' bytes
+    '''
+    return max(1, int(memory_budget // (BYTES_PER_SAMPLE_AND_BRANCH * n_branches)))
+
+def monte_carlo(
+    model: SeismicModel,
+    n_samples: int,
+    seed: int|None = 0,
+    displacement_thresholds: np.ndarray|None = None,
+    force_thresholds: np.ndarray|None = None,
+    limit_states: np.ndarray|None = None,
+    ag_bins: np.ndarray|None = None,
+    memory_budget: int = DEFAULT_MEMORY_BUDGET,
+    keep_samples: bool = False,
+)-> MonteCarloResult:
+    '''
+    Returns the statistics of the performance points of 'n_samples' systems sampled from 'model'
+
+    The samples are drawn in blocks of RNG_BLOCK_SIZE, each with its own random generator
+    spawned from 'seed', and solved with seismic_analysis.performance_points in chunks
+    sized to 'memory_budget' bytes. Only running counts are kept between blocks, so the
+    memory does not grow with the number of samples (unless 'keep_samples' is True) and
+    the results for a seed do not depend on the memory budget.
+
+    'displacement_thresholds' - Displacements [m] of the exceedance curve (default: 50 up to 0.5 m)
+    'force_thresholds' - Forces [kN] of the exceedance curve (default: 50 up to the largest
+        plateau force of the first block)
+    'limit_states' - Displacements [m] of the fragility curves (default: 0.01, 0.02, 0.05 and 0.1 m)
+    'ag_bins' - Edges of the ag bins of the fragility curves (default: 20 bins over the first block)
+    '''
+    if n_samples < 1:
+        raise ValueError(f'The number of samples must be at least 1, not {n_samples}')
+    block_seeds = np.random.SeedSequence(seed).spawn(-(-n_samples // RNG_BLOCK_SIZE))
+    size = chunk_size(model.n_branches, memory_budget)
+
+    displacement_thresholds = np.linspace(0., 0.5, 51)[1:] if displacement_thresholds is None else np.asarray(displacement_thresholds, dtype=float)
+    limit_states = np.array([0.01, 0.02, 0.05, 0.1]) if limit_states is None else np.asarray(limit_states, dtype=float)
+    displacement_counts = np.zeros(len(displacement_thresholds), dtype=np.int64)
+    force_counts = None
+    ag_counts = limit_state_counts = None
+    no_intersection = 0
+    sums = {name: np.zeros(2) for name in ('force', 'displacement', 'period')}
+    kept_samples = {name: [] for name in ('ag', 'force', 'displacement', 'period')}
+
+    for block, block_seed in enumerate(block_seeds):
+        block_size = min(RNG_BLOCK_SIZE, n_samples - block * RNG_BLOCK_SIZE)
+        samples = model.sample(np.random.default_rng(block_seed), block_size)
+        if force_thresholds is None:
+            plateau_force = samples['mass'] * samples['ag'] * SPECTRUM_TABLE[samples['spectra_type'], samples['soil_type'], 0] * 2.5 * seismic_analysis.damping_correction(samples['damping'])
+            force_thresholds = np.linspace(0., np.max(plateau_force), 51)[1:]
+        if ag_bins is None:
+            ag_bins = np.linspace(np.min(samples['ag']), np.max(samples['ag']) * (1 + 1e-12), 21)
+        if force_counts is None:
+            force_thresholds, ag_bins = np.asarray(force_thresholds, dtype=float), np.asarray(ag_bins, dtype=float)
+            force_counts = np.zeros(len(force_thresholds), dtype=np.int64)
+            ag_counts = np.zeros(len(ag_bins) - 1, dtype=np.int64)
+            limit_state_counts = np.zeros((len(ag_bins) - 1, len(limit_states)), dtype=np.int64)
+
+        force, displacement, period = (np.concatenate(values) for values in zip(*(
+            solve_samples(model.k_type, {name: values[start:start + size] for name, values in samples.items()})
+            for start in range(0, block_size, size)
+        )))
+        found = ~np.isnan(period)
+        no_intersection += int(np.count_nonzero(~found))
+        exceeding_displacement = np.where(found, displacement, np.inf)
+        exceeding_force = np.where(found, force, np.inf)
+        displacement_counts += block_size - np.searchsorted(np.sort(exceeding_displacement), displacement_thresholds, side='right')
+        force_counts += block_size - np.searchsorted(np.sort(exceeding_force), force_thresholds, side='right')
+
+        ag_bin = np.searchsorted(ag_bins, samples['ag'], side='right') - 1
+        in_bins = (ag_bin >= 0) & (ag_bin < len(ag_counts))
+        ag_counts += np.bincount(ag_bin[in_bins], minlength=len(ag_counts))
+        for idx, limit_state in enumerate(limit_states):
+            exceeding = in_bins & (exceeding_displacement > limit_state)
+            limit_state_counts[:, idx] += np.bincount(ag_bin[exceeding], minlength=len(ag_counts))
+
+        for name, values in (('force', force), ('displacement', displacement), ('period', period)):
+            sums[name] += [np.sum(values[found]), np.sum(values[found] ** 2)]
+        if keep_samples:
+            for name, values in (('ag', samples['ag']), ('force', force), ('displacement', displacement), ('period', period)):
+                kept_samples[name].append(values)
+
+    n_found = n_samples - no_intersection
+    statistics = {}
+    for name, (total, total_squares) in sums.items():
+        mean = total / n_found if n_found else np.nan
+        variance = total_squares / n_found - mean ** 2 if n_found else np.nan
+        statistics[name] = {'mean': float(mean), 'std': float(np.sqrt(max(variance, 0.))) if n_found else np.nan}
+
+    result = MonteCarloResult(
+        n_samples = n_samples,
+        no_intersection = no_intersection,
+        displacement_thresholds = displacement_thresholds,
+        displacement_exceedance = displacement_counts / n_samples,
+        force_thresholds = force_thresholds,
+        force_exceedance = force_counts / n_samples,
+        statistics = statistics,
+        ag_bins = ag_bins,
+        limit_states = limit_states,
+        ag_counts = ag_counts,
+        limit_state_counts = limit_state_counts,
+        samples = {name: np.concatenate(values) for name, values in kept_samples.items()} if keep_samples else None
+    )
+
+    return result
+
+def solve_samples(k_type: str, samples: dict[str, np.ndarray])-> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    '''
+    Returns the force, displacement and period of the performance point of each sample
+    (see SeismicModel.sample)
+    '''
+    S, Tb, Tc, Td = np.moveaxis(SPECTRUM_TABLE[samples['spectra_type'], samples['soil_type']], -1, 0)
+    capacity = seismic_analysis.CapacityCurve.from_k_type(k_type, samples['k1'], samples['k2'], samples['f1max'])
+    nu = seismic_analysis.damping_correction(samples['damping'])
+
+    return seismic_analysis.performance_points(samples['mass'], samples['ag'], S, Tb, Tc, Td, nu, capacity)
@@ -0,0 +1,471 @@
+import argparse, json, math, os, queue, sys, threading, time
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor, TimeoutError as FutureTimeoutError
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import numpy as np
+from eng_module import beam_parser
+from eng_module.beam_batch import analyze_beam_data
+from eng_module import columns, seismic_analysis, seismic_monte_carlo
+
+DEFAULT_HOST = '127.0.0.1'
+
+DEFAULT_PORT = 8765
+
+MAX_BATCH_SIZE = 4096
+
+MAX_DELAY = 0.002
+
+MAX_PENDING = 100000
+
+REQUEST_TIMEOUT = 60.
+
+LATENCY_WINDOW = 10000
+
+COLUMN_FIELDS = ('h', 'E', 'A', 'Ix', 'Iy', 'kx', 'ky', 'fy')
+
+SEISMIC_FIELDS = ('mass', 'ag', 'k1')
+
+class ServiceBusy(Exception):
+    '''
+    Raised when a batcher has no room for more pending items
+    '''
+
+class EndpointMetrics:
+    '''
+    Counters and recent request latencies of one endpoint. The latencies of the
+    last 'window' requests are kept for the percentiles.
+    '''
+    def __init__(self, window: int = LATENCY_WINDOW):
+        self.started = time.perf_counter()
+        self.requests = 0
+        self.items = 0
+        self.batches = 0
+        self.batched_items = 0
+        self.rejected = 0
+        self.errors = 0
+        self.latencies = deque(maxlen=window)
+        self._lock = threading.Lock()
+
+    def record_request(self, n_items: int, latency: float, error: bool = False):
+        with self._lock:
+            self.requests += 1
+            self.items += n_items
+            self.errors += error
+            self.latencies.append(latency)
+
+    def record_batch(self, n_items: int):
+        with self._lock:
+            self.batches += 1
+            self.batched_items += n_items
+
+    def record_rejected(self):
+        with self._lock:
+            self.rejected += 1
+
+    def summary(self)-> dict:
+        '''
+        Returns the counters, the throughput in items per second since the start and the
+        mean and 50th, 95th and 99th percentile latency in milliseconds
+        '''
+        with self._lock:
+            latencies = np.array(self.latencies) * 1000.
+            elapsed = time.perf_counter() - self.started
+            summary = {
+                'requests': self.requests,
+                'items': self.items,
+                'batches': self.batches,
+                'mean_batch_size': self.batched_items / self.batches if self.batches else 0.,
+                'rejected': self.rejected,
+                'errors': self.errors,
+                'throughput': self.items / elapsed if elapsed > 0. else 0.,
+            }
+        percentiles = np.percentile(latencies, [50., 95., 99.]) if len(latencies) else [0., 0., 0.]
+        summary['latency_ms'] = {
+            'mean': float(latencies.mean()) if len(latencies) else 0.,
+            'p50': float(percentiles[0]),
+            'p95': float(percentiles[1]),
+            'p99': float(percentiles[2]),
+        }
+
+        return summary
+
+class Batcher:
+    '''
+    Coalesces the items submitted by concurrent requests into batches run by 'function'
+    in a background thread. A batch is run when it reaches 'max_batch_size' items or
+    'max_delay' seconds after its first request arrived. The items of one request are
+    never split between batches.
+
+    'function' - Called with the list of items of a batch, returns the list of their results
+    'max_pending' - Largest number of items waiting or running. Beyond it submit raises
+        ServiceBusy instead of queueing, so a burst of requests cannot exhaust the memory
+    '''
+    def __init__(self, function, max_batch_size: int = MAX_BATCH_SIZE, max_delay: float = MAX_DELAY, max_pending: int = MAX_PENDING, metrics: EndpointMetrics|None = None):
+        self.function = function
+        self.max_batch_size = max_batch_size
+        self.max_delay = max_delay
+        self.max_pending = max_pending
+        self.metrics = EndpointMetrics() if metrics is None else metrics
+        self.pending = 0
+        self._lock = threading.Lock()
+        self._queue = queue.SimpleQueue()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def submit(self, items: list)-> Future:
+        '''
+        Returns a future of the list of results of 'items'
+        '''
+        with self._lock:
+            if self.pending + len(items) > self.max_pending:
+                self.metrics.record_rejected()
+                raise ServiceBusy(f'{self.pending} items are pending')
+            self.pending += len(items)
+        future = Future()
+        self._queue.put((items, future))
+
+        return future
+
+    def close(self):
+        '''
+        Stops the background thread after the batches already submitted
+        '''
+        self._queue.put(None)
+        self._thread.join()
+
+    def _run(self):
+        while True:
+            request = self._queue.get()
+            if request is None:
+                return
+            requests = [request]
+            n_items = len(request[0])
+            deadline = time.perf_counter() + self.max_delay
+            while n_items < self.max_batch_size:
+                timeout = deadline - time.perf_counter()
+                try:
+                    request = self._queue.get(timeout=timeout) if timeout > 0. else self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if request is None:
+                    self._queue.put(None)
+                    break
+                requests.append(request)
+                n_items += len(request[0])
+            self._run_batch(requests, n_items)
+
+    def _run_batch(self, requests: list[tuple[list, Future]], n_items: int):
+        self.metrics.record_batch(n_items)
+        try:
+            results = self.function([item for items, _ in requests for item in items])
+        except Exception as err:
+            if len(requests) == 1:
+                requests[0][1].set_exception(err)
+            else:
+                # One bad request must not fail the others it was batched with,
+                # so the requests are run again one at a time
+                for items, future in requests:
+                    try:
+                        future.set_result(self.function(items))
+                    except Exception as request_err:
+                        future.set_exception(request_err)
+        else:
+            start = 0
+            for items, future in requests:
+                future.set_result(results[start:start + len(items)])
+                start += len(items)
+        finally:
+            with self._lock:
+                self.pending -= n_items
+
+def _number(item: dict, name: str, default: float|None = None)-> float:
+    value = item.get(name, default)
+    if value is None:
+        raise ValueError(f"'{name}' is missing")
+    if isinstance(value, bool) or not isinstance(value, (int, float)) or not math.isfinite(value):
+        raise ValueError(f"'{name}' must be a finite number, not {value!r}")
+
+    return float(value)
+
+def _positive_number(item: dict, name: str, default: float|None = None)-> float:
+    value = _number(item, name, default)
+    if value <= 0.:
+        raise ValueError(f"'{name}' must be positive, not {value!r}")
+
+    return value
+
+def parse_column_item(item: dict)-> tuple:
+    '''
+    Returns the values of a column check request item: the SteelColumn properties h, E, A,
+    Ix, Iy, kx, ky and fy, the optional gamma_m1 (1.0), buckling_curve ('b') and demand (0.0).
+    All of them but the buckling curve and the demand must be positive.
+    '''
+    values = tuple(_positive_number(item, name) for name in COLUMN_FIELDS)
+    buckling_curve = item.get('buckling_curve', 'b')
+    if buckling_curve not in columns.IMPERFECTION_FACTORS:
+        raise ValueError(f"'buckling_curve' must be one of {', '.join(columns.IMPERFECTION_FACTORS)}, not {buckling_curve!r}")
+
+    return values + (_positive_number(item, 'gamma_m1', 1.0), buckling_curve, _number(item, 'demand', 0.))
+
+def check_columns(items: list[tuple])-> list[dict]:
+    '''
+    Returns the capacity of a batch of parsed column items, checked as one SteelColumnArray
+    '''
+    values = list(zip(*items))
+    column_array = columns.SteelColumnArray(*(np.array(values[idx], dtype=float) for idx in range(len(COLUMN_FIELDS))), gamma_m1=np.array(values[8]), buckling_curve=np.array(values[9]))
+    demand = np.array(values[10])
+    resistance = column_array.factored_compressive_resistance()
+    crushing_load = column_array.factored_crushing_load()
+    capacity = np.minimum(resistance, crushing_load)
+    demand_capacity_ratio = demand / capacity
+
+    return [
+        {'compressive_resistance': r, 'crushing_load': n, 'capacity': c, 'demand_capacity_ratio': d}
+        for r, n, c, d in zip(resistance.tolist(), crushing_load.tolist(), capacity.tolist(), demand_capacity_ratio.tolist())
+    ]
+
+def parse_seismic_item(item: dict)-> tuple:
+    '''
+    Returns the values of a performance point request item: mass, ag, k1, the optional
+    k_type ('Linear'), k2 and f1max (0.0), spectra_type (1), soil_type ('C') and damping (5.0).
+    The mass, ag and k1 must be positive and the damping not negative. A 'Multi-linear'
+    curve needs a positive f1max and a k2 from 0 up to (not including) k1.
+    '''
+    values = tuple(_positive_number(item, name) for name in SEISMIC_FIELDS)
+    k_type = item.get('k_type', 'Linear')
+    if k_type not in ('Linear', 'Multi-linear'):
+        raise ValueError(f"'k_type' must be one of 'Linear' or 'Multi-linear', not {k_type!r}")
+    k2, f1max = _number(item, 'k2', 0.), _number(item, 'f1max', 0.)
+    if k_type == 'Multi-linear':
+        if f1max <= 0.:
+            raise ValueError(f"'f1max' of a 'Multi-linear' curve must be positive, not {f1max!r}")
+        if not 0. <= k2 < values[2]:
+            raise ValueError(f"'k2' of a 'Multi-linear' curve must be at least 0 and less than 'k1', not {k2!r}")
+    spectra_type = item.get('spectra_type', 1)
+    if spectra_type not in seismic_monte_carlo.SPECTRA_TYPES:
+        raise ValueError(f"'spectra_type' must be one of 1 or 2, not {spectra_type!r}")
+    soil_type = item.get('soil_type', 'C')
+    if soil_type not in seismic_monte_carlo.SOIL_TYPES:
+        raise ValueError(f"'soil_type' must be one of {', '.join(seismic_monte_carlo.SOIL_TYPES)}, not {soil_type!r}")
+    damping = _number(item, 'damping', 5.0)
+    if damping < 0.:
+        raise ValueError(f"'damping' must not be negative, not {damping!r}")
+
+    return values + (
+        k_type, k2, f1max,
+        seismic_monte_carlo.SPECTRA_TYPES.index(spectra_type),
+        seismic_monte_carlo.SOIL_TYPES.index(soil_type),
+        damping,
+    )
+
+def solve_performance_points(items: list[tuple])-> list[dict]:
+    '''
+    Returns the performance point of a batch of parsed seismic items, solved with one call
+    of seismic_analysis.performance_points per type of capacity curve
+    '''
+    mass, ag, k1, k_type, k2, f1max, spectra_type, soil_type, damping = (np.array(values) for values in zip(*items))
+    force, displacement, period = (np.full(len(items), np.nan) for _ in range(3))
+    for curve_type in ('Linear', 'Multi-linear'):
+        rows = np.flatnonzero(k_type == curve_type)
+        if len(rows) == 0:
+            continue
+        S, Tb, Tc, Td = np.moveaxis(seismic_monte_carlo.SPECTRUM_TABLE[spectra_type[rows].astype(int), soil_type[rows].astype(int)], -1, 0)
+        capacity = seismic_analysis.CapacityCurve.from_k_type(curve_type, k1[rows].astype(float), k2[rows].astype(float), f1max[rows].astype(float))
+        nu = seismic_analysis.damping_correction(damping[rows].astype(float))
+        force[rows], displacement[rows], period[rows] = seismic_analysis.performance_points(
+            mass[rows].astype(float), ag[rows].astype(float), S, Tb, Tc, Td, nu, capacity
+        )
+
+    # JSON has no NaN, systems without a performance point are returned as null
+    as_list = lambda values: [None if math.isnan(value) else value for value in values.tolist()]
+
+    return [
+        {'force': f, 'displacement': x, 'period': T}
+        for f, x, T in zip(as_list(force), as_list(displacement), as_list(period))
+    ]
+
+def parse_beam_item(item: dict)-> dict:
+    '''
+    Returns the structured beam data of a beam request item: either {'Text': <contents of a
+    structured beam file>} or the structured beam data itself (see beams.get_structured_beam_data),
+    with the support locations as JSON object keys
+    '''
+    if 'Text' in item:
+        return beam_parser.parse_beam_text(item['Text'], '<request>').to_beam_data()
+    try:
+        beam_data = dict(item)
+        beam_data['Supports'] = {float(location): support for location, support in item['Supports'].items()}
+        beam_data['Loads'] = list(item.get('Loads', []))
+        for name in ('Name', 'L', 'E', 'Iz'):
+            if name not in beam_data:
+                raise ValueError(f"'{name}' is missing")
+    except (AttributeError, KeyError, TypeError) as err:
+        raise ValueError(f'invalid beam data ({type(err).__name__}: {err})') from None
+
+    return beam_data
+
+def analyze_beams(list_of_beam_data: list[dict])-> list[dict]:
+    '''
+    Returns the result summary of each beam (see beam_batch.analyze_beam_data)
+    '''
+    records = [analyze_beam_data('<request>', beam_data) for beam_data in list_of_beam_data]
+
+    return [{'Name': record['Name'], 'Results': record['Results'], 'Error': record['Error']} for record in records]
+
+class EngineeringService:
+    '''
+    The batchers of the column, beam and seismic endpoints
+
+    'workers' - Number of worker processes for the beam analyses. None uses one per CPU
+        and 1 analyzes the beams in the batcher thread
+    'max_batch_size', 'max_delay', 'max_pending' - See Batcher
+    '''
+    ENDPOINTS = {
+        '/columns': (parse_column_item, check_columns),
+        '/seismic': (parse_seismic_item, solve_performance_points),
+        '/beams': (parse_beam_item, analyze_beams),
+    }
+
+    def __init__(self, workers: int|None = None, max_batch_size: int = MAX_BATCH_SIZE, max_delay: float = MAX_DELAY, max_pending: int = MAX_PENDING):
+        self.workers = (os.cpu_count() or 1) if workers is None else workers
+        self.executor = None if self.workers == 1 else ProcessPoolExecutor(max_workers=self.workers)
+        self.batchers = {}
+        for path, (_, function) in self.ENDPOINTS.items():
+            if path == '/beams' and self.executor is not None:
+                function = self._analyze_beams_in_pool
+            self.batchers[path] = Batcher(function, max_batch_size, max_delay, max_pending)
+
+    def _analyze_beams_in_pool(self, list_of_beam_data: list[dict])-> list[dict]:
+        chunk_size = max(1, math.ceil(len(list_of_beam_data) / self.workers))
+        chunks = [list_of_beam_data[idx:idx + chunk_size] for idx in range(0, len(list_of_beam_data), chunk_size)]
+
+        return [result for results in self.executor.map(analyze_beams, chunks) for result in results]
+
+    def handle(self, path: str, items: list, timeout: float = REQUEST_TIMEOUT)-> list:
+        '''
+        Returns the results of the request 'items' of the endpoint 'path'. Raises KeyError for
+        an unknown endpoint, ValueError for invalid items and ServiceBusy when the endpoint is full.
+        '''
+        parse, _ = self.ENDPOINTS[path]
+        batcher = self.batchers[path]
+        start = time.perf_counter()
+        error = True
+        try:
+            if not isinstance(items, list):
+                raise ValueError("'items' must be a list")
+            parsed_items = []
+            for idx, item in enumerate(items):
+                if not isinstance(item, dict):
+                    raise ValueError(f'item {idx}: an item must be a JSON object')
+                try:
+                    parsed_items.append(parse(item))
+                except ValueError as err:
+                    raise ValueError(f'item {idx}: {err}') from None
+            results = batcher.submit(parsed_items).result(timeout) if parsed_items else []
+            error = False
+        finally:
+            batcher.metrics.record_request(len(items) if isinstance(items, list) else 0, time.perf_counter() - start, error)
+
+        return results
+
+    def metrics(self)-> dict:
+        '''
+        Returns the metrics of each endpoint (see EndpointMetrics.summary) and the pending items
+        '''
+        return {
+            path.strip('/'): batcher.metrics.summary() | {'pending': batcher.pending}
+            for path, batcher in self.batchers.items()
+        }
+
+    def close(self):
+        for batcher in self.batchers.values():
+            batcher.close()
+        if self.executor is not None:
+            self.executor.shutdown()
+
+class ServiceRequestHandler(BaseHTTPRequestHandler):
+    '''
+    JSON over HTTP interface of an EngineeringService. POST {"items": [...]} to an endpoint
+    returns {"results": [...]} in the same order. GET /metrics returns the metrics.
+    '''
+    service: EngineeringService = None
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self):
+        if self.path == '/metrics':
+            self._send(200, self.service.metrics())
+        elif self.path == '/health':
+            self._send(200, {'status': 'ok'})
+        else:
+            self._send(404, {'error': f'unknown endpoint {self.path}'})
+
+    def do_POST(self):
+        if self.path not in self.service.ENDPOINTS:
+            self._send(404, {'error': f'unknown endpoint {self.path}'})
+            return
+        try:
+            length = int(self.headers.get('Content-Length', 0))
+            body = json.loads(self.rfile.read(length) or b'{}')
+            if not isinstance(body, dict):
+                raise ValueError('the body must be a JSON object')
+            results = self.service.handle(self.path, body.get('items'))
+        except ServiceBusy as err:
+            self._send(503, {'error': f'the service is busy: {err}'}, {'Retry-After': '1'})
+        except ValueError as err:
+            self._send(400, {'error': str(err)})
+        except FutureTimeoutError:
+            self._send(504, {'error': 'the request timed out'})
+        except Exception as err:
+            self._send(500, {'error': f'{type(err).__name__}: {err}'})
+        else:
+            self._send(200, {'results': results})
+
+    def _send(self, status: int, payload: dict, headers: dict[str, str]|None = None):
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format: str, *args):
+        # The metrics replace the per-request log lines
+        pass
+
+def make_server(service: EngineeringService, host: str = DEFAULT_HOST, port: int = DEFAULT_PORT)-> ThreadingHTTPServer:
+    '''
+    Returns an HTTP server of 'service'. Port 0 picks a free port (see server.server_address).
+    '''
+    handler = type('Handler', (ServiceRequestHandler,), {'service': service})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+
+    return server
+
+def main(argv: list[str]|None = None)-> int:
+    parser = argparse.ArgumentParser(description='Serve the column, beam and seismic checks over HTTP with JSON.')
+    parser.add_argument('--host', default=DEFAULT_HOST, help='address to listen on')
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT, help='port to listen on')
+    parser.add_argument('--workers', type=int, default=None, help='worker processes for the beam analyses (default: one per CPU, 1 for none)')
+    parser.add_argument('--max-batch-size', type=int, default=MAX_BATCH_SIZE, help='largest number of items in a batch')
+    parser.add_argument('--max-delay', type=float, default=MAX_DELAY, help='seconds a batch waits for more requests')
+    parser.add_argument('--max-pending', type=int, default=MAX_PENDING, help='pending items per endpoint before answering 503')
+    args = parser.parse_args(argv)
+
+    service = EngineeringService(args.workers, args.max_batch_size, args.max_delay, args.max_pending)
+    server = make_server(service, args.host, args.port)
+    print(f'Serving on http://{server.server_address[0]}:{server.server_address[1]}', file=sys.stderr)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        service.close()
+
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
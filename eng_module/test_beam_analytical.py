@@ -0,0 +1,70 @@
+import numpy as np
+import pytest
+from eng_module import beam_analytical, beams
+
+def simple_beam_data(supports: dict, loads: list[dict], L: float = 6000.)-> dict:
+    return {
+        'Name': 'Beam', 'L': L, 'E': 200000., 'Iz': 1e8, 'Iy': 1e7, 'A': 5000., 'J': 1e6, 'nu': 0.3, 'rho': 1.,
+        'Supports': supports, 'Loads': loads
+    }
+
+def udl(w: float, case: str = 'D')-> dict:
+    return {'Type': 'Dist', 'Direction': 'Fy', 'Start Magnitude': w, 'End Magnitude': w, 'Start Location': 0., 'End Location': 6000., 'Case': case}
+
+def test_is_single_span():
+    point = {'Type': 'Point', 'Direction': 'Fy', 'Magnitude': -10., 'Location': 3000., 'Case': 'L'}
+
+    assert beam_analytical.is_single_span(simple_beam_data({0.: 'P', 6000.: 'F'}, [point]))
+    assert beam_analytical.is_single_span(simple_beam_data({6000.: 'R'}, [point]))
+    assert not beam_analytical.is_single_span(simple_beam_data({0.: 'P'}, [point]))
+    assert not beam_analytical.is_single_span(simple_beam_data({0.: 'F', 6000.: 'F'}, [point]))
+    assert not beam_analytical.is_single_span(simple_beam_data({0.: 'P', 3000.: 'F', 6000.: 'F'}, [point]))
+    assert not beam_analytical.is_single_span(simple_beam_data({0.: 'P', 6000.: 'F'}, [point | {'Direction': 'Fx'}]))
+
+def test_closed_form_values():
+    w, L, EI = -10., 6000., 200000. * 1e8
+    simple = beams.build_beam(simple_beam_data({0.: 'P', 6000.: 'F'}, [udl(w)]))
+    fixed = beams.build_beam(simple_beam_data({0.: 'R', 6000.: 'R'}, [udl(w)]))
+    simple.analyze_linear()
+    fixed.analyze_linear()
+
+    assert isinstance(simple, beam_analytical.AnalyticalBeamModel)
+    assert simple.Nodes['N0'].RxnFY['Combo 1'] == pytest.approx(-w * L / 2)
+    assert simple.Members['Beam'].min_moment('Mz') == pytest.approx(w * L ** 2 / 8)
+    assert simple.Members['Beam'].min_deflection('dy') == pytest.approx(5 * w * L ** 4 / (384 * EI))
+    assert fixed.Nodes['N0'].RxnMZ['Combo 1'] == pytest.approx(-w * L ** 2 / 12)
+    assert fixed.Members['Beam'].max_moment('Mz') == pytest.approx(-w * L ** 2 / 12)
+
+def test_matches_pynite():
+    beam_data = beams.get_structured_beam_data(beams.read_beam_file('test_data/beam_1_strc.txt'))
+    fe_model = beams.build_beam(beam_data, solver='fe')
+    analytical_model = beams.build_beam(beam_data, solver='analytical')
+    fe_model.analyze_linear()
+    analytical_model.analyze_linear()
+    fe_member = fe_model.Members[beam_data['Name']]
+    analytical_member = analytical_model.Members[beam_data['Name']]
+
+    for node in fe_model.Nodes:
+        assert analytical_model.Nodes[node].RxnFY['Combo 1'] == pytest.approx(fe_model.Nodes[node].RxnFY['Combo 1'])
+        assert analytical_model.Nodes[node].RxnMZ['Combo 1'] == pytest.approx(fe_model.Nodes[node].RxnMZ['Combo 1'])
+        assert analytical_model.Nodes[node].DY['Combo 1'] == pytest.approx(fe_model.Nodes[node].DY['Combo 1'], abs=1e-9)
+    for x in np.linspace(0., beam_data['L'], 13).tolist():
+        assert analytical_member.shear('Fy', x) == pytest.approx(fe_member.shear('Fy', x), abs=1e-6)
+        assert analytical_member.moment('Mz', x) == pytest.approx(fe_member.moment('Mz', x), abs=1e-3)
+        assert analytical_member.deflection('dy', x) == pytest.approx(fe_member.deflection('dy', x), abs=1e-9)
+    assert analytical_member.max_moment('Mz') == pytest.approx(fe_member.max_moment('Mz'))
+    assert analytical_member.min_moment('Mz') == pytest.approx(fe_member.min_moment('Mz'))
+    assert analytical_member.max_shear('Fy') == pytest.approx(fe_member.max_shear('Fy'))
+
+def test_single_span_beams_batch():
+    list_of_beam_data = [
+        simple_beam_data({0.: 'P', 6000.: 'F'}, [udl(-10.), udl(-5., 'L')]),
+        simple_beam_data({0.: 'R'}, [udl(-10.)]),
+    ]
+    batch = beam_analytical.SingleSpanBeams.from_beam_data(list_of_beam_data, ['D', 'L']).solve()
+    diagrams = batch.diagrams(n_stations=11)
+
+    assert diagrams['Moment'].shape == (2, 2, 11)
+    assert batch.reactions[0, :, 0].tolist() == pytest.approx([30000., 15000.])
+    assert batch.reactions[1, :, 0].tolist() == pytest.approx([60000., 0.])
+    assert diagrams['Moment'][1, 0, 0] == pytest.approx(-10. * 6000. ** 2 / 2)
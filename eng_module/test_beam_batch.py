@@ -0,0 +1,24 @@
+import pytest
+from eng_module import beam_batch
+
+def test_find_beam_files():
+    beam_files = beam_batch.find_beam_files(['test_data'])
+
+    assert [file_name[-15:] for file_name in beam_files] == ['beam_1_strc.txt', 'beam_2_strc.txt']
+
+def test_run_beam_batch():
+    records = beam_batch.run_beam_batch(['test_data', 'test_data/beam_1.txt'], max_workers=2)
+    girder = records[1]['Results']['Combo 1']
+
+    assert [record['Error'] is None for record in records] == [True, True, False]
+    assert records[1]['Name'] == 'Girder'
+    assert sum(reaction['Fy'] for reaction in girder['Reactions']) == pytest.approx(-(3.6 * 20e3 + 3 * 145e3))
+    assert girder['Min Moment'] == pytest.approx(-674649610.7266434)
+
+def test_run_beam_batch_cache(tmp_path):
+    cache_dir = str(tmp_path / 'cache')
+    records = beam_batch.run_beam_batch(['test_data'], max_workers=1)
+    cached_records = beam_batch.run_beam_batch(['test_data'], max_workers=1, cache_dir=cache_dir)
+
+    assert cached_records == records
+    assert beam_batch.run_beam_batch(['test_data'], max_workers=1, cache_dir=cache_dir) == records
@@ -0,0 +1,33 @@
+import pytest
+from eng_module import beam_parser, beams
+
+def test_parse_beam_file():
+    parsed_beam = beam_parser.parse_beam_file('test_data/beam_1_strc.txt')
+
+    assert parsed_beam.name == 'Balcony transfer'
+    assert parsed_beam.supports['location'].tolist() == [1000., 3800.]
+    assert parsed_beam.loads['type'].tolist() == ['Point', 'Dist']
+    assert parsed_beam.loads['case'].tolist() == ['Live', 'Dead']
+    for file_name in ('test_data/beam_1_strc.txt', 'test_data/beam_2_strc.txt'):
+        assert beam_parser.load_beam_data(file_name) == beams.get_structured_beam_data(beams.read_beam_file(file_name))
+
+def test_parse_beam_text_errors():
+    with pytest.raises(ValueError, match='line 2'):
+        beam_parser.parse_beam_text('Beam\n4800,x\n0:P,4800:F')
+    with pytest.raises(ValueError, match='line 4: unknown load type'):
+        beam_parser.parse_beam_text('Beam\n4800\n0:P,4800:F\nMOMENT:Mz,10,0,case:D')
+
+def test_beam_file_cache(tmp_path):
+    beam_file = tmp_path / 'beam_1_strc.txt'
+    beam_file.write_text('Beam\n4800,200000,4e8\n0:P,4800:F\nPOINT:Fy,-10,2400,case:Live\n')
+    cache_dir = str(tmp_path / 'cache')
+    with beam_parser.BeamFileCache(cache_dir) as cache:
+        first = cache.load(str(beam_file)).to_beam_data()
+
+    cache = beam_parser.BeamFileCache(cache_dir)
+    assert cache.load(str(beam_file)).to_beam_data() == first
+    assert (cache.hits, cache.misses) == (1, 0)
+
+    beam_file.write_text('Beam\n4800,200000,4e8\n0:P,4800:F\nPOINT:Fy,-20,2400,case:Live\n')
+    assert cache.load(str(beam_file)).to_beam_data()['Loads'][0]['Magnitude'] == -20.
+    assert (cache.hits, cache.misses) == (1, 1)
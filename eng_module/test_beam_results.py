@@ -0,0 +1,49 @@
+import numpy as np
+import pytest
+from eng_module import beam_batch, beam_results, beams
+
+def read_beam_data(file_name: str)-> dict:
+    return beams.get_structured_beam_data(beams.read_beam_file(file_name))
+
+def test_extract_results():
+    beam_data = read_beam_data('test_data/beam_1_strc.txt')
+    load_combos = {'ULS': {'Dead': 1.35, 'Live': 1.5}, 'SLS': {'Dead': 1.0, 'Live': 1.0}}
+    analytical_model = beams.build_beam(beam_data, solver='analytical', load_combos=load_combos)
+    fe_model = beams.build_beam(beam_data, solver='fe', load_combos=load_combos)
+    analytical_model.analyze_linear()
+    fe_model.analyze_linear()
+    analytical, fe = (beam_results.extract_results(beam_model, beam_data['Name'], 11) for beam_model in (analytical_model, fe_model))
+    member = analytical_model.Members[beam_data['Name']]
+
+    assert analytical.moment.shape == (1, 2, 11)
+    assert analytical.moment[0, 1, 4] == pytest.approx(member.moment('Mz', analytical.x[0, 4], 'SLS'))
+    assert analytical.shear[0, 0, -1] == pytest.approx(member.shear('Fy', beam_data['L'], 'ULS'))
+    assert analytical.reaction_FY == pytest.approx(fe.reaction_FY)
+    for name in ('shear', 'moment', 'deflection'):
+        values, reference = getattr(analytical, name), getattr(fe, name)
+        assert values == pytest.approx(reference, abs=1e-6 * np.abs(reference).max())
+
+def test_save_and_load(tmp_path):
+    list_of_beam_data = [read_beam_data(f'test_data/beam_{idx}_strc.txt') for idx in (1, 2)]
+    results = beam_results.analyze_beams(list_of_beam_data, n_stations=21)
+    directory = str(tmp_path / 'results')
+    results.save(directory)
+    loaded = beam_results.BeamResults.load(directory)
+
+    assert loaded.beams == [beam_data['Name'] for beam_data in list_of_beam_data]
+    assert loaded.combos == ['Combo 1']
+    assert isinstance(loaded.moment, np.memmap)
+    assert loaded.reaction_beam.tolist() == [0, 0, 1, 1]
+    for name in beam_results.ARRAY_NAMES:
+        assert np.array_equal(getattr(loaded, name), getattr(results, name))
+    assert loaded.extremes()['Min Moment'][loaded.index('Girder'), 0] == pytest.approx(loaded.moment[1, 0].min())
+
+def test_beam_batch_results_dir(tmp_path):
+    directory = str(tmp_path / 'results')
+    beam_batch.main(['test_data', '--workers', '1', '--output', str(tmp_path / 'records.json'), '--results-dir', directory, '--stations', '5'])
+    loaded = beam_results.BeamResults.load(directory, mmap_mode=None)
+
+    assert loaded.x.shape == (2, 5)
+    assert loaded.nbytes == sum(getattr(loaded, name).nbytes for name in beam_results.ARRAY_NAMES)
+    with pytest.raises(ValueError):
+        beam_results.BeamResults.concatenate([loaded, loaded.__class__(**{**loaded.__dict__, 'combos': ['ULS']})])
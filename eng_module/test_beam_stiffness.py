@@ -0,0 +1,90 @@
+import numpy as np
+import pytest
+from eng_module import beam_analytical, beam_stiffness, beams
+from test_beam_analytical import simple_beam_data, udl
+
+def two_span_beam_data(loads: list[dict])-> dict:
+    return simple_beam_data({0.: 'P', 6000.: 'F', 12000.: 'F'}, loads, L=12000.)
+
+def test_two_span_closed_form_values():
+    w, L = -10., 6000.
+    loads = [udl(w) | {'End Location': 2 * L}]
+    beam_model = beams.build_beam(two_span_beam_data(loads))
+    beam_model.analyze_linear()
+
+    assert isinstance(beam_model, beam_stiffness.StiffnessBeamModel)
+    assert [node.RxnFY['Combo 1'] for node in beam_model.Nodes.values()] == pytest.approx([-3 * w * L / 8, -10 * w * L / 8, -3 * w * L / 8])
+    assert beam_model.Members['Beam'].max_moment('Mz') == pytest.approx(-w * L ** 2 / 8)
+    assert beam_model.Members['Beam'].moment('Mz', L) == pytest.approx(-w * L ** 2 / 8)
+
+def test_matches_analytical():
+    beam_data = beams.get_structured_beam_data(beams.read_beam_file('test_data/beam_1_strc.txt'))
+    load_combos = {'ULS': {'Dead': 1.35, 'Live': 1.5}, 'SLS': {'Dead': 1.0, 'Live': 1.0}}
+    stiffness_model = beams.build_beam(beam_data, solver='stiffness', load_combos=load_combos)
+    analytical_model = beams.build_beam(beam_data, solver='analytical', load_combos=load_combos)
+    stiffness_model.analyze_linear()
+    analytical_model.analyze_linear()
+    x = np.linspace(0., beam_data['L'], 23)
+
+    assert stiffness_model.cases == ['Live', 'Dead']
+    for key in ('RxnFY', 'RxnMZ'):
+        assert stiffness_model.case_results[key] == pytest.approx(analytical_model.case_results[key])
+        assert stiffness_model.combo_results[key] == pytest.approx(analytical_model.combo_results[key])
+    for name in ('Dead', 'Live', 'ULS', 'SLS'):
+        for level in range(4):
+            reference = analytical_model.diagram(x, level, name)
+            assert stiffness_model.diagram(x, level, name) == pytest.approx(reference, abs=1e-9 * np.abs(reference).max())
+
+def test_load_cases_and_combos():
+    loads = [udl(-10.) | {'End Location': 12000.}, {'Type': 'Point', 'Direction': 'Fy', 'Magnitude': -5000., 'Location': 9000., 'Case': 'L'}]
+    load_combos = {'ULS': {'D': 1.35, 'L': 1.5}, 'D only': {'D': 1.0}}
+    fe_model = beams.build_beam(two_span_beam_data(loads), solver='fe', load_combos=load_combos)
+    stiffness_model = beams.build_beam(two_span_beam_data(loads), load_combos=load_combos)
+    fe_model.analyze_linear()
+    stiffness_model.analyze_linear()
+
+    assert list(fe_model.LoadCombos) == ['ULS', 'D only']
+    assert stiffness_model.combo_results['RxnFY'] == pytest.approx(np.array([[1.35, 1.5], [1., 0.]]) @ stiffness_model.case_results['RxnFY'])
+    for name, node in stiffness_model.Nodes.items():
+        for combo in load_combos:
+            assert node.RxnFY[combo] == pytest.approx(fe_model.Nodes[name].RxnFY[combo])
+            assert node.DY[combo] == pytest.approx(fe_model.Nodes[name].DY[combo], abs=1e-9)
+    x = np.linspace(0., 12000., 25)
+    assert stiffness_model.diagram(x, 1, 'ULS') == pytest.approx(1.35 * stiffness_model.diagram(x, 1, 'D') + 1.5 * stiffness_model.diagram(x, 1, 'L'))
+    with pytest.raises(KeyError):
+        stiffness_model.diagram(np.array([0.]), 0, 'W')
+
+def test_many_supports():
+    rng = np.random.default_rng(0)
+    n_spans, span = 400, 5000.
+    L = n_spans * span
+    locations = list(rng.permutation(np.arange(n_spans + 1) * span)) + [span]
+    supports = {float(x): 'R' if idx % 5 == 0 else 'F' for idx, x in enumerate(locations)}
+    loads = [udl(-10.) | {'End Location': L}]
+    loads += [{'Type': 'Point', 'Direction': 'Fy', 'Magnitude': -5000., 'Location': float(x), 'Case': 'L'} for x in rng.uniform(0., L, 300)]
+    loads += [{'Type': 'Point', 'Direction': 'Fy', 'Magnitude': -2000., 'Location': 7. * span, 'Case': 'L'}]
+    loads += [
+        {'Type': 'Dist', 'Direction': 'Fy', 'Start Magnitude': -2., 'End Magnitude': -6., 'Start Location': float(x), 'End Location': float(x) + 2.5 * span, 'Case': 'W'}
+        for x in rng.uniform(0., L - 2.5 * span, 50)
+    ]
+    node_locations = beams.get_node_locations(L, list(supports))
+    beam_model = beams.build_beam(simple_beam_data(supports, loads, L))
+    beam_model.analyze_linear()
+
+    assert len(node_locations) == n_spans + 1 and list(node_locations)[-1] == f'N{n_spans}'
+    assert isinstance(beam_model, beam_stiffness.StiffnessBeamModel)
+    total_load = -10. * L - 5000. * 300 - 2000. - 4. * 2.5 * span * 50
+    assert beam_model.case_results['RxnFY'].sum() == pytest.approx(-total_load)
+    # The element by element diagrams match the singularity functions over all the supports and loads
+    x = np.concatenate([rng.uniform(0., L, 500), np.arange(0., L + 1., span)])
+    for level in (0, 1):
+        for inclusive in (True, False):
+            values = beam_model.beams.diagram(x[None, :], level, inclusive)
+            reference = beam_analytical.SingleSpanBeams.diagram(beam_model.beams, x[None, :], level, inclusive)
+            assert values == pytest.approx(reference, abs=1e-7 * np.abs(reference).max())
+    # The nodal displacements are exact, so a model with a node at each location is a reference for the
+    # rotations and deflections (the singularity functions lose digits to cancellation along the beam)
+    fine_model = beam_stiffness.StiffnessBeamModel(simple_beam_data(supports, loads, L), {f'N{idx}': location for idx, location in enumerate(x)})
+    fine_model.analyze_linear()
+    assert beam_model.diagram(x, 2, 'Combo 1') == pytest.approx(fine_model.combo_results['RZ'][0], abs=1e-10)
+    assert beam_model.diagram(x, 3, 'Combo 1') == pytest.approx(fine_model.combo_results['DY'][0], abs=1e-7)
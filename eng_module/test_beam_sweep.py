@@ -0,0 +1,63 @@
+import copy
+import pytest
+from eng_module import beam_batch, beam_parser, beam_sweep, beams
+import numpy as np
+
+def scaled_beam_data(beam_data: dict, point: dict[str, float])-> dict:
+    beam_data = copy.deepcopy(beam_data)
+    scale = point.get('L', beam_data['L']) / beam_data['L']
+    supports = sorted(beam_data['Supports'].items())
+    beam_data['Supports'] = {point.get(f'Support {idx + 1}', x * scale): support for idx, (x, support) in enumerate(supports)}
+    for kdx, load in enumerate(beam_data['Loads']):
+        for name in ('Location', 'Start Location', 'End Location'):
+            if name in load:
+                load[name] *= scale
+        for name in ('Magnitude', 'Start Magnitude', 'End Magnitude'):
+            if name in load:
+                load[name] *= point.get(f'Load {kdx + 1}', 1.)
+    for name in ('L', 'E', 'Iz'):
+        beam_data[name] = point.get(name, beam_data[name])
+
+    return beam_data
+
+def test_sweep_matches_single_beams():
+    beam_data = beam_parser.load_beam_data('test_data/beam_1_strc.txt')
+    load_combos = {'ULS': {'Dead': 1.35, 'Live': 1.5}, 'SLS': {'Dead': 1.0, 'Live': 1.0}}
+    axes = {'L': [4000., 5600.], 'Support 2': [3000., 3800.], 'Iz': [1e9, 2e9], 'Load 1': [0.5, 1.]}
+    results = beam_sweep.sweep_grid(beam_data, axes, load_combos=load_combos, chunk_size=5)
+
+    assert results.shape == (2, 2, 2, 2)
+    for index in [(0, 0, 0, 0), (1, 0, 1, 1), (1, 1, 0, 1)]:
+        point = {name: results[index][name] for name in axes}
+        beam_model = beams.build_beam(scaled_beam_data(beam_data, point), 'stiffness', load_combos)
+        beam_model.analyze_linear()
+        expected = beam_batch.extract_beam_results(beam_model, beam_data['Name'])
+        for field in beam_sweep.RESULT_FIELDS:
+            envelope = [expected[combo][field] for combo in load_combos]
+            value = max(envelope) if field.startswith('Max') else min(envelope)
+            assert results[index][field] == pytest.approx(value, rel=1e-3)
+
+def test_latin_hypercube_and_pruning():
+    beam_data = beam_parser.load_beam_data('test_data/beam_1_strc.txt')
+    samples = beam_sweep.latin_hypercube({'L': (3000., 6000.), 'Iz': (2e8, 2e9), 'Support 1': (0., 2000.)}, 200, seed=1)
+    unlimited = beam_sweep.run_sweep(beam_data, samples)
+    results = beam_sweep.run_sweep(beam_data, samples, max_moment=1.5e7, deflection_ratio=250.)
+    moment = np.maximum(unlimited['Max Moment'], -unlimited['Min Moment'])
+    deflection = np.maximum(unlimited['Max Deflection'], -unlimited['Min Deflection'])
+
+    assert np.array_equal(np.sort(np.floor(samples['L'] / 15.)), np.arange(200, 400))
+    assert unlimited['Passed'].all()
+    assert np.array_equal(results['Passed'], (moment <= 1.5e7) & (deflection <= samples['L'] / 250.))
+    assert np.isnan(results['Max Deflection'][moment > 1.5e7]).all()
+    assert 0 < results['Passed'].sum() < 200
+
+def test_invalid_points():
+    beam_data = beam_parser.load_beam_data('test_data/beam_1_strc.txt')
+    results = beam_sweep.run_sweep(beam_data, {'Support 2': np.array([3000., 5000., 1000.])})
+
+    assert results['Passed'].tolist() == [True, False, False]
+    assert np.isnan(results['Max Moment'][1:]).all()
+    with pytest.raises(ValueError):
+        beam_sweep.run_sweep(beam_data, {'Support 3': np.array([1.])})
+    with pytest.raises(ValueError):
+        beam_sweep.run_sweep(beam_data, {'A': np.array([1.])})
@@ -1,4 +1,5 @@
-import beams, pytest
+import pytest
+from eng_module import beams
 
 def test_calc_shear_modulus():
     test_value1 = beams.calc_shear_modulus(0.2,35)
@@ -64,3 +65,17 @@ def test_get_spans():
     assert beams.get_spans(15., 10.) == (10.0, 5.0)
     assert beams.get_spans(10, 7) == (7, 3)
 
+
+def test_parse_helpers():
+    str_data = beams.convert_to_numeric([['4800', '24500'], ['POINT:Fy', '-10', '2400', 'case:Live'], ['DIST:Fy', '3', '3', '0', '4800', 'case:Dead']])
+
+    assert beams.parse_beam_attributes(str_data[0]) == {'L': 4800., 'E': 24500., 'Iz': 1., 'Iy': 1., 'A': 1., 'J': 1., 'nu': 1., 'rho': 1.}
+    assert beams.parse_supports(['0:P', '4800:R']) == {0.: 'P', 4800.: 'R'}
+    assert beams.parse_loads(str_data[1:]) == [
+        {'Type': 'Point', 'Direction': 'Fy', 'Magnitude': -10., 'Location': 2400., 'Case': 'Live'},
+        {'Type': 'Dist', 'Direction': 'Fy', 'Start Magnitude': 3., 'End Magnitude': 3., 'Start Location': 0., 'End Location': 4800., 'Case': 'Dead'},
+    ]
+    with pytest.raises(ValueError, match="magnitude 'x' is not a number"):
+        beams.parse_loads([['POINT:Fy', 'x', '2400', 'case:Live']])
+    with pytest.raises(ValueError, match="support 'Q'"):
+        beams.parse_supports(['0:Q'])
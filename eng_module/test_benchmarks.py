@@ -0,0 +1,44 @@
+import numpy as np
+from eng_module import beams, benchmarks, utils
+
+def test_beam_file_text():
+    beam_data = benchmarks.random_beam_data(np.random.default_rng(1), 'Test beam')
+    lines = [line.split(',') for line in benchmarks.beam_file_text(beam_data).split('\n')]
+
+    assert beams.get_structured_beam_data(lines) == beam_data
+
+def test_write_column_csv(tmp_path):
+    filename = str(tmp_path / 'columns.csv')
+    benchmarks.write_column_csv(filename, 25, chunk_size=10)
+    file_data = utils.read_csv_file(filename)
+
+    assert file_data[0] == benchmarks.COLUMN_HEADER
+    assert [record[0] for record in file_data[1:]] == [f'C{idx}' for idx in range(1, 26)]
+
+def test_run_benchmarks():
+    results = benchmarks.run_benchmarks(['column_check', 'performance_points'], [50, 100], repeat=1)
+
+    assert [(result.name, result.size) for result in results] == [
+        ('column_check', 50), ('column_check', 100), ('performance_points', 50), ('performance_points', 100)
+    ]
+    assert all(result.seconds > 0. and result.peak_memory > 0 for result in results)
+    assert set(benchmarks.scaling_exponents(results)) == {'column_check', 'performance_points'}
+
+def test_compare_to_baseline(tmp_path):
+    baseline = [benchmarks.BenchmarkResult('column_check', 100, 1.0, 100., 1000)]
+    filename = str(tmp_path / 'baseline.json')
+    benchmarks.save_baseline(baseline, filename)
+    results = [
+        benchmarks.BenchmarkResult('column_check', 100, 1.2, 83., 2000),
+        benchmarks.BenchmarkResult('column_check', 1000, 9.0, 111., 1000),
+    ]
+
+    assert benchmarks.load_baseline(filename) == baseline
+    assert len(benchmarks.compare_to_baseline(results, baseline, tolerance=0.25)) == 1
+    assert len(benchmarks.compare_to_baseline(results, baseline, tolerance=0.1)) == 2
+
+def test_run_checks():
+    checks = benchmarks.run_checks(size=20)
+
+    assert [check.name for check in checks] == ['columns', 'section_catalog', 'spectrum', 'performance_points', 'beams', 'beam_stiffness']
+    assert all(check.passed for check in checks)
@@ -0,0 +1,76 @@
+import numpy as np
+import pytest
+from eng_module import columns, utils
+
+def test_reduction_factor():
+    lmda = np.array([0.1, 0.5, 1.0, 2.0])
+
+    assert columns.qsi(0.1, 'b') == pytest.approx(1.0)
+    assert columns.qsi(1.0, 'c') == pytest.approx(0.5399, rel=1e-3)
+    assert columns.reduction_factor(lmda, 0.34).tolist() == [columns.qsi(l, 'b') for l in lmda.tolist()]
+
+def test_imperfection_factors():
+    assert columns.imperfection_factors(np.array(['a0', 'B', 'd'])).tolist() == [0.13, 0.34, 0.76]
+
+    with pytest.raises(ValueError):
+        columns.imperfection_factors(np.array(['b', 'e']))
+
+def test_steelcolumnarray_matches_steelcolumn():
+    steelcolumns = [
+        columns.SteelColumn(h=4000, E=210000, A=7808, Ix=56.96e6, Iy=20.03e6, kx=1.0, ky=1.0, fy=355),
+        columns.SteelColumn(h=6000, E=210000, A=14910, Ix=251.7e6, Iy=85.63e6, kx=1.0, ky=0.7, fy=355, gamma_m1=1.1),
+    ]
+    column_array = columns.SteelColumnArray.from_steelcolumns(steelcolumns)
+    column_array.buckling_curve = np.array(['a', 'c'])
+
+    assert column_array.factored_compressive_resistance().tolist() == pytest.approx([
+        steelcolumns[0].factored_compressive_resistance('a'),
+        steelcolumns[1].factored_compressive_resistance('c'),
+    ])
+    assert column_array.factored_crushing_load().tolist() == pytest.approx([sc.factored_crushing_load() for sc in steelcolumns])
+
+def test_run_all_columns_array():
+    column_array = columns.run_all_columns_array('test_data/columns_1.csv')
+    # The scalar SteelColumn path, one record at a time
+    expected = []
+    for record in utils.read_csv_file('test_data/columns_1.csv')[1:]:
+        A, h, Ix, Iy, fy, E, kx, ky = (float(value) for value in record[1:9])
+        steelcolumn = columns.SteelColumn(h=h, E=E, A=A, Ix=Ix, Iy=Iy, kx=kx, ky=ky, fy=fy)
+        capacity = min(steelcolumn.factored_compressive_resistance(), steelcolumn.factored_crushing_load())
+        expected.append(columns.calculate_factored_csv_load(record) / capacity)
+
+    assert len(column_array) == 5
+    assert column_array.factored_load[0] == pytest.approx(1.35 * 450000 + 1.5 * 350000)
+    assert column_array.demand_capacity_ratio.tolist() == pytest.approx(expected)
+    assert [sc.demand_capacity_ratio for sc in columns.run_all_columns('test_data/columns_1.csv')] == pytest.approx(expected)
+
+def test_stream_all_columns(tmp_path):
+    output_filename = tmp_path / 'results.csv'
+    summary = columns.stream_all_columns('test_data/columns_1.csv', output_filename, chunk_size=2)
+
+    assert summary.count == 5
+    assert summary.failures == 3
+    assert summary.worst_column == 'C4'
+    assert summary.max_demand_capacity_ratio == pytest.approx(2.620111)
+    assert len(output_filename.read_text().splitlines()) == 6
+
+def test_column_record_errors():
+    records = utils.read_csv_file('test_data/columns_1.csv')[1:]
+    records[2][3] = 'abc'
+    with pytest.raises(ValueError, match="line 4: Ix 'abc' is not a number"):
+        columns.check_csv_records(records)
+    with pytest.raises(ValueError, match="Ix 'abc'"):
+        columns.csv_record_to_steelcolumn(records[2])
+
+def test_column_csv_lines(tmp_path):
+    lines = open('test_data/columns_1.csv').read().splitlines()
+    filename = tmp_path / 'columns.csv'
+    filename.write_text('\n'.join(lines[:2] + [''] + lines[2:]) + '\n')
+
+    assert [column.demand_capacity_ratio for column in columns.run_all_columns(str(filename))] == pytest.approx(
+        [column.demand_capacity_ratio for column in columns.run_all_columns('test_data/columns_1.csv')]
+    )
+    lines[2] = lines[2].replace(',355,', ',x,')
+    filename.write_text('\n'.join(lines[:2] + [''] + lines[2:]) + '\n')
+    with pytest.raises(ValueError, match="line 4: fy 'x' is not a number"):
+        list(columns.iter_column_checks(str(filename), chunk_size=2))
@@ -0,0 +1,22 @@
+import os, subprocess, sys
+
+HEAVY_MODULES = ('PyNite', 'vtk', 'plotly', 'streamlit', 'scipy')
+
+MODULE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+def imported_heavy_modules(code: str)-> list[str]:
+    '''
+    Returns the heavy modules loaded after running 'code' in a new interpreter
+    '''
+    env = os.environ | {'PYTHONPATH': os.pathsep.join([os.path.dirname(MODULE_DIR), MODULE_DIR])}
+    code += f'\nimport sys\nprint(sorted({{name.split(".")[0] for name in sys.modules}} & set({HEAVY_MODULES!r})))'
+    output = subprocess.run([sys.executable, '-c', code], env=env, capture_output=True, text=True, check=True).stdout
+
+    return eval(output.strip().splitlines()[-1])
+
+def test_light_modules():
+    assert imported_heavy_modules('from eng_module import columns, load_factors, seismic_analysis, seismic_hazard_map, seismic_monte_carlo, section_catalog') == []
+
+def test_beam_modules_load_pynite_on_first_use():
+    assert imported_heavy_modules('import beams, beam_batch, beam_results, reports, service') == []
+    assert imported_heavy_modules("import beams\nbeams.build_beam(beams.get_structured_beam_data(beams.read_beam_file('test_data/beam_1_strc.txt')), 'fe')") == ['PyNite']
@@ -0,0 +1,55 @@
+import json, pstats
+import pytest
+from eng_module import beam_batch, columns, instrumentation
+
+@pytest.fixture
+def enabled():
+    instrumentation.reset()
+    instrumentation.enable()
+    yield instrumentation
+    instrumentation.disable()
+    instrumentation.reset()
+
+def test_disabled_records_nothing():
+    instrumentation.reset()
+    with instrumentation.stage('test.stage'):
+        instrumentation.count('test.counter')
+
+    assert instrumentation.report()['stages'] == {}
+    assert instrumentation.report()['counters'] == {}
+
+def test_stages(enabled):
+    with instrumentation.stage('outer'):
+        for _ in range(3):
+            with instrumentation.stage('inner', items=10):
+                pass
+    instrumentation.count('things', 2)
+    stages = instrumentation.report()['stages']
+
+    assert stages['outer']['count'] == 1
+    assert stages['inner']['count'] == 3 and stages['inner']['items'] == 30
+    assert sum(stages['inner']['histogram']) == 3
+    assert stages['outer']['self_seconds'] == pytest.approx(stages['outer']['seconds'] - stages['inner']['seconds'])
+    assert set(instrumentation.INSTRUMENTATION.folded) == {'outer', 'outer;inner'}
+    assert instrumentation.report()['counters'] == {'things': 2}
+
+def test_module_stages(enabled):
+    columns.run_all_columns_array('test_data/columns_1.csv')
+    beam_batch.analyze_beam_file('test_data/beam_1_strc.txt')
+
+    assert {'csv.read', 'column.convert', 'column.capacity', 'beam.read', 'beam.parse', 'beam.build', 'beam.solve', 'beam.extract'} <= set(instrumentation.report()['stages'])
+
+def test_beam_batch_exports(tmp_path):
+    instrumentation.reset()
+    filename = str(tmp_path / 'stages.json')
+    beam_batch.main(['test_data', '--workers', '1', '--output', str(tmp_path / 'records.json'), '--instrumentation', filename, '--profile', str(tmp_path / 'batch.prof')])
+    instrumentation.disable()
+    instrumentation.reset()
+    with open(filename) as json_file:
+        report = json.load(json_file)
+    with open(tmp_path / 'stages.folded') as folded_file:
+        folded = folded_file.read().split('\n')
+
+    assert report['stages']['beam.solve']['count'] == 2
+    assert any(line.startswith('beam.build ') for line in folded)
+    assert pstats.Stats(str(tmp_path / 'batch.prof')).total_calls > 0
@@ -0,0 +1,50 @@
+import numpy as np
+import pytest
+from eng_module import load_factors
+
+def test_factor_load():
+    assert load_factors.factor_load(D_factor=1.35, D=10., L_factor=1.5, L=4.) == pytest.approx(19.5)
+
+def test_load_combinations_from_dict():
+    combinations = load_factors.LoadCombinations.from_dict(load_factors.EC_COMBINATIONS)
+
+    assert combinations.cases == ['D', 'L']
+    assert combinations.factors.tolist() == [[1.35, 1.5], [1.0, 1.5], [1.35, 0.]]
+    assert combinations.to_dict()['ULS_03'] == {'D': 1.35}
+
+def test_envelope():
+    combinations = load_factors.EC_LOAD_COMBINATIONS
+    effects = np.array([[10., 4.], [10., -4.]])
+    envelope = combinations.envelope(effects)
+
+    assert envelope['Max'].tolist() == pytest.approx([19.5, 13.5])
+    assert envelope['Max Combo'].tolist() == [0, 2]
+    assert envelope['Min'].tolist() == pytest.approx([13.5, 4.])
+    assert envelope['Min Combo'].tolist() == [2, 1]
+
+def test_prune_dominated():
+    combinations = load_factors.EC_LOAD_COMBINATIONS
+    signs = load_factors.case_signs(np.array([[10., 4.], [3., 0.]]))
+
+    assert signs.tolist() == [1, 1]
+    assert combinations.prune_dominated(signs, 'max').names == ['ULS_01']
+    assert combinations.prune_dominated(signs, 'min').names == ['ULS_02', 'ULS_03']
+    assert combinations.prune_dominated(np.array([1, 0])).names == ['ULS_01', 'ULS_02', 'ULS_03']
+
+def test_generate_ec_combinations():
+    combinations = load_factors.generate_ec_combinations({'D': 'G', 'L': 'Q', 'W': 'Q'}, psi_0={'L': 0.7, 'W': 0.6})
+    has_row = lambda row: np.any(np.all(np.isclose(combinations.factors, row), axis=1))
+
+    assert len(combinations) == 10
+    assert has_row([1.35, 1.5, 0.9])
+    assert has_row([1.0, 1.05, 1.5])
+    assert has_row([1.35, 0., 0.])
+
+def test_generate_arema_combinations():
+    combinations = load_factors.generate_arema_combinations({'D': 'D', 'L': 'L', 'W': 'W'})
+
+    assert combinations.names == ['SLD_G1', 'SLD_G2', 'SLD_G3', 'LFD_G1', 'LFD_G2']
+    assert combinations.factors[3].tolist() == pytest.approx([1.4, 1.4 * 5 / 3, 0.])
+
+    with pytest.raises(ValueError):
+        load_factors.generate_arema_combinations({'S': 'Snow'})
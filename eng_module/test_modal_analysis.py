@@ -0,0 +1,59 @@
+from math import pi, sqrt
+import numpy as np
+import pytest
+from eng_module import modal_analysis, seismic_analysis
+
+SPECTRUM = seismic_analysis.Ec_response_spectrum(2.5, soil_type='B')
+
+def test_single_storey():
+    buildings = modal_analysis.ShearBuildings([[100.], [400.]], [[40000.], [40000.]], height=3.)
+    response = modal_analysis.response_spectrum_analysis(buildings, SPECTRUM)
+    T = 2 * pi * np.sqrt(np.array([100., 400.]) / 40000.)
+    Sa = SPECTRUM.acceleration(T)
+
+    assert buildings.modes().periods[:, 0] == pytest.approx(T)
+    assert response.base_shear == pytest.approx(np.array([100., 400.]) * Sa)
+    assert response.displacements[:, 0] == pytest.approx(Sa * (T / (2 * pi)) ** 2)
+    assert response.drift_ratios[:, 0] == pytest.approx(response.drifts[:, 0] / 3.)
+
+def test_two_storey_modes():
+    # Equal masses m and storey stiffnesses k: w^2 = (3 -+ sqrt(5)) / 2 k / m
+    m, k = 50., 20000.
+    modes = modal_analysis.ShearBuildings([[m, m]], [[k, k]]).modes()
+    omega_squared = (3 - sqrt(5)) / 2 * k / m, (3 + sqrt(5)) / 2 * k / m
+
+    assert modes.circular_frequencies[0] ** 2 == pytest.approx(omega_squared)
+    assert modes.shapes[0, 0, 1] / modes.shapes[0, 0, 0] == pytest.approx((1 + sqrt(5)) / 2)
+    assert np.einsum('ms,s,ns->mn', modes.shapes[0], [m, m], modes.shapes[0]) == pytest.approx(np.eye(2))
+    assert modes.effective_mass_ratios()[0, -1] == pytest.approx(1.)
+    assert modes.modes_for_mass_ratio(0.9)[0] == 1
+
+def test_batch_matches_single_buildings():
+    rng = np.random.default_rng(3)
+    mass = rng.uniform(20., 80., (6, 4))
+    stiffness = rng.uniform(5e4, 2e5, (6, 4))
+    batched = modal_analysis.response_spectrum_analysis(modal_analysis.ShearBuildings(mass, stiffness), SPECTRUM)
+    srss = modal_analysis.response_spectrum_analysis(modal_analysis.ShearBuildings(mass, stiffness), SPECTRUM, combination='SRSS')
+
+    for index in range(len(mass)):
+        single = modal_analysis.response_spectrum_analysis(modal_analysis.ShearBuildings(mass[index], stiffness[index]), SPECTRUM)
+        assert single.storey_shears[0] == pytest.approx(batched.storey_shears[index])
+        assert single.drifts[0] == pytest.approx(batched.drifts[index])
+    # Well separated modes are nearly uncorrelated, so CQC is close to SRSS
+    assert batched.base_shear == pytest.approx(srss.base_shear, rel=0.05)
+    assert np.all(srss.base_shear <= np.abs(srss.spectral_accelerations * mass.sum(axis=1)[:, None]).sum(axis=1))
+
+def test_invalid_input():
+    with pytest.raises(ValueError):
+        modal_analysis.ShearBuildings([[10., 10.]], [[1000.]])
+    with pytest.raises(ValueError):
+        modal_analysis.response_spectrum_analysis(modal_analysis.ShearBuildings([[10.]], [[1000.]]), SPECTRUM, combination='ABS')
+
+def test_cqc_without_damping():
+    buildings = modal_analysis.ShearBuildings([[100., 100.]], [[40000., 40000.]])
+    spectrum = seismic_analysis.Ec_response_spectrum(2.5, soil_type='B', damping=0.)
+    cqc = modal_analysis.response_spectrum_analysis(buildings, spectrum)
+    srss = modal_analysis.response_spectrum_analysis(buildings, spectrum, combination='SRSS')
+
+    assert np.isfinite(cqc.base_shear).all()
+    assert cqc.base_shear == pytest.approx(srss.base_shear)
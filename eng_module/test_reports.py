@@ -0,0 +1,54 @@
+import os
+import numpy as np, pytest
+from eng_module import beams, columns, reports, seismic_analysis, utils
+
+def test_downsample():
+    x = np.linspace(0., 1., 100001)
+    y = np.sin(40. * x) + (x == x[56789]) * 5.
+    x_kept, y_kept = reports.downsample(x, y, 1000)
+
+    assert len(x_kept) <= 1000
+    assert x_kept[0] == 0. and x_kept[-1] == 1.
+    assert y_kept.max() == y.max() and y_kept.min() == y.min()
+    assert reports.downsample(x[:50], y[:50], 1000)[1].tolist() == y[:50].tolist()
+
+@pytest.mark.parametrize('max_workers', [1, 2])
+def test_write_reports(tmp_path, max_workers):
+    column_array = columns.run_all_columns_array('test_data/columns_1.csv')
+    names = [record[0] for record in utils.read_csv_file('test_data/columns_1.csv')[1:]]
+    beam_data = beams.get_structured_beam_data(beams.read_beam_file('test_data/beam_1_strc.txt'))
+    beam_model = beams.build_beam(beam_data, load_combos={'ULS': {'Dead': 1.35, 'Live': 1.5}, 'SLS': {'Dead': 1.0, 'Live': 1.0}})
+    beam_model.analyze_linear()
+    spectrum = seismic_analysis.Ec_response_spectrum(0.2 * 9.81)
+    capacity = seismic_analysis.CapacityCurve.from_k_type('Multi-linear', 350000., 35000., 10000.)
+    member_reports = [
+        *reports.column_reports(column_array, names),
+        reports.beam_report(beam_model, beam_data['Name'], n_stations=5001, moment_resistance=1e9, max_points=500),
+        reports.seismic_report('<System>', 4000., spectrum, capacity),
+        *reports.column_reports(columns.run_all_columns('test_data/columns_1.csv'), names),
+    ]
+    summaries = reports.write_reports(iter(member_reports), str(tmp_path), max_workers=max_workers, chunksize=2, include_plotlyjs='cdn')
+
+    assert [summary['Name'] for summary in summaries] == [report.name for report in member_reports]
+    assert len({summary['File'] for summary in summaries}) == len(summaries)
+    assert [summary['Demand/Capacity'] for summary in summaries[:len(names)]] == pytest.approx(column_array.demand_capacity_ratio)
+    assert summaries[0]['Governing'] in columns.load_factors.EC_LOAD_COMBINATIONS.names
+    assert summaries[-1]['Governing'] is None
+    index = (tmp_path / reports.INDEX_NAME).read_text()
+    for summary in summaries:
+        assert os.path.exists(tmp_path / summary['File'])
+        assert f'href="{summary["File"]}"' in index
+    beam_page = (tmp_path / summaries[len(names)]['File']).read_text()
+    assert beam_page.count('"type":"scattergl"') == 6 and 'TEMPLATE' in beam_page
+    seismic_page = (tmp_path / summaries[len(names) + 1]['File']).read_text()
+    assert '&lt;System&gt;' in seismic_page and '<System>' not in seismic_page
+    assert reports.write_reports(iter(member_reports), str(tmp_path / 'streamed'), max_workers=max_workers, keep_summaries=False, include_plotlyjs='cdn') == []
+    assert (tmp_path / 'streamed' / reports.INDEX_NAME).read_text().count('<tr><td>') == len(member_reports)
+
+def test_column_reports_plain_import():
+    import columns as plain_columns
+    records = utils.read_csv_file('test_data/columns_1.csv')[1:]
+    column_array = plain_columns.check_csv_records(records)
+    member_reports = list(reports.column_reports(column_array, [record[0] for record in records]))
+
+    assert [report.name for report in member_reports] == ['C1', 'C2', 'C3', 'C4', 'C5']
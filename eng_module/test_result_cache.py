@@ -0,0 +1,62 @@
+import os, shutil
+from concurrent.futures import ProcessPoolExecutor
+import pytest
+from eng_module import beam_batch, columns, result_cache
+
+def _put_entries(filename: str, start: int)-> int:
+    with result_cache.ResultCache(filename) as cache:
+        for idx in range(start, start + 50):
+            cache.put(f'key {idx}', {'value': idx})
+    return start
+
+def test_canonical_key():
+    key = result_cache.canonical_key('beam', {'Supports': {1000.0: 'P', 0.0: 'F'}, 'L': 4800.0})
+    same = result_cache.canonical_key('beam', {'L': 4800.0, 'Supports': {0.0: 'F', 1000.0: 'P'}})
+
+    assert key == same
+    assert key != result_cache.canonical_key('beam', {'L': 4800.1, 'Supports': {0.0: 'F', 1000.0: 'P'}})
+    assert key != result_cache.canonical_key('beam', {'L': 4800.0, 'Supports': {0.0: 'F', 1000.0: 'P'}}, 'other version')
+    with pytest.raises(TypeError):
+        result_cache.canonical_key('beam', {'L': object()})
+
+def test_lru_eviction(tmp_path):
+    with result_cache.ResultCache(str(tmp_path / 'cache.sqlite'), max_bytes=5000) as cache:
+        for idx in range(4):
+            cache.put(f'key {idx}', b'x' * 1000)
+        assert cache.get('key 0') == b'x' * 1000
+        cache.put('key 4', b'x' * 1000)
+        cache.put('key 5', b'x' * 1000)
+
+        assert cache.nbytes <= 5000
+        assert 'key 0' in cache and 'key 5' in cache
+        assert 'key 1' not in cache
+        assert cache.get('missing', 'default') == 'default'
+        assert (cache.hits, cache.misses) == (1, 1)
+
+def test_concurrent_writers(tmp_path):
+    filename = str(tmp_path / 'cache.sqlite')
+    with ProcessPoolExecutor(4) as executor:
+        list(executor.map(_put_entries, [filename] * 4, range(0, 200, 50)))
+    with result_cache.ResultCache(filename) as cache:
+        assert len(cache) == 200
+        assert cache.get('key 123') == {'value': 123}
+
+def test_batch_runners_use_cache(tmp_path):
+    filename = str(tmp_path / 'cache.sqlite')
+    for name in ('beam_1_strc.txt', 'beam_2_strc.txt'):
+        shutil.copy(os.path.join('test_data', name), tmp_path / name)
+    reference = beam_batch.run_beam_batch([str(tmp_path)], max_workers=1)
+    first = beam_batch.run_beam_batch([str(tmp_path)], max_workers=1, result_cache=filename)
+    with open(tmp_path / 'beam_2_strc.txt', 'a') as beam_file:
+        beam_file.write('\n')
+    with result_cache.ResultCache(filename) as cache:
+        second = beam_batch.run_beam_batch([str(tmp_path)], max_workers=1, result_cache=cache)
+        assert (cache.hits, cache.misses) == (2, 0)
+    assert first == reference and second == reference
+
+    with result_cache.ResultCache(filename) as cache:
+        checked = columns.run_all_columns_array('test_data/columns_1.csv', cache)
+        cached = columns.run_all_columns_array('test_data/columns_1.csv', cache)
+        assert columns.run_all_columns_array('test_data/columns_1.csv', cache, buckling_curve='c').demand_capacity_ratio.tolist() != checked.demand_capacity_ratio.tolist()
+        assert (cache.hits, cache.misses) == (1, 2)
+    assert cached.demand_capacity_ratio.tolist() == checked.demand_capacity_ratio.tolist()
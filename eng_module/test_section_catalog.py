@@ -0,0 +1,40 @@
+import numpy as np, pytest
+from eng_module import section_catalog, columns
+
+def test_buckling_curve_table():
+    table = section_catalog.BucklingCurveTable()
+    lmda = np.array([0.1, 0.5, 1.0, 1.2345, 7.5])
+    curve_index = section_catalog.BUCKLING_CURVES.index('c')
+    exact = np.minimum(columns.reduction_factor(lmda, columns.IMPERFECTION_FACTORS['c']), 1.)
+    values = table.lookup(lmda, curve_index)
+
+    assert np.all(values <= exact)
+    assert values == pytest.approx(exact, abs=1e-3)
+    assert values[2] == pytest.approx(0.5399, abs=1e-4)
+
+def test_section_catalog_capacity():
+    catalog = section_catalog.SectionCatalog.from_csv(series=['HEB'])
+    steelcolumn = columns.SteelColumn(h=4000, E=210000, A=7810, Ix=56960000, Iy=20030000, kx=1.0, ky=1.0, fy=355)
+    capacity = catalog.capacity(4000, 1.0, 1.0, 355, buckling_curve='b', exact=True)
+
+    assert list(catalog.names[:3]) == ['HEB100', 'HEB120', 'HEB140']
+    assert capacity[list(catalog.names).index('HEB200')] == pytest.approx(steelcolumn.factored_compressive_resistance())
+
+def test_lightest_sections():
+    catalog = section_catalog.SectionCatalog.from_csv()
+    demand = np.array([1e5, 2e6, 2e6, 1e9])
+    h = np.array([3000., 4000., 8000., 4000.])
+    indices = catalog.lightest_sections(demand, h, 1.0, 1.0, 355., exact=True)
+    capacity = catalog.capacity(h, 1.0, 1.0, 355., exact=True)
+
+    assert indices[-1] == -1
+    for idx, section in enumerate(indices[:-1]):
+        assert capacity[idx, section] >= demand[idx]
+        assert np.all(capacity[idx, :section] < demand[idx])
+    assert catalog.select(demand, h, 1.0, 1.0, 355.)[-1] is None
+
+def test_select_csv_sections():
+    sections = section_catalog.select_csv_sections('test_data/columns_1.csv')
+
+    assert list(sections) == ['C1', 'C2', 'C3', 'C4', 'C5']
+    assert sections['C4'] == 'HEB450'
@@ -0,0 +1,106 @@
+import numpy as np
+import seismic_analysis as sa, pytest
+
+def test_acceleration():
+    spectrum = sa.Ec_response_spectrum(ag=2.0)
+
+    assert spectrum.acceleration(0.1) == pytest.approx(4.025)
+    assert spectrum.acceleration(0.4) == pytest.approx(5.75)
+    assert spectrum.acceleration(1.2) == pytest.approx(2.875)
+    assert spectrum.acceleration(3.0) == pytest.approx(0.7666667)
+
+    with pytest.raises(ValueError):
+        spectrum.acceleration(4.5)
+
+def test_acceleration_array():
+    spectrum = sa.Ec_response_spectrum(ag=2.4, spectra_type=2, soil_type='D', damping=10.)
+    periods = np.linspace(0., 4., 41)
+    
+    Se = spectrum.acceleration(periods)
+    Sd = spectrum.displacement(periods)
+
+    assert Se.shape == (41,)
+    assert Se.tolist() == [spectrum.acceleration(T) for T in periods.tolist()]
+    assert Sd.tolist() == pytest.approx([spectrum.displacement(T) for T in periods.tolist()])
+
+def test_system_demand():
+    spectrum = sa.Ec_response_spectrum(ag=2.0)
+    xy_demand = sa.system_demand(1000., spectrum)
+
+    assert len(xy_demand) == 400
+    assert xy_demand[40] == pytest.approx((spectrum.displacement(0.4), 1000. * 5.75))
+
+def test_capacity_curve():
+    capacity = sa.CapacityCurve([1000., 200., 50.], [10., 14.])
+    x_breaks, f_breaks = capacity.breakpoints()
+
+    assert x_breaks.tolist() == pytest.approx([0., 0.01, 0.03])
+    assert f_breaks.tolist() == pytest.approx([0., 10., 14.])
+    assert capacity.force(np.array([0.005, 0.02, 0.05])).tolist() == pytest.approx([5., 12., 15.])
+
+def test_system_capacity():
+    xy_capacity = sa.system_capacity('Multi-linear', [0.01, 0.05], 1000., 100., 20.)
+
+    assert xy_capacity == pytest.approx([(0.01, 10.), (0.05, 23.)])
+
+    with pytest.raises(ValueError):
+        sa.system_capacity('Nonlinear', [0.01], 1000.)
+
+def test_performance_point():
+    spectrum = sa.Ec_response_spectrum(ag=0.2 * 9.81)
+    capacity = sa.CapacityCurve.from_k_type('Multi-linear', 350000., 35000., 10000.)
+    force, displacement, period = sa.performance_point(4000., spectrum, capacity)
+
+    assert force == pytest.approx(4000. * spectrum.acceleration(period))
+    assert displacement == pytest.approx(spectrum.displacement(period))
+    assert force == pytest.approx(capacity.force(np.array([displacement]))[0])
+
+    linear = sa.CapacityCurve.from_k_type('Linear', 350000.)
+    _, _, linear_period = sa.performance_point(4000., spectrum, linear)
+
+    assert linear_period == pytest.approx(2 * np.pi * np.sqrt(4000. / 350000.))
+
+def test_performance_points():
+    spectrum = sa.Ec_response_spectrum(ag=0.2 * 9.81)
+    k1 = np.array([350000., 100000., 20000.])
+    capacity = sa.CapacityCurve.from_k_type('Multi-linear', k1, 0.1 * k1, 10000.)
+    forces, displacements, periods = sa.performance_points(
+        4000., spectrum.ag, spectrum.S, spectrum.Tb, spectrum.Tc, spectrum.Td, spectrum.nu, capacity
+    )
+
+    assert forces.shape == (3,)
+    for idx in range(3):
+        single = sa.CapacityCurve.from_k_type('Multi-linear', k1[idx], 0.1 * k1[idx], 10000.)
+        assert (forces[idx], displacements[idx], periods[idx]) == pytest.approx(sa.performance_point(4000., spectrum, single))
+
+def test_cached_functions():
+    sa.clear_caches()
+    demand = sa.cached_system_demand(4000., 1.962, 1, 'C', 5.)
+    capacity = sa.cached_capacity_curve('Multi-linear', 350000., 35000., 10000.)
+    point = sa.cached_performance_point(4000., 1.962, 1, 'C', 5., 'Multi-linear', 350000., 35000., 10000.)
+
+    assert list(demand) == sa.system_demand(4000., sa.Ec_response_spectrum(1.962))
+    assert sa.cached_system_demand(4000., 1.962, 1, 'C', 5.) is demand
+    assert sa.cached_capacity_curve('Multi-linear', 350000., 35000., 10000.) is capacity
+    assert sa.cached_capacity_curve.cache_info().hits == 2
+    assert point == sa.performance_point(4000., sa.Ec_response_spectrum(1.962), capacity)
+
+    with pytest.raises(ValueError):
+        capacity.stiffness[0] = 0.
+
+def test_real_polynomial_roots():
+    coefficients = np.array([
+        [1., -6., 11., -6.],
+        [2., 0., 0., -16.],
+        [0., 1., -3., 2.],
+        [0., 1., 0., 1.],
+        [0., 0., 2., -1.],
+    ])
+    roots = np.sort(sa._real_polynomial_roots(coefficients), axis=-1)
+
+    assert roots[0] == pytest.approx([1., 2., 3.])
+    assert roots[1, 0] == pytest.approx(2.)
+    assert np.isnan(roots[1, 1:]).all()
+    assert roots[2, :2] == pytest.approx([1., 2.])
+    assert np.isnan(roots[3]).all()
+    assert roots[4, 0] == pytest.approx(0.5)
@@ -0,0 +1,51 @@
+import numpy as np, pytest
+from eng_module import seismic_analysis as sa, seismic_hazard_map as hm
+
+PERIODS = np.array([0., 0.1, 0.3, 0.6, 1.5, 2.5, 4.])
+
+def test_matches_response_spectrum(tmp_path):
+    rng = np.random.default_rng(0)
+    ag = rng.uniform(0.5, 4., (7, 5))
+    soil_type = rng.integers(0, 5, (7, 5))
+    spectra_type = rng.integers(1, 3, (7, 5))
+    ag[2, 3] = np.nan
+    soil_type[4, 1] = -1
+    grid = hm.HazardGrid(ag, soil_type, spectra_type, damping=7.)
+    # A small memory budget splits the grid into tiles of one row
+    spectrum_map = hm.compute_spectrum_map(grid, PERIODS, str(tmp_path / 'map.npy'), memory_budget=1, dtype='float64')
+
+    assert spectrum_map.values.shape == (7, 5, 2, len(PERIODS))
+    for row in range(7):
+        for column in range(5):
+            site = spectrum_map.site(row, column)
+            if (row, column) in ((2, 3), (4, 1)):
+                assert np.all(np.isnan(site['Se'])) and np.all(np.isnan(site['Sd']))
+                continue
+            spectrum = sa.Ec_response_spectrum(ag[row, column], int(spectra_type[row, column]), hm.SOIL_TYPES[soil_type[row, column]], 7.)
+            assert site['Se'] == pytest.approx(spectrum.acceleration(PERIODS))
+            assert site['Sd'] == pytest.approx(spectrum.displacement(PERIODS))
+    assert hm.SpectrumMap.open(str(tmp_path / 'map.npy')).quantity('Se', 0.3) == pytest.approx(spectrum_map.values[:, :, 0, 2], nan_ok=True)
+
+def test_raster_files(tmp_path):
+    header = 'ncols 3\nnrows 2\nxllcorner 1000.0\nyllcorner 2000.0\ncellsize 50.0\nNODATA_value -9999\n'
+    (tmp_path / 'ag.asc').write_text(header + '1.0 2.0 -9999\n3.0 4.0 2.5\n')
+    (tmp_path / 'soil.asc').write_text(header + '0 1 2\n3 -9999 4\n')
+    grid = hm.HazardGrid.from_files(str(tmp_path / 'ag.asc'), str(tmp_path / 'soil.asc'), spectra_type=2)
+    spectrum_map = hm.compute_spectrum_map(grid, PERIODS, str(tmp_path / 'out' / 'map.npy'))
+
+    assert grid.cell(1120., 2010.) == (1, 2)
+    assert spectrum_map.site_at(1020., 2090.)['Se'] == pytest.approx(sa.Ec_response_spectrum(1.0, 2, 'A').acceleration(PERIODS), rel=1e-6)
+    assert spectrum_map.site_at(1120., 2010.)['Sd'] == pytest.approx(sa.Ec_response_spectrum(2.5, 2, 'E').displacement(PERIODS), rel=1e-6)
+    assert np.all(np.isnan(spectrum_map.values[0, 2])) and np.all(np.isnan(spectrum_map.values[1, 1]))
+    with pytest.raises(ValueError):
+        spectrum_map.site_at(900., 2010.)
+
+def test_invalid_grid(tmp_path):
+    with pytest.raises(ValueError):
+        hm.HazardGrid(np.ones((2, 2)), np.zeros((2, 3)))
+    with pytest.raises(ValueError):
+        hm.compute_spectrum_map(hm.HazardGrid(np.ones((2, 2)), np.full((2, 2), 5)), PERIODS, str(tmp_path / 'map.npy'))
+    with pytest.raises(ValueError):
+        hm.compute_spectrum_map(hm.HazardGrid(np.ones((2, 2)), np.zeros((2, 2)), 3), PERIODS, str(tmp_path / 'map.npy'))
+    with pytest.raises(ValueError):
+        hm.compute_spectrum_map(hm.HazardGrid(np.ones((2, 2)), np.zeros((2, 2))), [5.], str(tmp_path / 'map.npy'))
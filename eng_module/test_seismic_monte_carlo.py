@@ -0,0 +1,59 @@
+import numpy as np, pytest
+from eng_module import seismic_monte_carlo as mc, seismic_analysis as sa
+
+D = mc.Distribution
+
+MODEL = mc.SeismicModel(
+    ag = D.lognormal(2.0, 0.6, upper=15.),
+    mass = D.normal(4000., 400., lower=100.),
+    k1 = D.normal(350000., 35000., lower=1000.),
+    k_type = 'Multi-linear',
+    k2 = D.uniform(20000., 50000.),
+    f1max = D.normal(10000., 1000., lower=1.),
+    damping = D.uniform(3., 8.),
+    soil_type = D.choice('ABCDE', [0.1, 0.2, 0.4, 0.2, 0.1]),
+)
+
+def test_distribution():
+    rng = np.random.default_rng(0)
+
+    assert D.constant(3.).sample(rng, 4).tolist() == [3.] * 4
+    assert set(D.choice(['B', 'C']).sample(rng, 100).tolist()) == {'B', 'C'}
+    assert np.all(D.normal(1., 5., lower=0.).sample(rng, 1000) >= 0.)
+    assert np.median(D.lognormal(2., 0.5).sample(rng, 100000)) == pytest.approx(2., rel=0.02)
+    with pytest.raises(ValueError):
+        D('weibull', (1., 2.))
+
+def test_solve_samples():
+    samples = MODEL.sample(np.random.default_rng(1), 20)
+    force, displacement, period = mc.solve_samples('Multi-linear', samples)
+    for idx in range(20):
+        spectrum = sa.Ec_response_spectrum(
+            samples['ag'][idx], mc.SPECTRA_TYPES[samples['spectra_type'][idx]],
+            mc.SOIL_TYPES[samples['soil_type'][idx]], samples['damping'][idx]
+        )
+        capacity = sa.CapacityCurve.from_k_type('Multi-linear', samples['k1'][idx], samples['k2'][idx], samples['f1max'][idx])
+
+        assert sa.performance_point(samples['mass'][idx], spectrum, capacity) == pytest.approx((force[idx], displacement[idx], period[idx]))
+
+def test_monte_carlo():
+    result = mc.monte_carlo(MODEL, 100000, seed=3, keep_samples=True)
+    small_budget = mc.monte_carlo(MODEL, 100000, seed=3, memory_budget=2**20)
+    displacement = np.where(np.isnan(result.samples['period']), np.inf, result.samples['displacement'])
+    fragility = result.fragility()
+
+    assert np.array_equal(result.displacement_exceedance, small_budget.displacement_exceedance)
+    assert result.statistics == small_budget.statistics
+    assert result.displacement_exceedance == pytest.approx([np.mean(displacement > d) for d in result.displacement_thresholds])
+    assert np.all(np.diff(result.displacement_exceedance) <= 0.)
+    assert result.ag_counts.sum() == 100000
+    assert np.all(np.diff(fragility, axis=1) <= 0.)
+    assert fragility[-1, 0] == 1.
+
+def test_seismic_model_errors():
+    with pytest.raises(ValueError):
+        mc.SeismicModel(ag=2., mass=4000., k1=350000., k_type='Trilinear')
+    with pytest.raises(ValueError):
+        mc.SeismicModel(ag=2., mass=4000., k1=350000., soil_type='F').sample(np.random.default_rng(0), 10)
+    with pytest.raises(ValueError, match='at least 1'):
+        mc.monte_carlo(MODEL, 0)
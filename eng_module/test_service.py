@@ -0,0 +1,100 @@
+import json, threading, urllib.error, urllib.request
+from concurrent.futures import ThreadPoolExecutor
+import pytest
+from eng_module import beams, columns, seismic_analysis, service
+
+COLUMN = {'h': 3000., 'E': 210000., 'A': 5000., 'Ix': 1e8, 'Iy': 2e7, 'kx': 1., 'ky': 0.7, 'fy': 355., 'demand': 1e6}
+
+SYSTEM = {'mass': 4000., 'ag': 2.5, 'k1': 350000., 'k_type': 'Multi-linear', 'k2': 35000., 'f1max': 10000., 'soil_type': 'B'}
+
+@pytest.fixture
+def server():
+    engineering_service = service.EngineeringService(workers=1, max_delay=0.01)
+    http_server = service.make_server(engineering_service, port=0)
+    thread = threading.Thread(target=http_server.serve_forever, daemon=True)
+    thread.start()
+    yield 'http://{}:{}'.format(*http_server.server_address)
+    http_server.shutdown()
+    http_server.server_close()
+    engineering_service.close()
+
+def post(url: str, payload: dict)-> tuple[int, dict]:
+    request = urllib.request.Request(url, json.dumps(payload).encode(), {'Content-Type': 'application/json'})
+    try:
+        with urllib.request.urlopen(request) as response:
+            return response.status, json.loads(response.read())
+    except urllib.error.HTTPError as err:
+        return err.code, json.loads(err.read())
+
+def test_columns(server):
+    with ThreadPoolExecutor(8) as executor:
+        responses = list(executor.map(lambda h: post(f'{server}/columns', {'items': [COLUMN | {'h': h}]}), [2000., 3000., 4000.] * 8))
+    status, body = responses[1]
+    steel_column = columns.SteelColumn(**{name: COLUMN[name] for name in service.COLUMN_FIELDS})
+
+    assert all(response[0] == 200 for response in responses)
+    assert body['results'][0]['compressive_resistance'] == pytest.approx(steel_column.factored_compressive_resistance())
+    assert body['results'][0]['demand_capacity_ratio'] == pytest.approx(1e6 / body['results'][0]['capacity'])
+    with urllib.request.urlopen(f'{server}/metrics') as response:
+        metrics = json.loads(response.read())['columns']
+    assert metrics['requests'] == 24 and metrics['items'] == 24
+    assert metrics['batches'] < 24
+
+def test_seismic(server):
+    status, body = post(f'{server}/seismic', {'items': [SYSTEM, SYSTEM | {'k_type': 'Linear'}, SYSTEM | {'ag': 1e-6}]})
+    spectrum = seismic_analysis.Ec_response_spectrum(2.5, soil_type='B')
+    expected = seismic_analysis.performance_point(4000., spectrum, seismic_analysis.CapacityCurve.from_k_type('Multi-linear', 350000., 35000., 10000.))
+
+    assert status == 200
+    assert [body['results'][0][name] for name in ('force', 'displacement', 'period')] == pytest.approx(list(expected))
+    assert body['results'][1]['period'] < body['results'][0]['period']
+    assert post(f'{server}/seismic', {'items': [SYSTEM | {'soil_type': 'X'}]})[0] == 400
+    assert post(f'{server}/seismic', {'items': [SYSTEM | {'k1': -1.}]})[0] == 400
+    assert post(f'{server}/seismic', {'items': [SYSTEM | {'damping': -10.}]})[0] == 400
+    assert post(f'{server}/seismic', {'items': [{'mass': 4000., 'ag': 2.5, 'k1': 350000., 'k_type': 'Multi-linear'}]})[0] == 400
+    assert post(f'{server}/seismic', {'items': [SYSTEM | {'k2': 350000.}]})[0] == 400
+
+def test_invalid_columns(server):
+    assert post(f'{server}/columns', {'items': [COLUMN | {'E': -1.}]})[0] == 400
+    assert post(f'{server}/columns', {'items': [COLUMN | {'gamma_m1': 0.}]})[0] == 400
+
+def test_beams(server):
+    with open('test_data/beam_1_strc.txt') as beam_file:
+        text = beam_file.read()
+    beam_model = beams.load_beam_model('test_data/beam_1_strc.txt')
+    beam_model.analyze_linear()
+    status, body = post(f'{server}/beams', {'items': [{'Text': text}]})
+
+    assert status == 200
+    assert body['results'][0]['Error'] is None
+    assert body['results'][0]['Results']['Combo 1']['Max Moment'] == pytest.approx(beam_model.Members[body['results'][0]['Name']].max_moment('Mz'))
+    assert post(f'{server}/beams', {'items': [{'Text': 'Beam\n1, 2\n0:P\nPoint:Fy, x, 1, case:D'}]})[0] == 400
+    assert post(f'{server}/unknown', {'items': []})[0] == 404
+
+def test_batcher_backpressure():
+    release = threading.Event()
+    batcher = service.Batcher(lambda items: release.wait() and items, max_delay=0., max_pending=3)
+    future = batcher.submit([1, 2])
+
+    with pytest.raises(service.ServiceBusy):
+        batcher.submit([3, 4])
+    release.set()
+    assert future.result(5) == [1, 2]
+    assert batcher.submit([3, 4]).result(5) == [3, 4]
+    assert batcher.metrics.summary()['rejected'] == 1
+    batcher.close()
+
+def test_batcher_isolates_bad_requests():
+    release = threading.Event()
+    def function(items):
+        release.wait()
+        return [1. / item for item in items]
+    batcher = service.Batcher(function, max_delay=0.05)
+    futures = [batcher.submit([1., 2.]), batcher.submit([0.]), batcher.submit([4.])]
+    release.set()
+
+    assert futures[0].result(5) == [1., 0.5]
+    with pytest.raises(ZeroDivisionError):
+        futures[1].result(5)
+    assert futures[2].result(5) == [0.25]
+    batcher.close()
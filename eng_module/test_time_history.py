@@ -0,0 +1,51 @@
+import numpy as np
+import pytest
+from eng_module import seismic_analysis, time_history
+
+def test_step_load_on_linear_system():
+    # An undamped system under a constant ground acceleration oscillates between 0 and 2 ag / w^2
+    systems = time_history.BilinearSystems(mass=[10., 40.], k1=4000., damping=0.)
+    ground_motions = time_history.GroundMotions(np.full((1, 2001), 2.), 0.001, ['Step'])
+    results = time_history.integrate(ground_motions, systems)
+
+    assert results.displacement[0] == pytest.approx(2 * 2. * systems.mass / systems.k1, rel=1e-4)
+    assert results.ductility[0] == pytest.approx([0., 0.])
+
+def test_bilinear_hysteresis():
+    k1, k2, f1max = np.array(1000.), np.array(100.), np.array(10.)
+    offset = f1max * (1 - k2 / k1)
+    force, tangent = time_history.restoring_force(np.array(0.02), np.array(0.), np.array(0.), k1, k2, offset)
+    assert (force, tangent) == pytest.approx((10. + 100. * 0.01, 100.))
+    # Unloading from the post-yield branch is elastic until the opposite branch is reached
+    force, tangent = time_history.restoring_force(np.array(0.015), np.array(0.02), np.array(11.), k1, k2, offset)
+    assert (force, tangent) == pytest.approx((6., 1000.))
+    force, tangent = time_history.restoring_force(np.array(-0.01), np.array(0.02), np.array(11.), k1, k2, offset)
+    assert (force, tangent) == pytest.approx((-10. + 100. * 0.01 - 1., 100.))
+
+def test_paired_and_streamed_records(tmp_path):
+    spectrum = seismic_analysis.Ec_response_spectrum(2.5, soil_type='B')
+    ground_motions = time_history.synthetic_records(spectrum, 3, duration=10., dt=0.01, n_iterations=2)
+    systems = time_history.BilinearSystems.from_k_type('Multi-linear', [4000., 2000., 1000.], 350000., 35000., 10000.)
+    results = time_history.integrate(ground_motions, systems)
+    paired = time_history.integrate(ground_motions, systems, paired=True)
+    assert paired.displacement == pytest.approx(np.diag(results.displacement))
+    assert np.all(results.ductility[:, 0] > 1.)
+
+    file_names = []
+    for name, acceleration in zip(ground_motions.names, ground_motions.acceleration):
+        file_names.append(str(tmp_path / f'{name}.AT2'))
+        with open(file_names[-1], 'w') as record_file:
+            record_file.write(f'PEER NGA\n{name}\nACCELERATION TIME SERIES IN UNITS OF G\nNPTS= {len(acceleration)}, DT= .0100 SEC\n')
+            record_file.write('\n'.join(' '.join(f'{value:.10e}' for value in row) for row in np.array_split(acceleration / time_history.GRAVITY, 500)))
+    names, streamed = time_history.run_record_files(file_names, systems, batch_size=2)
+    assert names == ground_motions.names
+    assert streamed.displacement == pytest.approx(results.displacement)
+
+def test_synthetic_records_match_spectrum():
+    spectrum = seismic_analysis.Ec_response_spectrum(3., soil_type='C')
+    ground_motions = time_history.synthetic_records(spectrum, 5, seed=2)
+    periods = np.geomspace(0.1, 3., 8)
+    mean_spectrum = time_history.elastic_response_spectrum(ground_motions, periods).mean(axis=0)
+
+    assert ground_motions.acceleration.shape == (5, 2001)
+    assert mean_spectrum == pytest.approx(spectrum.acceleration(periods), rel=0.15)
@@ -1,4 +1,6 @@
-import utils, pytest
+import numpy as np
+import pytest
+from eng_module import utils
 
 def test_str_to_int():
     test_value1 = utils.str_to_int("43")
@@ -13,3 +15,47 @@ def test_str_to_float():
     
     assert test_value1 == pytest.approx(43.0)
     assert test_value2 == pytest.approx(13.4)
+
+def test_iter_csv_chunks():
+    chunks = list(utils.iter_csv_chunks('test_data/columns_1.csv', chunk_size=2))
+
+    assert [len(chunk) for chunk in chunks] == [2, 2, 1]
+    assert chunks[0][0][0] == 'C1'
+
+SCHEMA = utils.Schema((
+    utils.Field('Name', 'U'),
+    utils.Field('A', unit='mm2'),
+    utils.Field('n', 'i8', required=False, default=1),
+    utils.Field('Support', 'U1', choices=('P', 'F', 'R')),
+))
+
+def test_parse_typed_records():
+    typed_records = utils.parse_typed_records(
+        [['C1', '10.5', '', 'P'], ['C2', 'x', '2', 'F'], ['C3', ' 20 ', '3', 'Q'], ['C4', '30', '4', 'R']],
+        SCHEMA
+    )
+
+    assert typed_records.data.dtype == np.dtype([('Name', 'U2'), ('A', 'f8'), ('n', 'i8'), ('Support', 'U1')])
+    assert typed_records.data.tolist() == [('C1', 10.5, 1, 'P'), ('C4', 30., 4, 'R')]
+    assert typed_records.lines.tolist() == [2, 5]
+    assert [str(error) for error in typed_records.errors] == [
+        "line 3: A 'x' is not a number",
+        "line 4: Support 'Q' is not one of P, F, R",
+    ]
+    with pytest.raises(ValueError, match="line 3: A 'x'"):
+        typed_records.raise_errors()
+
+def test_read_typed_csv(tmp_path):
+    filename = tmp_path / 'typed.csv'
+    filename.write_text('Support,A,Name\nP,10,C1\n\nF,,C2\nR,30,C3\n')
+    typed_records = utils.read_typed_csv(str(filename), SCHEMA)
+
+    assert typed_records.data.tolist() == [('C1', 10., 1, 'P'), ('C3', 30., 1, 'R')]
+    assert typed_records.lines.tolist() == [2, 5]
+    assert [(error.line, error.column) for error in typed_records.errors] == [(4, 'A')]
+    chunks = list(utils.iter_typed_csv_chunks(str(filename), SCHEMA, chunk_size=2))
+    assert [chunk.lines.tolist() for chunk in chunks] == [[2], [5]]
+
+    filename.write_text('Name,n\nC1,1\n')
+    with pytest.raises(ValueError, match='A, Support'):
+        utils.read_typed_csv(str(filename), SCHEMA)
@@ -0,0 +1,358 @@
+import os, re
+from math import pi
+from dataclasses import dataclass
+from typing import Iterator
+import numpy as np
+from eng_module import instrumentation, seismic_analysis
+
+GRAVITY = 9.81
+
+# Average acceleration (trapezoidal) Newmark parameters, unconditionally stable
+GAMMA = 0.5
+BETA = 0.25
+
+MAX_ITERATIONS = 20
+
+TOLERANCE = 1e-10
+
+PEER_HEADER = re.compile(r'NPTS\s*=\s*(\d+)\s*,\s*DT\s*=\s*([\d.Ee+-]+)', re.IGNORECASE)
+
+@dataclass
+class BilinearSystems:
+    '''
+    Single degree of freedom systems with the bilinear capacity of
+    seismic_analysis.system_capacity(k_type='Multi-linear') and kinematic hardening:
+    the unloading and reloading stiffness is 'k1' and the force stays between the two
+    post-yield branches of slope 'k2' through +f1max and -f1max. All the parameters
+    broadcast to shape (S,).
+
+    'mass' - Mass in tons
+    'k1' - Initial stiffness in kN/m
+    'k2' - Post-yield stiffness in kN/m (less than k1)
+    'f1max' - Yield force in kN, np.inf for a linear system
+    'damping' - Viscous damping ratio in percentage, proportional to the mass and the initial stiffness
+    '''
+    mass: np.ndarray
+    k1: np.ndarray
+    k2: np.ndarray = 0.
+    f1max: np.ndarray = np.inf
+    damping: np.ndarray = 5.
+
+    def __post_init__(self):
+        self.mass, self.k1, self.k2, self.f1max, self.damping = (
+            np.array(value, dtype=float) for value in np.broadcast_arrays(
+                np.atleast_1d(self.mass), self.k1, self.k2, self.f1max, self.damping
+            )
+        )
+        if np.any(self.mass <= 0.) or np.any(self.k1 <= 0.) or np.any(self.f1max <= 0.):
+            raise ValueError('The masses, initial stiffnesses and yield forces must be positive')
+        if np.any(self.k2 >= self.k1):
+            raise ValueError('The post-yield stiffness must be less than the initial stiffness')
+
+    @classmethod
+    def from_k_type(cls, k_type: str, mass: np.ndarray, k1: np.ndarray, k2: np.ndarray = 0., f1max: np.ndarray = 0., damping: np.ndarray = 5.)-> 'BilinearSystems':
+        '''
+        Returns the systems of the 'Linear' or 'Multi-linear' capacity curve of system_capacity
+        '''
+        if k_type == 'Linear':
+            return cls(mass, k1, damping=damping)
+        elif k_type == 'Multi-linear':
+            return cls(mass, k1, k2, f1max, damping)
+        else:
+            raise ValueError(f"The type of stiffness must be one of 'Linear' or 'Multi-linear', not {k_type}")
+
+    def __len__(self)-> int:
+        return self.mass.shape[0]
+
+    @property
+    def period(self)-> np.ndarray:
+        '''
+        Elastic period in s
+        '''
+        return 2 * pi * np.sqrt(self.mass / self.k1)
+
+    @property
+    def yield_displacement(self)-> np.ndarray:
+        return self.f1max / self.k1
+
+@dataclass
+class GroundMotions:
+    '''
+    R ground acceleration records sampled at the same time step. Shorter records are
+    padded with zeros, so the systems vibrate freely after their end.
+
+    'acceleration' - Ground accelerations in m/s2, shape (R, N)
+    'dt' - Time step in s
+    'names' - Names of the records, length R
+    '''
+    acceleration: np.ndarray
+    dt: float
+    names: list[str]
+
+    def __post_init__(self):
+        self.acceleration = np.atleast_2d(np.asarray(self.acceleration, dtype=float))
+        if len(self.names) != self.acceleration.shape[0]:
+            raise ValueError(f'There are {self.acceleration.shape[0]} records but {len(self.names)} names')
+
+    def __len__(self)-> int:
+        return self.acceleration.shape[0]
+
+    @classmethod
+    def from_records(cls, records: list[tuple[str, np.ndarray, float]])-> 'GroundMotions':
+        '''
+        Returns the records (name, accelerations, time step), which must have the same time step
+        '''
+        dts = {dt for _, _, dt in records}
+        if len(dts) != 1:
+            raise ValueError(f'The records must have the same time step, not {sorted(dts)}')
+        n_steps = max(len(acceleration) for _, acceleration, _ in records)
+        acceleration = np.zeros((len(records), n_steps))
+        for idx, (_, record, _) in enumerate(records):
+            acceleration[idx, :len(record)] = record
+
+        return cls(acceleration, dts.pop(), [name for name, _, _ in records])
+
+@dataclass
+class TimeHistoryResults:
+    '''
+    Peak responses of R records on S systems, shape (R, S), or (R,) for paired records and systems
+
+    'displacement' - Largest absolute displacement relative to the ground in m
+    'force' - Largest absolute restoring force in kN
+    'acceleration' - Largest absolute total acceleration in m/s2
+    'residual_displacement' - Displacement at the end of the records in m
+    'ductility' - Largest displacement divided by the yield displacement (0 for linear systems)
+    'displacement_history' - Displacements at every time step, shape (N, ...), when requested
+    '''
+    displacement: np.ndarray
+    force: np.ndarray
+    acceleration: np.ndarray
+    residual_displacement: np.ndarray
+    ductility: np.ndarray
+    displacement_history: np.ndarray|None = None
+
+def restoring_force(
+    u: np.ndarray,
+    u_committed: np.ndarray,
+    f_committed: np.ndarray,
+    k1: np.ndarray,
+    k2: np.ndarray,
+    offset: np.ndarray,
+)-> tuple[np.ndarray, np.ndarray]:
+    '''
+    Returns the restoring force and the tangent stiffness of the bilinear kinematic hardening
+    model at the displacements 'u' from the committed state of the previous time step.
+    The elastic trial force is returned to the post-yield branch it goes beyond,
+    k2 * u +- 'offset' with 'offset' = f1max * (1 - k2 / k1).
+    '''
+    trial = f_committed + k1 * (u - u_committed)
+    upper = k2 * u + offset
+    lower = k2 * u - offset
+    force = np.minimum(np.maximum(trial, lower), upper)
+    tangent = np.where((trial > upper) | (trial < lower), k2, k1)
+
+    return force, tangent
+
+@instrumentation.timed('time_history.integrate')
+def integrate(
+    ground_motions: GroundMotions,
+    systems: BilinearSystems,
+    paired: bool = False,
+    store_history: bool = False,
+)-> TimeHistoryResults:
+    '''
+    Returns the peak responses of 'systems' to 'ground_motions' by the average acceleration
+    Newmark method with Newton-Raphson iterations at each time step (Chopra, Dynamics of
+    Structures, 5.7). All the record-system pairs are stepped together as arrays, so the
+    only Python loop is over the time steps. The time step should be below a tenth of the
+    shortest period for accuracy.
+
+    'paired' - Analyze record i on system i (R == S) instead of every record on every system
+    'store_history' - Also keep the displacements at every time step (memory N x R x S)
+    '''
+    if paired:
+        if len(ground_motions) != len(systems):
+            raise ValueError(f'Paired analysis needs as many records as systems, not {len(ground_motions)} and {len(systems)}')
+        record_acceleration = np.ascontiguousarray(ground_motions.acceleration.T)
+        shape = (len(systems),)
+        parameters = (systems.mass, systems.k1, systems.k2, systems.f1max, systems.damping)
+    else:
+        record_acceleration = np.ascontiguousarray(ground_motions.acceleration.T)[:, :, None]
+        shape = (len(ground_motions), len(systems))
+        parameters = (value[None, :] for value in (systems.mass, systems.k1, systems.k2, systems.f1max, systems.damping))
+    m, k1, k2, f1max, damping = parameters
+    c = 2 * damping / 100. * np.sqrt(k1 * m)
+    offset = np.where(np.isinf(f1max), np.inf, f1max * (1. - k2 / k1))
+    dt = ground_motions.dt
+
+    a1 = m / (BETA * dt ** 2) + GAMMA * c / (BETA * dt)
+    a2 = m / (BETA * dt) + (GAMMA / BETA - 1.) * c
+    a3 = (1. / (2 * BETA) - 1.) * m + dt * (GAMMA / (2 * BETA) - 1.) * c
+
+    u, v, f = np.zeros(shape), np.zeros(shape), np.zeros(shape)
+    a = np.broadcast_to(-record_acceleration[0], shape).copy()
+    peak_u, peak_f, peak_a = np.zeros(shape), np.zeros(shape), np.abs(a + record_acceleration[0])
+    history = np.zeros((record_acceleration.shape[0],) + shape) if store_history else None
+
+    for step in range(1, record_acceleration.shape[0]):
+        ground = record_acceleration[step]
+        p_hat = -m * ground + a1 * u + a2 * v + a3 * a
+        u_next = u.copy()
+        for _ in range(MAX_ITERATIONS):
+            f_next, tangent = restoring_force(u_next, u, f, k1, k2, offset)
+            residual = p_hat - f_next - a1 * u_next
+            if np.all(np.abs(residual) <= TOLERANCE * (np.abs(p_hat) + 1.)):
+                break
+            u_next += residual / (tangent + a1)
+        du = u_next - u
+        v_next = GAMMA / (BETA * dt) * du + (1. - GAMMA / BETA) * v + dt * (1. - GAMMA / (2 * BETA)) * a
+        a = du / (BETA * dt ** 2) - v / (BETA * dt) - (1. / (2 * BETA) - 1.) * a
+        u, v, f = u_next, v_next, f_next
+
+        np.maximum(peak_u, np.abs(u), out=peak_u)
+        np.maximum(peak_f, np.abs(f), out=peak_f)
+        np.maximum(peak_a, np.abs(a + ground), out=peak_a)
+        if store_history:
+            history[step] = u
+
+    return TimeHistoryResults(
+        displacement = peak_u,
+        force = peak_f,
+        acceleration = peak_a,
+        residual_displacement = u,
+        ductility = peak_u * k1 / f1max,
+        displacement_history = history,
+    )
+
+def elastic_response_spectrum(ground_motions: GroundMotions, periods: np.ndarray, damping: float = 5.)-> np.ndarray:
+    '''
+    Returns the pseudo-spectral accelerations (w^2 times the peak displacement) of the
+    records in m/s2, shape (R, P)
+    '''
+    periods = np.asarray(periods, dtype=float)
+    systems = BilinearSystems(mass=1., k1=(2 * pi / periods) ** 2, damping=damping)
+
+    return integrate(ground_motions, systems).displacement * systems.k1
+
+def read_record(filename: str, dt: float|None = None, scale: float|None = None)-> tuple[str, np.ndarray, float]:
+    '''
+    Returns the name (file name without extension), ground accelerations in m/s2 and time step of a record file.
+    PEER NGA files (.AT2, accelerations in g with an 'NPTS=..., DT=...' header line) are
+    recognized by their header. Other files have one acceleration per line, or a time and
+    an acceleration per line when 'dt' is None.
+
+    'scale' - Factor from the units of the file to m/s2, GRAVITY for PEER files and 1 otherwise
+    '''
+    name = os.path.splitext(os.path.basename(filename))[0]
+    with open(filename, 'r') as record_file:
+        text = record_file.read()
+    header = PEER_HEADER.search(text[:2000])
+    if header is not None:
+        n_points, dt = int(header.group(1)), float(header.group(2))
+        body = text[header.end():].split('\n', 1)[1] if '\n' in text[header.end():] else ''
+        acceleration = np.array(body.split(), dtype=float)[:n_points]
+        return name, acceleration * (GRAVITY if scale is None else scale), dt
+
+    values = np.loadtxt(filename, dtype=float, ndmin=2, comments='#')
+    if dt is None:
+        if values.shape[1] != 2:
+            raise ValueError(f'{filename} needs a time and an acceleration per line when the time step is not given')
+        dt = float(np.mean(np.diff(values[:, 0])))
+        acceleration = values[:, 1]
+    else:
+        acceleration = values.ravel()
+
+    return name, acceleration * (1. if scale is None else scale), dt
+
+def iter_record_files(
+    file_names: list[str],
+    batch_size: int = 256,
+    dt: float|None = None,
+    scale: float|None = None,
+)-> Iterator[GroundMotions]:
+    '''
+    Yields the records of 'file_names' in batches of up to 'batch_size' records with the
+    same time step, reading each file only when its batch is needed. See read_record.
+    '''
+    batch = []
+    for file_name in file_names:
+        record = read_record(file_name, dt, scale)
+        if batch and (len(batch) == batch_size or record[2] != batch[0][2]):
+            yield GroundMotions.from_records(batch)
+            batch = []
+        batch.append(record)
+    if batch:
+        yield GroundMotions.from_records(batch)
+
+def run_record_files(
+    file_names: list[str],
+    systems: BilinearSystems,
+    batch_size: int = 256,
+    dt: float|None = None,
+    scale: float|None = None,
+)-> tuple[list[str], TimeHistoryResults]:
+    '''
+    Returns the names of the records and the peak responses of every record file on every
+    system, shape (R, S). The files are read and analyzed in batches, so only one batch of
+    records is in memory at a time.
+    '''
+    names, list_of_results = [], []
+    for ground_motions in iter_record_files(file_names, batch_size, dt, scale):
+        names += ground_motions.names
+        list_of_results.append(integrate(ground_motions, systems))
+    fields = ('displacement', 'force', 'acceleration', 'residual_displacement', 'ductility')
+
+    return names, TimeHistoryResults(**{
+        name: np.concatenate([getattr(results, name) for results in list_of_results]) for name in fields
+    })
+
+def envelope(t: np.ndarray, duration: float, rise: float = 0.1, decay: float = 0.4)-> np.ndarray:
+    '''
+    Returns the Jennings intensity envelope: a quadratic rise over the fraction 'rise' of the
+    duration, a plateau and an exponential decay down to 5 % over the last fraction 'decay'
+    '''
+    t1, t2 = rise * duration, (1. - decay) * duration
+    return np.where(t < t1, (t / t1) ** 2, np.where(t <= t2, 1., np.exp(np.log(0.05) * (t - t2) / (duration - t2))))
+
+def synthetic_records(
+    spectrum: seismic_analysis.Ec_response_spectrum,
+    n_records: int,
+    duration: float = 20.,
+    dt: float = 0.01,
+    n_iterations: int = 5,
+    n_control_periods: int = 40,
+    seed: int = 0,
+)-> GroundMotions:
+    '''
+    Returns 'n_records' artificial records whose 5 % damped elastic spectra match 'spectrum'
+    between 0.05 s and 4 s. Each record is a sum of sinusoids with random phases (SIMQKE)
+    under the envelope of envelope(). The amplitudes start from the spectrum and are
+    corrected 'n_iterations' times by the ratio of the target to the computed spectrum at
+    'n_control_periods' periods. All the records are generated and corrected together.
+    '''
+    rng = np.random.default_rng(seed)
+    t = np.arange(0., duration + dt / 2, dt)
+    frequencies = np.arange(1, int(duration / dt / 2)) / duration
+    frequencies = frequencies[(frequencies >= 1. / seismic_analysis.MAX_PERIOD) & (frequencies <= 1. / (4 * dt))]
+    omega = 2 * pi * frequencies
+    control_periods = np.geomspace(0.05, seismic_analysis.MAX_PERIOD, n_control_periods)
+    target = spectrum.acceleration(control_periods)
+
+    # Power spectral density of a stationary motion with the target spectrum (Vanmarcke),
+    # with a peak factor of 2.5 on the response
+    zeta = spectrum.damping / 100.
+    density = zeta / (pi * omega) * (spectrum.acceleration(1. / frequencies) / 2.5) ** 2
+    amplitudes = np.broadcast_to(np.sqrt(2 * density * (omega[1] - omega[0])), (n_records, len(omega))).copy()
+    phases = rng.uniform(0., 2 * pi, (n_records, len(omega)))
+    sines, cosines = np.sin(np.outer(omega, t)), np.cos(np.outer(omega, t))
+    shape = envelope(t, duration)
+
+    for iteration in range(n_iterations + 1):
+        acceleration = shape * ((amplitudes * np.cos(phases)) @ sines + (amplitudes * np.sin(phases)) @ cosines)
+        ground_motions = GroundMotions(acceleration, dt, [f'Synthetic {idx}' for idx in range(n_records)])
+        if iteration == n_iterations:
+            return ground_motions
+        ratio = target / elastic_response_spectrum(ground_motions, control_periods, spectrum.damping)
+        amplitudes *= np.stack([
+            np.interp(np.log(1. / frequencies), np.log(control_periods), ratio_of_record) for ratio_of_record in ratio
+        ])
@@ -1,4 +1,7 @@
 import csv
+from dataclasses import dataclass, field
+from typing import Iterator
+import numpy as np
 
 def str_to_int(s: str) -> int|str:
     '''
@@ -32,4 +35,290 @@ def read_csv_file(filename: str)-> list[list[str]]:
         csv_reader = csv.reader(csv_file)
         for line in csv_reader:
             file_data.append(line)
-    return file_data
\ No newline at end of file
+    return file_data
+
+def iter_csv_chunks(filename: str, chunk_size: int = 10000, skip_header: bool = True)-> Iterator[list[list[str]]]:
+    """
+    Yields the contents of a csv file in chunks of at most 'chunk_size' lines
+    'file_name' - name of the file to be read
+    'chunk_size' - maximum number of lines held in memory at once
+    'skip_header' - if True the first line of the file is not returned
+    """
+    with open(filename, 'r') as csv_file:
+        csv_reader = csv.reader(csv_file)
+        if skip_header:
+            next(csv_reader, None)
+        chunk = []
+        for line in csv_reader:
+            chunk.append(line)
+            if len(chunk) == chunk_size:
+                yield chunk
+                chunk = []
+        if chunk:
+            yield chunk
+
+@dataclass(frozen=True)
+class Field:
+    """
+    A column of a typed csv file
+
+    'name' - Name of the column in the header
+    'dtype' - NumPy type of the values, e.g. 'f8', 'i8', 'U' (text as wide as the longest value)
+        or 'U3' (text of at most 3 characters)
+    'unit' - Unit of the values, e.g. 'mm'
+    'required' - If False, the empty and missing values are 'default' instead of errors
+    'default' - Value of the empty optional cells
+    'choices' - The allowed values, None allows any value
+    """
+    name: str
+    dtype: str = 'f8'
+    unit: str = ''
+    required: bool = True
+    default: float|int|str|None = None
+    choices: tuple|None = None
+
+    @property
+    def kind(self)-> str:
+        """
+        NumPy kind of the values: 'f', 'i' or 'U'
+        """
+        return np.dtype(self.dtype).kind
+
+@dataclass(frozen=True)
+class Schema:
+    """
+    The columns of a typed csv file, in file order
+    """
+    fields: tuple[Field, ...]
+
+    def __post_init__(self):
+        object.__setattr__(self, 'fields', tuple(self.fields))
+        if len(set(self.names)) != len(self.names):
+            raise ValueError(f'The field names of a schema must be unique: {self.names}')
+
+    @property
+    def names(self)-> list[str]:
+        return [field.name for field in self.fields]
+
+    def dtype(self, widths: dict[str, int]|None = None)-> np.dtype:
+        """
+        Returns the dtype of the structured arrays of the schema
+
+        'widths' - Number of characters of the text fields declared as 'U', by name. They are 1 by default
+        """
+        widths = {} if widths is None else widths
+        return np.dtype([
+            (field.name, f'U{max(widths.get(field.name, 1), 1)}' if field.dtype == 'U' else field.dtype)
+            for field in self.fields
+        ])
+
+@dataclass
+class CsvError:
+    """
+    A bad value of a csv file
+
+    'line' - Line number in the file, None if the records were not read from a file
+    'column' - Name of the field of the value
+    'value' - The text of the value
+    'message' - Description of the error
+    """
+    line: int|None
+    column: str
+    value: str
+    message: str
+
+    def __str__(self)-> str:
+        if self.line is None:
+            return self.message
+        return f'line {self.line}: {self.message}'
+
+@dataclass
+class TypedRecords:
+    """
+    The records of a csv file parsed with a Schema
+
+    'data' - Structured array of the valid records
+    'lines' - Line number of each record of 'data'
+    'errors' - The bad values of the records left out of 'data', in line order
+    """
+    data: np.ndarray
+    lines: np.ndarray
+    errors: list[CsvError] = field(default_factory=list)
+
+    def raise_errors(self, source: str = '<records>', max_errors: int = 10):
+        """
+        Raises a ValueError listing the first 'max_errors' errors, if there are any
+
+        'source' - Name of the file used in the message
+        """
+        if not self.errors:
+            return
+        message = '; '.join(str(error) for error in self.errors[:max_errors])
+        if len(self.errors) > max_errors:
+            message += f' and {len(self.errors) - max_errors} more errors'
+        raise ValueError(f'{source}: {message}')
+
+def _parse_cell(text: str, field: Field)-> tuple[float|int|str|None, str|None]:
+    # Returns the value of one cell and the error message, if it is bad
+    text = text.strip()
+    if not text:
+        if field.required:
+            return None, f'{field.name} is missing'
+        return field.default, None
+    if field.kind == 'U':
+        return text, None
+    try:
+        value = float(text) if field.kind == 'f' else int(text)
+    except ValueError:
+        return None, f"{field.name} {text!r} is not {'a number' if field.kind == 'f' else 'an integer'}"
+    if field.kind == 'f' and not np.isfinite(value):
+        return None, f'{field.name} {text!r} is not a finite number'
+
+    return value, None
+
+def parse_typed_records(
+    records: list[list[str]],
+    schema: Schema,
+    header: list[str]|None = None,
+    lines: list[int]|np.ndarray|None = None,
+    first_line: int|None = 2,
+)-> TypedRecords:
+    """
+    Returns the records parsed with 'schema' into a structured array.
+    Each column is converted in one NumPy call; only the columns with bad or empty values
+    are parsed again cell by cell, to find the bad records. The bad records are left out
+    of the array and their errors are returned with their line numbers instead.
+
+    'header' - Column names of the records. None takes the columns in schema order.
+        A ValueError is raised if a required column is not in the header
+    'lines' - Line number of each record
+    'first_line' - Line number of the first record when 'lines' is None, with one
+        record per line. None does not number the records
+    """
+    n_records = len(records)
+    if lines is None:
+        lines = np.arange(first_line, first_line + n_records) if first_line is not None else [None] * n_records
+    lines = list(lines) if not isinstance(lines, np.ndarray) else lines.tolist()
+    if header is None:
+        positions = list(range(len(schema.fields)))
+    else:
+        header = [name.strip() for name in header]
+        positions = [header.index(field.name) if field.name in header else None for field in schema.fields]
+        missing = [field.name for field, position in zip(schema.fields, positions) if position is None and field.required]
+        if missing:
+            raise ValueError(f"The required columns {', '.join(missing)} are missing from the header")
+
+    # The records as one table of Python strings: converting its columns from objects is
+    # several times faster than from NumPy text
+    width = max([position + 1 for position in positions if position is not None], default=0)
+    record_lengths = set(map(len, records))
+    width = max(width, max(record_lengths, default=0))
+    if record_lengths == {width}:
+        table = np.array(records, dtype=object).reshape(n_records, width)
+    else:
+        table = np.array([list(record) + [''] * (width - len(record)) for record in records], dtype=object).reshape(n_records, width)
+
+    bad = np.zeros(n_records, dtype=bool)
+    errors = []
+    columns, widths = {}, {}
+    for field_idx, (field, position) in enumerate(zip(schema.fields, positions)):
+        if position is None:
+            columns[field.name] = np.full(n_records, field.default)
+            continue
+        cells = table[:, position]
+        values = None
+        if field.kind != 'U':
+            try:
+                values = cells.astype(field.dtype)
+                if field.kind == 'f' and not np.isfinite(values).all():
+                    values = None
+            except ValueError:
+                values = None
+        else:
+            values = np.array([cell.strip() for cell in cells.tolist()], dtype=str).reshape(n_records)
+            if (np.char.str_len(values) == 0).any():
+                values = None
+        if values is None:
+            # Cell by cell only for the columns that did not convert in bulk
+            parsed = []
+            for idx, cell in enumerate(cells.tolist()):
+                value, message = _parse_cell(cell, field)
+                if message is not None:
+                    bad[idx] = True
+                    errors.append((lines[idx], field_idx, CsvError(lines[idx], field.name, cell.strip(), message)))
+                    value = field.default if field.default is not None else (0 if field.kind != 'U' else '')
+                parsed.append(value)
+            values = np.array(parsed, dtype=str if field.kind == 'U' else field.dtype).reshape(n_records)
+        if field.choices is not None:
+            for idx in np.flatnonzero(~np.isin(values, field.choices) & ~bad):
+                bad[idx] = True
+                message = f"{field.name} {values[idx]!r} is not one of {', '.join(map(str, field.choices))}"
+                errors.append((lines[idx], field_idx, CsvError(lines[idx], field.name, str(values[idx]), message)))
+        if field.kind == 'U':
+            lengths = np.char.str_len(values) if len(values) else np.zeros(0, dtype=int)
+            if field.dtype != 'U':
+                max_length = np.dtype(field.dtype).itemsize // 4
+                for idx in np.flatnonzero((lengths > max_length) & ~bad):
+                    bad[idx] = True
+                    message = f'{field.name} {values[idx]!r} is longer than {max_length} characters'
+                    errors.append((lines[idx], field_idx, CsvError(lines[idx], field.name, str(values[idx]), message)))
+            else:
+                widths[field.name] = int(lengths[~bad].max(initial=1))
+        columns[field.name] = values
+
+    valid = ~bad
+    data = np.empty(int(valid.sum()), dtype=schema.dtype(widths))
+    for name in schema.names:
+        data[name] = columns[name][valid]
+    errors.sort(key=lambda error: (error[0] if error[0] is not None else -1, error[1]))
+
+    return TypedRecords(
+        data = data,
+        lines = np.array([line for line, is_valid in zip(lines, valid) if is_valid], dtype=float if None in lines else int),
+        errors = [error for _, _, error in errors],
+    )
+
+def _read_records(csv_reader, max_records: int|None = None)-> tuple[list[list[str]], list[int]]:
+    # Returns the next 'max_records' records that are not blank and their line numbers
+    records, lines = [], []
+    for record in csv_reader:
+        if len(record) > 1 or (record and record[0].strip()):
+            records.append(record)
+            lines.append(csv_reader.line_num)
+            if len(records) == max_records:
+                break
+
+    return records, lines
+
+def read_typed_csv(filename: str, schema: Schema, header: bool = True)-> TypedRecords:
+    """
+    Returns the records of a csv file parsed with 'schema' (see parse_typed_records).
+    Blank lines are skipped.
+
+    'header' - If True, the columns are matched to the schema by the names on the first
+        line. Otherwise they are taken in schema order
+    """
+    with open(filename, 'r', newline='') as csv_file:
+        csv_reader = csv.reader(csv_file)
+        column_names = None
+        if header:
+            column_names = (_read_records(csv_reader, 1)[0] or [schema.names])[0]
+        records, lines = _read_records(csv_reader)
+
+    return parse_typed_records(records, schema, column_names, lines)
+
+def iter_typed_csv_chunks(filename: str, schema: Schema, chunk_size: int = 10000, header: bool = True)-> Iterator[TypedRecords]:
+    """
+    Yields the records of a csv file parsed with 'schema' in chunks of at most 'chunk_size'
+    records (see read_typed_csv)
+    """
+    with open(filename, 'r', newline='') as csv_file:
+        csv_reader = csv.reader(csv_file)
+        column_names = None
+        if header:
+            column_names = (_read_records(csv_reader, 1)[0] or [schema.names])[0]
+        while True:
+            records, lines = _read_records(csv_reader, chunk_size)
+            if not records:
+                break
+            yield parse_typed_records(records, schema, column_names, lines)
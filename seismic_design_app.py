@@ -1,6 +1,4 @@
-from math import sqrt, pi
 from plotly import graph_objects as go
-from shapely import LineString, intersection
 import streamlit as st
 from eng_module import seismic_analysis as sa
 
@@ -28,47 +26,60 @@ with st.sidebar:
         k2_sys = st.number_input('Stiffness of second branch [kN/m]', value= 35000.0, step= 1000.)
         F1_sys = st.number_input('Maximum force of first branch [kN]', value= 10000.0, step= 1000.)
     
-spectrum = sa.Ec_response_spectrum(ag= pga, spectra_type= spectra_type, soil_type= soil_type, damping= damping)
+if k_type == 'Linear':
+    k2_sys, F1_sys = 0., 0.
 
-xy_demand = sa.system_demand(m_sys, spectrum)
-x_demand, y_demand = zip(*xy_demand)
+@st.cache_data(max_entries=64)
+def demand_capacity_figure(
+    m_sys: float, pga: float, spectra_type: int, soil_type: str, damping: float,
+    k_type: str, k1_sys: float, k2_sys: float, F1_sys: float,
+)-> go.Figure:
+    """
+    Returns the figure of the seismic demand and capacity curves, built once per set of
+    input values so it is not rebuilt on every rerun of the app
+    """
+    x_demand, y_demand = zip(*sa.cached_system_demand(m_sys, pga, spectra_type, soil_type, damping))
 
-if k_type == 'Linear':
-    xy_capacity = sa.system_capacity(k_type, x_demand, k1_sys)
-elif k_type == 'Multi-linear':
-    xy_capacity = sa.system_capacity(k_type, x_demand, k1_sys, k2_sys, F1_sys)
+    capacity = sa.cached_capacity_curve(k_type, k1_sys, k2_sys, F1_sys)
+    x_breaks, f_breaks = capacity.breakpoints()
+    x_max = max(x_demand)
+    in_range = x_breaks < x_max
+    x_capacity = [*x_breaks[in_range], x_max]
+    y_capacity = [*f_breaks[in_range], *capacity.force([x_max])]
 
-x_capacity, y_capacity = zip(*xy_capacity)
+    fig = go.Figure()
+    fig.layout.title.text = 'Seismic demand vs capacity'
+    fig.add_trace(go.Scatter(y= y_demand, x= x_demand, name = 'Demand'))
+    fig.add_trace(go.Scatter(y= y_capacity, x= x_capacity, name = 'Capacity'))
+    fig.layout.width = 700
+    fig.layout.height = 700
+    fig.update_xaxes(
+        title= 'Displacements [m]', title_font= dict(size= 18, color= 'black'), 
+        range = [0, max(x_demand) * 1.1],
+        zeroline= True, zerolinewidth= 2, zerolinecolor= 'black',
+        showgrid= True, gridwidth= 1, gridcolor= 'black', griddash= 'dash', minor_griddash= 'dot',
+        ticks= 'inside', tickwidth= 2, tickcolor= 'black', ticklen= 10
+    )
+    fig.update_yaxes(
+        title= 'Force [kN]', title_font= dict(size= 18, color= 'black'),
+        range = [0, max(y_demand) * 1.1],
+        zeroline= True, zerolinewidth=2, zerolinecolor= 'black',
+        showgrid= True, gridwidth= 1, gridcolor= 'black', griddash= 'dash', minor_griddash= 'dot',
+        ticks= 'inside', tickwidth= 2, tickcolor= 'black', ticklen= 10
+    )
 
-F_sys = intersection(LineString(xy_demand), LineString(xy_capacity))
+    return fig
 
-fig = go.Figure()
-fig.layout.title.text = 'Seismic demand vs capacity'
-fig.add_trace(go.Scatter(y= y_demand, x= x_demand, name = 'Demand'))
-fig.add_trace(go.Scatter(y= y_capacity, x= x_capacity, name = 'Capacity'))
-fig.layout.width = 700
-fig.layout.height = 700
-fig.update_xaxes(
-    title= 'Displacements [m]', title_font= dict(size= 18, color= 'black'), 
-    range = [0, max(x_demand) * 1.1],
-    zeroline= True, zerolinewidth= 2, zerolinecolor= 'black',
-    showgrid= True, gridwidth= 1, gridcolor= 'black', griddash= 'dash', minor_griddash= 'dot',
-    ticks= 'inside', tickwidth= 2, tickcolor= 'black', ticklen= 10
-)
-fig.update_yaxes(
-    title= 'Force [kN]', title_font= dict(size= 18, color= 'black'),
-    range = [0, max(y_demand) * 1.1],
-    zeroline= True, zerolinewidth=2, zerolinecolor= 'black',
-    showgrid= True, gridwidth= 1, gridcolor= 'black', griddash= 'dash', minor_griddash= 'dot',
-    ticks= 'inside', tickwidth= 2, tickcolor= 'black', ticklen= 10
-)
+F_sys, x_sys, T_sys = sa.cached_performance_point(m_sys, pga, spectra_type, soil_type, damping, k_type, k1_sys, k2_sys, F1_sys)
+
+fig = demand_capacity_figure(m_sys, pga, spectra_type, soil_type, damping, k_type, k1_sys, k2_sys, F1_sys)
 
 st.plotly_chart(fig)
 
 col1, col2, col3, col4 = st.columns(4)
 
-col1.metric(label='System Force', value=f'{round(F_sys.y, 1)} kN')
-col2.metric(label='System Displacement', value=f'{round(F_sys.x * 1000, 1)} mm')
-col3.metric(label='System Period', value=f'{round(2 * pi * sqrt(m_sys / (F_sys.y / F_sys.x)), 2)} s')
-col4.metric(label='System Acceleration', value=f'{round(F_sys.y / m_sys, 2)} m/s2')
+col1.metric(label='System Force', value=f'{round(F_sys, 1)} kN')
+col2.metric(label='System Displacement', value=f'{round(x_sys * 1000, 1)} mm')
+col3.metric(label='System Period', value=f'{round(T_sys, 2)} s')
+col4.metric(label='System Acceleration', value=f'{round(F_sys / m_sys, 2)} m/s2')
 